@@ -0,0 +1,97 @@
+# bench_codec.py
+"""
+Benchmark the ledger JSON codec backends on a synthetic_ledger.generate() ledger.
+
+    python benchmarks/bench_codec.py [--entries 100000] [--repeat 3]
+
+Each installed backend (orjson, msgspec, stdlib json) is timed in a fresh
+subprocess (codec picks its backend at import) for: dumps, loads,
+decode_entries and the per-row ledger `data` encode/decode of storage.py.
+"""
+
+import argparse
+import json
+import os
+import subprocess  # nosec B404 - runs this script with a fixed argv
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def run_backend(entries: int, repeat: int) -> dict:
+    import codec
+    import storage
+    import synthetic_ledger
+
+    ledger = synthetic_ledger.generate(entries, assets=20, years=3)
+    blob = codec.dumps(ledger)
+    rows = [storage.encode_data(e) for e in ledger.values()]
+    return {
+        "backend": codec.BACKEND,
+        "bytes": len(blob),
+        "dumps": _best(lambda: codec.dumps(ledger), repeat),
+        "loads": _best(lambda: codec.loads(blob), repeat),
+        "decode_entries": _best(lambda: codec.decode_entries(blob), repeat),
+        "encode_rows": _best(
+            lambda: [storage.encode_data(e) for e in ledger.values()], repeat
+        ),
+        "decode_rows": _best(lambda: [storage.decode_data(r) for r in rows], repeat),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ledger JSON codecs")
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--backend", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.backend:
+        print(json.dumps(run_backend(args.entries, args.repeat)))
+        return 0
+
+    print(f"{args.entries} entries, best of {args.repeat}")
+    header = (
+        "backend",
+        "MiB",
+        "dumps",
+        "loads",
+        "decode_entries",
+        "enc rows",
+        "dec rows",
+    )
+    print("{:<8} {:>6} {:>8} {:>8} {:>14} {:>9} {:>9}".format(*header))
+    for backend in ("json", "orjson", "msgspec"):
+        env = {**os.environ, "KRAKEN_JSON_CODEC": backend}
+        proc = subprocess.run(  # nosec B603 - fixed argv, no shell
+            [sys.executable, __file__, "--backend", backend]
+            + ["--entries", str(args.entries), "--repeat", str(args.repeat)],
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            print(f"{backend:<8} not available")
+            continue
+        r = json.loads(proc.stdout)
+        print(
+            f"{r['backend']:<8} {r['bytes'] / 2**20:>6.1f} {r['dumps']:>7.3f}s "
+            f"{r['loads']:>7.3f}s {r['decode_entries']:>13.3f}s "
+            f"{r['encode_rows']:>8.3f}s {r['decode_rows']:>8.3f}s"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,70 @@
+# bench_long_reports.py
+"""
+Compare the wide and the long (report_long) layout of the ledger reports.
+
+    python benchmarks/bench_long_reports.py [--assets 300] [--trades 50000] [--days 365]
+
+Builds a throwaway ledger.db in a temporary directory from
+synthetic_ledger.generate(): `trades` buys and sells (plus staking, transfers,
+deposits and withdrawals) over `assets` assets whose trade frequency follows
+a Zipf-like long tail, then reports, per report and layout: build time from the daily tables,
+DataFrame memory (deep) and CSV size.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--assets", type=int, default=300)
+    parser.add_argument("--trades", type=int, default=50_000)
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_long_"))
+    import ledger_asset_report
+    import ledger_eur_report
+    import ledger_sell_report
+    import report_long
+    import storage
+    import synthetic_ledger
+
+    synthetic_ledger.to_db(
+        synthetic_ledger.generate(
+            assets=args.assets,
+            years=args.days / 365,
+            trades_per_day=args.trades / args.days,
+        )
+    )
+    print(f"{args.trades} trades, {args.assets} assets, {args.days} days")
+    print(
+        f"{'report':<8}{'layout':<7}{'rows':>8}{'cols':>6}{'MiB':>9}{'CSV KiB':>10}{'s':>7}"
+    )
+
+    builders = {
+        "eur": ledger_eur_report.build_eur_report,
+        "asset": ledger_asset_report.build_asset_report,
+        "sell": ledger_sell_report.build_sell_report,
+    }
+    for name, build in builders.items():
+        for layout in report_long.LAYOUTS:
+            t = time.perf_counter()
+            df = build(storage.LEDGER_DB_FILE, args.days + 1, layout=layout)
+            secs = time.perf_counter() - t
+            mib = df.memory_usage(deep=True).sum() / 2**20
+            kib = len(df.to_csv(sep=";", index=False).encode("utf-8")) / 1024
+            rows, cols = df.shape
+            print(
+                f"{name:<8}{layout:<7}{rows:>8}{cols:>6}{mib:>9.2f}{kib:>10.0f}{secs:>7.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# bench_reports.py
+"""
+Benchmark the loop-based and the vectorized ledger reports.
+
+    python benchmarks/bench_reports.py [--entries 1000000] [--days 30] [--repeat 1]
+
+The ledger comes from synthetic_ledger.generate() (trades, staking rewards,
+spot <-> staking transfers, deposits and withdrawals over 8 assets) spread
+over the last `days` days. Timed: report_engine.build_reports() with the three
+aggregators vs report_vectorized.build_reports() (frame load included and,
+separately, on a prebuilt frame). The outputs are compared before timing.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+import report_engine  # noqa: E402
+import report_vectorized  # noqa: E402
+import synthetic_ledger  # noqa: E402
+from ledger_asset_report import AssetReport  # noqa: E402
+from ledger_eur_report import EurReport  # noqa: E402
+from ledger_sell_report import SellReport  # noqa: E402
+
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    entries = synthetic_ledger.generate(args.entries, 8, args.days / 365)
+    reports = [EurReport, AssetReport, SellReport]
+    print(f"{len(entries)} entries, {args.days} days")
+
+    loop = report_engine.build_reports(entries, reports, args.days)
+    vec = report_vectorized.build_reports(entries, args.days)
+    for name, df in loop.items():
+        # both round to cents; summation order may flip a half-cent
+        pd.testing.assert_frame_equal(
+            vec[name], df, check_exact=False, check_like=name == "asset", atol=0.011
+        )
+
+    t_loop = _best(
+        lambda: report_engine.build_reports(entries, reports, args.days), args.repeat
+    )
+    t_frame = _best(lambda: report_vectorized.ledger_frame(entries), args.repeat)
+    frame = report_vectorized.ledger_frame(entries)
+    t_vec = _best(
+        lambda: report_vectorized.build_reports(frame, args.days), args.repeat
+    )
+    print(f"{'loop (report_engine)':<28}{t_loop:8.2f} s")
+    print(f"{'vectorized incl. frame':<28}{t_frame + t_vec:8.2f} s")
+    print(f"{'vectorized on frame':<28}{t_vec:8.2f} s")
+    print(f"speedup: {t_loop / (t_frame + t_vec):.1f}x / {t_loop / t_vec:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
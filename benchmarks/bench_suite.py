@@ -0,0 +1,210 @@
+# bench_suite.py
+"""
+Regression benchmarks of the report and summary builders across ledger scales.
+
+    python benchmarks/bench_suite.py [--scales 1k,10k,100k] [--assets 10,100]
+                                     [--repeat 3] [--tolerance 0.3] [--save]
+    python -m pytest benchmarks/bench_suite.py      # same gate under pytest
+
+Every case is a synthetic_ledger.generate() ledger (trades, staking rewards,
+staking transfers, deposits, withdrawals over a year) of about 1k, 10k, 100k
+or 1m entries and a number of assets (long-tail trade frequency). Timed per
+case, from the entries dict: build_eur_report(), build_asset_report(),
+build_sell_report() (30-day window), run_fifo(), and enrich_summary() on the
+forecast FIFO summary. Time is the best of `--repeat` runs; peak memory is
+the tracemalloc peak of one extra run.
+
+Results are compared with benchmarks/baselines.json: a builder regresses
+when it is slower, or its peak is larger, than the baseline by more than
+`--tolerance` (a fraction; differences under MIN_SECONDS / MIN_MIB are
+noise and ignored). The script exits 1 on a regression. `--save` records
+the current results as the new baselines for the cases that were run;
+baselines are machine-specific, so re-record them on the machine that
+runs the gate.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from typing import Any
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+import ledger_asset_report  # noqa: E402
+import ledger_eur_report  # noqa: E402
+import ledger_sell_report  # noqa: E402
+import portfolio_summary  # noqa: E402
+import portfolio_summary_report  # noqa: E402
+import synthetic_ledger  # noqa: E402
+
+BASELINE_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "baselines.json"
+)
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+DEFAULT_SCALES = ("1k", "10k", "100k")
+DEFAULT_ASSETS = (10, 100)
+LEDGER_DAYS = 365
+REPORT_DAYS = 30
+TOLERANCE = 0.3
+MIN_SECONDS = 0.005
+MIN_MIB = 1.0
+
+
+def _summary(entries: dict) -> Any:
+    return portfolio_summary.forecast_prices(portfolio_summary.run_fifo(entries))
+
+
+BUILDERS: dict[str, Callable[[dict], Any]] = {
+    "eur_report": lambda e: ledger_eur_report.build_eur_report(e, REPORT_DAYS),
+    "asset_report": lambda e: ledger_asset_report.build_asset_report(e, REPORT_DAYS),
+    "sell_report": lambda e: ledger_sell_report.build_sell_report(e, REPORT_DAYS),
+    "run_fifo": portfolio_summary.run_fifo,
+}
+
+
+def case_name(scale: str, assets: int) -> str:
+    return f"{scale}-{assets}a"
+
+
+def ledger(scale: str, assets: int) -> dict:
+    return synthetic_ledger.generate(SCALES[scale], assets, LEDGER_DAYS / 365)
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> dict[str, float]:
+    """{"seconds": best of `repeat`, "peak_mib": tracemalloc peak of one run}."""
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"seconds": round(best, 4), "peak_mib": round(peak / 2**20, 2)}
+
+
+def run_case(scale: str, assets: int, repeat: int = 3) -> dict[str, dict[str, float]]:
+    """Results of every builder on one synthetic ledger."""
+    entries = ledger(scale, assets)
+    results = {
+        name: measure(lambda: fn(entries), repeat) for name, fn in BUILDERS.items()
+    }
+    summary = _summary(entries)
+    results["enrich_summary"] = measure(
+        lambda: portfolio_summary_report.enrich_summary(summary), repeat
+    )
+    return results
+
+
+def load_baselines(path: str = BASELINE_FILE) -> dict[str, Any]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            data: dict[str, Any] = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data
+
+
+def save_baselines(results: dict[str, Any], path: str = BASELINE_FILE) -> None:
+    data = load_baselines(path)
+    data.update(results)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def regressions(
+    result: dict[str, float], baseline: dict[str, float], tolerance: float = TOLERANCE
+) -> list[str]:
+    """Metrics of `result` worse than `baseline` by more than `tolerance`."""
+    out = []
+    for metric, floor in (("seconds", MIN_SECONDS), ("peak_mib", MIN_MIB)):
+        new, old = result.get(metric), baseline.get(metric)
+        if new is None or old is None or new - old < floor:
+            continue
+        if new > old * (1 + tolerance):
+            out.append(f"{metric} {old:g} -> {new:g} (+{(new / old - 1) * 100:.0f}%)")
+    return out
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scales", default=",".join(DEFAULT_SCALES))
+    parser.add_argument("--assets", default=",".join(str(a) for a in DEFAULT_ASSETS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument(
+        "--save", action="store_true", help="Store the results as new baselines"
+    )
+    args = parser.parse_args(argv)
+    logging.disable(logging.WARNING)  # builders log per call
+
+    baselines = load_baselines(args.baseline)
+    results: dict[str, Any] = {}
+    failed = 0
+    print(f"{'case':<12}{'builder':<16}{'s':>9}{'MiB':>9}{'base s':>9}{'base MiB':>10}")
+    for scale in args.scales.split(","):
+        for assets in (int(a) for a in args.assets.split(",")):
+            case = case_name(scale, assets)
+            results[case] = run_case(scale, assets, args.repeat)
+            for name, res in results[case].items():
+                base = baselines.get(case, {}).get(name, {})
+                bad = regressions(res, base, args.tolerance)
+                failed += bool(bad)
+                print(
+                    f"{case:<12}{name:<16}{res['seconds']:>9.4f}{res['peak_mib']:>9.2f}"
+                    f"{base.get('seconds', float('nan')):>9.4f}"
+                    f"{base.get('peak_mib', float('nan')):>10.2f}"
+                    + ("  REGRESSION: " + "; ".join(bad) if bad else "")
+                )
+
+    if args.save:
+        save_baselines(results, args.baseline)
+        print(f"Baselines saved to {args.baseline}")
+        return 0
+    return 1 if failed else 0
+
+
+# pytest entry point: python -m pytest benchmarks/bench_suite.py
+# (BENCH_SCALES=1k,10k,100k selects the scales, default 1k and 10k)
+
+
+def _pytest_cases() -> list[tuple[str, int]]:
+    scales = os.environ.get("BENCH_SCALES", "1k,10k").split(",")
+    return [(s, a) for s in scales for a in DEFAULT_ASSETS]
+
+
+def pytest_generate_tests(metafunc: Any) -> None:
+    if "bench_case" in metafunc.fixturenames:
+        cases = _pytest_cases()
+        metafunc.parametrize("bench_case", cases, ids=[case_name(*c) for c in cases])
+
+
+def test_builders_within_baseline(bench_case: tuple[str, int]) -> None:
+    case = case_name(*bench_case)
+    baseline = load_baselines().get(case)
+    if not baseline:
+        import pytest
+
+        pytest.skip(f"no baseline for {case}")
+    results = run_case(*bench_case)
+    bad = {
+        n: r
+        for n, res in results.items()
+        if (r := regressions(res, baseline.get(n, {})))
+    }
+    assert not bad, bad
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+# accounts.py
+"""
+Named Kraken accounts.
+
+Every account has its own working directory `accounts/<name>/` - with its
+own `balances_history/` (ledger.db, journal, reports, backups) - and its
+own encrypted key set `kraken-<name>.key` next to the default `kraken.key`
+(same master key, see keys.use_account()).
+
+All storage and report paths in the project are relative to the working
+directory, so activate(name) (chdir + key set switch) points the whole tool
+at one account. That is process-global state: accounts are updated in
+parallel with one process per account (update.py --all-accounts), never
+with threads.
+"""
+
+import logging
+import os
+import re
+import sqlite3
+
+import pandas as pd
+
+import keys
+import storage
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
+    )
+
+ACCOUNTS_DIR = os.path.abspath("accounts")
+CONSOLIDATED_SUMMARY_FILE = os.path.join(ACCOUNTS_DIR, "consolidated_summary.csv")
+ACCOUNT_NAME_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+SUM_COLUMNS = ["remaining_amount", "total_paid", "total_fee", "remaining_cost"]
+
+
+class AccountError(Exception):
+    pass
+
+
+def _check_name(name: str):
+    if not name or not ACCOUNT_NAME_RE.match(name):
+        raise AccountError(f"Invalid account name: {name!r} (use A-Z, 0-9, _ and -)")
+
+
+def account_dir(name: str) -> str:
+    _check_name(name)
+    return os.path.join(ACCOUNTS_DIR, name)
+
+
+def list_accounts() -> list[str]:
+    """Names of all accounts (subdirectories of ACCOUNTS_DIR), sorted."""
+    if not os.path.isdir(ACCOUNTS_DIR):
+        return []
+    return sorted(
+        name
+        for name in os.listdir(ACCOUNTS_DIR)
+        if ACCOUNT_NAME_RE.match(name)
+        and os.path.isdir(os.path.join(ACCOUNTS_DIR, name))
+    )
+
+
+def create_account(name: str) -> str:
+    """Create the working directory of `name` (idempotent). Returns its path."""
+    path = account_dir(name)
+    os.makedirs(os.path.join(path, storage.BALANCES_DIR), exist_ok=True)
+    return path
+
+
+def activate(name: str) -> str:
+    """Point this process at account `name`: chdir into it + use its key set."""
+    path = account_dir(name)
+    if not os.path.isdir(path):
+        raise AccountError(
+            f"Account {name!r} not found in {ACCOUNTS_DIR} (create it with start.py --account {name} --setup-keys)"
+        )
+    os.chdir(path)
+    keys.use_account(name)
+    logger.info("Using account %s (%s)", name, path)
+    return path
+
+
+def _load_summary(name: str) -> pd.DataFrame:
+    db_path = os.path.join(account_dir(name), storage.LEDGER_DB_FILE)
+    if not os.path.exists(db_path):
+        return pd.DataFrame()
+    conn = sqlite3.connect(db_path)
+    try:
+        return pd.read_sql_query("SELECT * FROM summary", conn)
+    except (sqlite3.OperationalError, pd.errors.DatabaseError) as e:
+        logger.warning("No summary table for account %s: %s", name, e)
+        return pd.DataFrame()
+    finally:
+        conn.close()
+
+
+def consolidate_summaries(
+    names: list[str] | None = None, write_csv: bool = True
+) -> pd.DataFrame:
+    """
+    Cross-account portfolio summary from each account's `summary` table:
+    amounts/costs/fees are summed per asset, avg_price is recomputed from the
+    summed remaining cost, latest_price comes from the most recent update.
+    """
+    names = list_accounts() if names is None else names
+    frames = []
+    for name in names:
+        df = _load_summary(name)
+        if not df.empty:
+            frames.append(df.assign(account=name))
+    if not frames:
+        logger.warning("No account summaries to consolidate")
+        return pd.DataFrame()
+
+    allrows = pd.concat(frames, ignore_index=True)
+    latest = allrows.sort_values("update_date", na_position="first").groupby("asset")
+    out = allrows.groupby("asset")[SUM_COLUMNS].sum()
+    out["latest_price"] = latest["latest_price"].last()
+    out["update_date"] = latest["update_date"].last()
+    out["avg_price"] = (out["remaining_cost"] / out["remaining_amount"]).where(
+        out["remaining_amount"] > 0, 0.0
+    )
+    out["accounts"] = allrows.groupby("asset")["account"].apply(
+        lambda a: ",".join(sorted(set(a)))
+    )
+    out = out.reset_index()[
+        ["asset", "latest_price", "update_date"]
+        + SUM_COLUMNS
+        + ["avg_price", "accounts"]
+    ]
+
+    if write_csv:
+        os.makedirs(ACCOUNTS_DIR, exist_ok=True)
+        out.to_csv(CONSOLIDATED_SUMMARY_FILE, sep=";", index=False, encoding="utf-8")
+        logger.info(
+            "Consolidated summary of %d accounts saved to %s",
+            len(frames),
+            CONSOLIDATED_SUMMARY_FILE,
+        )
+    return out
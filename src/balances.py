@@ -27,6 +27,7 @@ from ledger_loader import update_raw_ledger
 import ledger_eur_report
 import ledger_asset_report
 import ledger_sell_report
+import report_io
 from config import BALANCES_HISTORY_DIR as CFG_BALANCES_DIR
 
 
@@ -53,24 +54,15 @@ def generate_all_reports(days: int = 7, update: bool = True) -> None:
     if update:
         update_raw_ledger(days=days)
 
-    entries = storage.load_entries()
+    db_path = storage.LEDGER_DB_FILE
+    if os.path.exists(db_path):
+        storage.init_db()
 
-    # EUR report
-    df_eur = ledger_eur_report.build_eur_report(entries, days=days)
-    if not df_eur.empty:
-        ledger_eur_report.save_eur_report(df_eur)
-
-    # Asset report
-    df_asset = ledger_asset_report.build_asset_report(entries, days=days)
-    if not df_asset.empty:
-        out_asset = os.path.join(BALANCES_DIR, "ledger_asset_report.csv")
-        _atomic_to_csv(df_asset, out_asset, sep=";", index=False)
-
-    # Sell report
-    df_sell = ledger_sell_report.build_sell_report(entries, days=days)
-    if not df_sell.empty:
-        out_sell = os.path.join(BALANCES_DIR, "ledger_sell_report.csv")
-        _atomic_to_csv(df_sell, out_sell, sep=";", index=False)
+    # CSVs are refreshed in place: only dates changed since the last run
+    # are rebuilt from the daily tables
+    ledger_eur_report.refresh_eur_report(days, db_path)
+    ledger_asset_report.refresh_asset_report(days, db_path)
+    ledger_sell_report.refresh_sell_report(days, db_path)
 
 
 # ---------------- УТИЛИТЫ ---------------- #
@@ -185,26 +177,12 @@ def fetch_prices_batch(api: KrakenAPI, pairs: list[str]) -> dict[str, Decimal]:
 
 
 def _atomic_to_csv(df: pd.DataFrame, out_path: str, **to_csv_kwargs) -> None:
-    """Сохраняет DataFrame в CSV атомарно (через temp file + os.replace)."""
-    os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    dir_for_temp = os.path.dirname(out_path) or "."
-    fd, tmppath = tempfile.mkstemp(prefix=".tmp_", dir=dir_for_temp, text=True)
-    os.close(fd)
-    try:
-        # use pandas to_csv writing to tmppath
-        df.to_csv(tmppath, **to_csv_kwargs)
-        # replace target
-        os.replace(tmppath, out_path)
-    except Exception:
-        # cleanup tmp file if something went wrong
-        try:
-            if os.path.exists(tmppath):
-                os.remove(tmppath)
-        except (
-            Exception
-        ):  # nosec B110 - best-effort temp file cleanup before re-raising
-            pass
-        raise
+    """Сохраняет DataFrame в CSV атомарно (temp file + os.replace), по частям
+    через report_io.write_csv(), без полной копии в памяти."""
+    encoding = to_csv_kwargs.pop("encoding", None) or "utf-8"
+    report_io.write_csv(
+        out_path, report_io.iter_chunks(df), encoding=encoding, **to_csv_kwargs
+    )
 
 
 def _write_json_atomic(data, out_path: str) -> None:
@@ -0,0 +1,128 @@
+# codec.py
+"""
+JSON codec for ledger I/O with optional fast backends.
+
+Backend order: orjson, msgspec, stdlib json - the first one installed wins
+(KRAKEN_JSON_CODEC=orjson|msgspec|json forces one). Neither fast backend is
+a requirement; both are plain `pip install` extras.
+
+Invalid input raises ValueError with every backend (msgspec's DecodeError
+is re-raised as one), so callers such as storage's journal reader can skip
+a corrupt line without knowing the backend.
+
+All backends emit the same compact UTF-8 JSON (no whitespace, non-ASCII kept
+as-is), so files written by one are read by any other. `pretty=True` gives
+2-space indentation for files meant for humans.
+
+decode_entries() decodes a txid -> entry mapping straight into LedgerEntry
+records (floats instead of Kraken's decimal strings); with msgspec this
+happens in one pass without building intermediate dicts.
+"""
+
+import importlib
+import importlib.util
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("orjson", "msgspec", "json")
+
+
+@dataclass(frozen=True, slots=True)
+class LedgerEntry:
+    refid: str = ""
+    time: float = 0.0
+    type: str = ""
+    subtype: str = ""
+    aclass: str = ""
+    asset: str = ""
+    amount: float = 0.0
+    fee: float = 0.0
+    balance: float = 0.0
+
+
+def _pick_backend() -> str:
+    forced = os.getenv("KRAKEN_JSON_CODEC")
+    if forced:
+        if forced not in BACKENDS:
+            raise ValueError(f"KRAKEN_JSON_CODEC must be one of {BACKENDS}")
+        return forced
+    for name in BACKENDS[:-1]:
+        if importlib.util.find_spec(name) is not None:
+            return name
+    return "json"
+
+
+BACKEND = _pick_backend()
+_lib: Any = importlib.import_module(BACKEND) if BACKEND != "json" else None
+# decode errors that are not ValueErrors already (orjson's and json's are)
+_DECODE_ERRORS: tuple[type[Exception], ...] = ()
+if BACKEND == "msgspec":
+    importlib.import_module("msgspec.json")
+    _DECODE_ERRORS = (_lib.DecodeError,)
+
+
+def dumps(obj: Any, pretty: bool = False) -> bytes:
+    """Serialise `obj` to UTF-8 JSON bytes (compact unless `pretty`)."""
+    out: bytes
+    if BACKEND == "orjson":
+        out = _lib.dumps(obj, option=_lib.OPT_INDENT_2 if pretty else 0)
+        return out
+    if BACKEND == "msgspec":
+        out = _lib.json.encode(obj)
+        return _lib.json.format(out, indent=2) if pretty else out
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: bytes | str) -> Any:
+    """Parse JSON from bytes or str; ValueError if it is not valid JSON."""
+    try:
+        if BACKEND == "orjson":
+            return _lib.loads(data)
+        if BACKEND == "msgspec":
+            return _lib.json.decode(data)
+        return json.loads(data)
+    except _DECODE_ERRORS as e:
+        raise ValueError(str(e)) from e
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def to_entry(raw: dict[str, Any]) -> LedgerEntry:
+    """Build a LedgerEntry from a raw entry dict (unknown keys are dropped)."""
+    return LedgerEntry(
+        refid=str(raw.get("refid") or ""),
+        time=_to_float(raw.get("time")),
+        type=str(raw.get("type") or ""),
+        subtype=str(raw.get("subtype") or ""),
+        aclass=str(raw.get("aclass") or ""),
+        asset=str(raw.get("asset") or ""),
+        amount=_to_float(raw.get("amount")),
+        fee=_to_float(raw.get("fee")),
+        balance=_to_float(raw.get("balance")),
+    )
+
+
+def decode_entries(data: bytes | str) -> dict[str, LedgerEntry]:
+    """Decode a JSON txid -> entry mapping into LedgerEntry records."""
+    if BACKEND == "msgspec":
+        # strict=False lets msgspec coerce Kraken's "1.2300" strings to float
+        try:
+            entries: dict[str, LedgerEntry] = _lib.json.decode(
+                data, type=dict[str, LedgerEntry], strict=False
+            )
+        except _DECODE_ERRORS as e:
+            raise ValueError(str(e)) from e
+        return entries
+    return {txid: to_entry(raw) for txid, raw in loads(data).items()}
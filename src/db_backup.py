@@ -0,0 +1,265 @@
+# db_backup.py
+"""
+Online, compressed backups of ledger.db.
+
+Uses sqlite3.Connection.backup() in page-stepped increments: between steps
+the source lock is released, so update.py can keep writing while a backup
+runs (copying the DB file directly is unsafe mid-transaction). Each backup
+is gzip-compressed into `<db dir>/backups/ledger-YYYYmmddTHHMMSSZ.db.gz`.
+
+Retention is grandfather-father-son style: the newest backup of each of the
+last KEEP_DAILY days and of each of the last KEEP_WEEKLY ISO weeks is kept,
+everything else is pruned. The newest backup is restored to a temp file and
+checked with `PRAGMA integrity_check` every VERIFY_INTERVAL_DAYS.
+"""
+
+import argparse
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+import storage
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
+    )
+
+BACKUP_SUBDIR = "backups"
+BACKUP_PREFIX = "ledger-"
+BACKUP_SUFFIX = ".db.gz"
+BACKUP_TS_FORMAT = "%Y%m%dT%H%M%SZ"
+PAGES_PER_STEP = 256  # pages copied per backup step before yielding the lock
+STEP_SLEEP = 0.005  # seconds to sleep between steps (lets writers in)
+KEEP_DAILY = 7
+KEEP_WEEKLY = 4
+MIN_INTERVAL_HOURS = 24  # scheduled backups are skipped if a newer one exists
+VERIFY_INTERVAL_DAYS = 7
+VERIFY_STAMP_FILE = ".last_verified"
+
+
+def _backup_dir(db_path: str, dest_dir: str | None = None) -> str:
+    return dest_dir or os.path.join(os.path.dirname(db_path) or ".", BACKUP_SUBDIR)
+
+
+def _parse_backup_ts(name: str) -> datetime | None:
+    if not (name.startswith(BACKUP_PREFIX) and name.endswith(BACKUP_SUFFIX)):
+        return None
+    stamp = name[len(BACKUP_PREFIX) : -len(BACKUP_SUFFIX)]
+    try:
+        return datetime.strptime(stamp, BACKUP_TS_FORMAT).replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+def list_backups(dest_dir: str) -> list[tuple[datetime, str]]:
+    """Return (timestamp, path) of every backup in dest_dir, newest first."""
+    if not os.path.isdir(dest_dir):
+        return []
+    found = []
+    for name in os.listdir(dest_dir):
+        ts = _parse_backup_ts(name)
+        if ts is not None:
+            found.append((ts, os.path.join(dest_dir, name)))
+    found.sort(reverse=True)
+    return found
+
+
+def backup_db(
+    db_path: str | None = None,
+    dest_dir: str | None = None,
+    pages: int = PAGES_PER_STEP,
+    sleep: float = STEP_SLEEP,
+) -> str | None:
+    """
+    Take an online backup of db_path and gzip it into dest_dir.
+    Returns the backup path, or None if the DB does not exist.
+    """
+    db_path = db_path or storage.LEDGER_DB_FILE
+    if not os.path.exists(db_path):
+        logger.warning("Backup skipped, database not found: %s", db_path)
+        return None
+    dest_dir = _backup_dir(db_path, dest_dir)
+    os.makedirs(dest_dir, exist_ok=True)
+
+    ts = datetime.now(timezone.utc).strftime(BACKUP_TS_FORMAT)
+    out_path = os.path.join(dest_dir, f"{BACKUP_PREFIX}{ts}{BACKUP_SUFFIX}")
+    fd, raw_tmp = tempfile.mkstemp(prefix=".backup_", suffix=".db", dir=dest_dir)
+    os.close(fd)
+    gz_tmp = out_path + ".tmp"
+    try:
+        src = sqlite3.connect(db_path)
+        dst = sqlite3.connect(raw_tmp)
+        try:
+            src.backup(dst, pages=pages, sleep=sleep)
+        finally:
+            dst.close()
+            src.close()
+        with open(raw_tmp, "rb") as fin, gzip.open(gz_tmp, "wb") as fout:
+            shutil.copyfileobj(fin, fout)
+        os.replace(gz_tmp, out_path)
+    finally:
+        for tmp in (raw_tmp, gz_tmp):
+            if os.path.exists(tmp):
+                try:
+                    os.remove(tmp)
+                except OSError:  # nosec B110 - best-effort temp file cleanup
+                    pass
+
+    logger.info(
+        "DB backup written: %s (%.1f KiB)", out_path, os.path.getsize(out_path) / 1024
+    )
+    return out_path
+
+
+def prune_backups(
+    dest_dir: str, keep_daily: int = KEEP_DAILY, keep_weekly: int = KEEP_WEEKLY
+) -> list[str]:
+    """
+    Keep the newest backup per day for the last `keep_daily` days that have
+    backups, and the newest per ISO week for the last `keep_weekly` weeks.
+    Returns the paths that were removed.
+    """
+    backups = list_backups(dest_dir)  # newest first
+    keep: set[str] = set()
+    days_seen: set = set()
+    weeks_seen: set = set()
+    for ts, path in backups:
+        day = ts.date()
+        week = ts.isocalendar()[:2]
+        if day not in days_seen and len(days_seen) < keep_daily:
+            days_seen.add(day)
+            keep.add(path)
+        if week not in weeks_seen and len(weeks_seen) < keep_weekly:
+            weeks_seen.add(week)
+            keep.add(path)
+
+    removed = []
+    for _, path in backups:
+        if path in keep:
+            continue
+        try:
+            os.remove(path)
+            removed.append(path)
+        except OSError as e:
+            logger.warning("Failed to remove old backup %s: %s", path, e)
+    if removed:
+        logger.info("Pruned %d old DB backup(s)", len(removed))
+    return removed
+
+
+def verify_backup(path: str) -> bool:
+    """Decompress a backup to a temp file and run PRAGMA integrity_check on it."""
+    dirn = os.path.dirname(path) or "."
+    fd, tmp = tempfile.mkstemp(prefix=".verify_", suffix=".db", dir=dirn)
+    os.close(fd)
+    try:
+        with gzip.open(path, "rb") as fin, open(tmp, "wb") as fout:
+            shutil.copyfileobj(fin, fout)
+        conn = sqlite3.connect(tmp)
+        try:
+            result = conn.execute("PRAGMA integrity_check").fetchone()
+        finally:
+            conn.close()
+        ok = bool(result) and result[0] == "ok"
+    except (OSError, EOFError, sqlite3.DatabaseError) as e:
+        logger.error("Backup %s could not be verified: %s", path, e)
+        ok = False
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    if ok:
+        logger.info("Backup verified OK: %s", path)
+    else:
+        logger.error("Backup FAILED integrity check: %s", path)
+    return ok
+
+
+def verify_if_due(
+    dest_dir: str, interval_days: int = VERIFY_INTERVAL_DAYS
+) -> bool | None:
+    """
+    Verify the newest backup if the last verification is older than
+    `interval_days`. Returns the check result, or None if not due / no backups.
+    """
+    stamp = os.path.join(dest_dir, VERIFY_STAMP_FILE)
+    now = datetime.now(timezone.utc)
+    try:
+        with open(stamp, encoding="utf-8") as f:
+            last = datetime.fromisoformat(f.read().strip())
+        if now - last < timedelta(days=interval_days):
+            return None
+    except (OSError, ValueError):
+        pass  # never verified (or unreadable stamp) -> due
+
+    backups = list_backups(dest_dir)
+    if not backups:
+        return None
+    ok = verify_backup(backups[0][1])
+    if ok:
+        with open(stamp, "w", encoding="utf-8") as f:
+            f.write(now.isoformat())
+    return ok
+
+
+def run_scheduled_backup(
+    db_path: str | None = None,
+    dest_dir: str | None = None,
+    min_interval_hours: float = MIN_INTERVAL_HOURS,
+) -> str | None:
+    """
+    Back up only if the newest backup is older than `min_interval_hours`,
+    then apply retention and run the periodic integrity check.
+    Intended to be called after every successful update.py run.
+    """
+    db_path = db_path or storage.LEDGER_DB_FILE
+    dest_dir = _backup_dir(db_path, dest_dir)
+    backups = list_backups(dest_dir)
+    now = datetime.now(timezone.utc)
+    out = None
+    if not backups or now - backups[0][0] >= timedelta(hours=min_interval_hours):
+        out = backup_db(db_path, dest_dir)
+    else:
+        logger.info("DB backup not due (latest: %s)", backups[0][1])
+    prune_backups(dest_dir)
+    verify_if_due(dest_dir)
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Online backup of ledger.db")
+    parser.add_argument("--db", default=None, help="Database path (default: ledger.db)")
+    parser.add_argument("--dest", default=None, help="Backup directory")
+    parser.add_argument(
+        "--keep-daily", type=int, default=KEEP_DAILY, help="Daily backups to keep"
+    )
+    parser.add_argument(
+        "--keep-weekly", type=int, default=KEEP_WEEKLY, help="Weekly backups to keep"
+    )
+    parser.add_argument(
+        "--verify", action="store_true", help="Only verify the newest backup"
+    )
+    args = parser.parse_args(argv)
+
+    db_path = args.db or storage.LEDGER_DB_FILE
+    dest_dir = _backup_dir(db_path, args.dest)
+    if args.verify:
+        backups = list_backups(dest_dir)
+        if not backups:
+            logger.warning("No backups found in %s", dest_dir)
+            return 1
+        return 0 if verify_backup(backups[0][1]) else 1
+
+    if backup_db(db_path, dest_dir) is None:
+        return 1
+    prune_backups(dest_dir, args.keep_daily, args.keep_weekly)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,260 @@
+# fifo_lots.py
+"""
+Lot-level FIFO: every buy opens a lot (amount, unit cost incl. fee,
+acquired_at) in its asset's LotQueue, every sell consumes the oldest lots
+first and records a disposal with its cost basis and realised P&L.
+
+portfolio_summary's default engine (_apply_sell) sells at the pooled
+average cost; COST_METHOD = "fifo" there (or run_fifo(..., method="fifo"))
+uses this module instead. replay_events() takes the time-ordered stream of
+portfolio_summary.extract_trades()/trade_events() as is; replay() merges
+separate buy and sell lists first. The replay is O(n): a lot is appended
+once and popped once, a partial fill only shrinks the head lot.
+
+A LotQueue keeps its lots in three array('d') columns with a head index;
+consumed lots are dropped in bulk once they make up half the columns, so
+a queue holds about 24 bytes per open lot instead of a dict or tuple each.
+
+    python src/fifo_lots.py              # fifo_disposals.csv + fifo_lots.csv
+"""
+
+import argparse
+import logging
+import os
+from array import array
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
+    )
+
+COMPACT_MIN = 1024  # consumed head lots before a queue compacts its columns
+DUST = 1e-12  # lot amounts at or below this count as fully consumed
+DISPOSAL_COLUMNS = [
+    "asset",
+    "date",
+    "amount",
+    "proceeds",
+    "fee",
+    "cost_basis",
+    "realised_pnl",
+    "first_acquired",
+    "lots",
+    "unmatched",
+]
+LOT_COLUMNS = ["asset", "amount", "unit_cost", "cost", "acquired_at"]
+DISPOSALS_FILE = "fifo_disposals.csv"
+LOTS_FILE = "fifo_lots.csv"
+
+
+@dataclass(slots=True)
+class LotQueue:
+    """Open lots of one asset, oldest first."""
+
+    amount: array = field(default_factory=lambda: array("d"))
+    unit_cost: array = field(default_factory=lambda: array("d"))
+    acquired_at: array = field(default_factory=lambda: array("d"))
+    head: int = 0
+
+    def __len__(self) -> int:
+        return len(self.amount) - self.head
+
+    def push(self, amount: float, unit_cost: float, acquired_at: float) -> None:
+        self.amount.append(amount)
+        self.unit_cost.append(unit_cost)
+        self.acquired_at.append(acquired_at)
+
+    def consume(self, amount: float) -> tuple[float, float, float, int]:
+        """
+        Take `amount` from the oldest lots.
+        Returns (amount taken, cost basis, acquired_at of the first lot, lots touched).
+        """
+        left, cost, first, touched = amount, 0.0, 0.0, 0
+        amounts, costs, head = self.amount, self.unit_cost, self.head
+        if head < len(amounts):
+            first = self.acquired_at[head]
+        while left > DUST and head < len(amounts):
+            lot = amounts[head]
+            touched += 1
+            if lot <= left + DUST:
+                cost += lot * costs[head]
+                left -= lot
+                head += 1
+            else:
+                cost += left * costs[head]
+                amounts[head] = lot - left
+                left = 0.0
+        self.head = head
+        if head >= COMPACT_MIN and 2 * head >= len(amounts):
+            self._compact()
+        return amount - max(left, 0.0), cost, first, touched
+
+    def _compact(self) -> None:
+        for col in (self.amount, self.unit_cost, self.acquired_at):
+            del col[: self.head]
+        self.head = 0
+
+    def totals(self) -> tuple[float, float]:
+        """(open amount, open cost)."""
+        h = self.head
+        return (
+            sum(self.amount[h:]),
+            sum(a * c for a, c in zip(self.amount[h:], self.unit_cost[h:])),
+        )
+
+
+@dataclass(slots=True)
+class LotBook:
+    """Result of replay(): open lots per asset and one row per disposal."""
+
+    queues: dict[str, LotQueue] = field(default_factory=dict)
+    disposal_rows: list[tuple] = field(default_factory=list)
+
+    def realised(self) -> dict[str, float]:
+        """Realised P&L per asset."""
+        out: dict[str, float] = {}
+        for row in self.disposal_rows:
+            out[row[0]] = out.get(row[0], 0.0) + row[6]
+        return out
+
+    def disposals(self) -> pd.DataFrame:
+        df = pd.DataFrame(self.disposal_rows, columns=DISPOSAL_COLUMNS)
+        df["first_acquired"] = _to_datetime(df["first_acquired"])
+        return df
+
+    def lots(self) -> pd.DataFrame:
+        frames = []
+        for asset in sorted(self.queues):
+            q = self.queues[asset]
+            if not len(q):
+                continue
+            h = q.head
+            amount = pd.Series(q.amount[h:], dtype="float64")
+            unit_cost = pd.Series(q.unit_cost[h:], dtype="float64")
+            frames.append(
+                pd.DataFrame(
+                    {
+                        "asset": asset,
+                        "amount": amount,
+                        "unit_cost": unit_cost,
+                        "cost": amount * unit_cost,
+                        "acquired_at": _to_datetime(
+                            pd.Series(q.acquired_at[h:], dtype="float64")
+                        ),
+                    }
+                )
+            )
+        if not frames:
+            return pd.DataFrame(columns=LOT_COLUMNS)
+        return pd.concat(frames, ignore_index=True)
+
+
+def _to_datetime(seconds: pd.Series) -> pd.Series:
+    out = pd.to_datetime(seconds, unit="s", utc=True)
+    return out.where(seconds > 0)
+
+
+def _time(record: dict[str, Any]) -> float:
+    if record.get("time"):
+        return float(record["time"])
+    date = record.get("date")
+    return date.timestamp() if isinstance(date, datetime) else 0.0
+
+
+def replay(buys: list[dict[str, Any]], sells: list[dict[str, Any]]) -> LotBook:
+    """
+    Replay buy/sell records (portfolio_summary.extract_buys()/extract_sells()
+    or split_trades()) in time order; a buy and a sell at the same time are
+    applied buy first.
+    """
+    events = [(_time(b), False, b) for b in buys] + [(_time(s), True, s) for s in sells]
+    events.sort(key=lambda ev: (ev[0], ev[1]))
+    return _replay(events)
+
+
+def replay_events(events: list[dict[str, Any]]) -> LotBook:
+    """Replay a stream that is already in time order, record["side"] "buy" or
+    "sell" (portfolio_summary.extract_trades()/trade_events())."""
+    return _replay((_time(r), r["side"] == "sell", r) for r in events)
+
+
+def _replay(events: Iterable[tuple[float, bool, dict[str, Any]]]) -> LotBook:
+    book = LotBook()
+    queues, rows = book.queues, book.disposal_rows
+    n_buys = 0
+    for ts, is_sell, rec in events:
+        asset, amount = rec["asset"], rec["amount"]
+        if not is_sell:
+            cost = rec["paid"] + rec["fee"]
+            q = queues.get(asset)
+            if q is None:
+                q = queues[asset] = LotQueue()
+            q.push(amount, cost / amount if amount else 0.0, ts)
+            n_buys += 1
+            continue
+        q = queues.get(asset)
+        taken, basis, first, touched = q.consume(amount) if q else (0, 0, 0, 0)
+        unmatched = amount - taken
+        if unmatched > 1e-8:
+            logger.warning(
+                "Sell of %.8f %s exceeds open lots by %.8f (missing buy history "
+                "or bad data) | %s",
+                amount,
+                asset,
+                unmatched,
+                rec.get("date"),
+            )
+        proceeds, fee = rec["proceeds"], rec["fee"]
+        rows.append(
+            (
+                asset,
+                rec["date"],
+                amount,
+                proceeds,
+                fee,
+                basis,
+                proceeds - fee - basis,
+                first,
+                touched,
+                max(unmatched, 0.0),
+            )
+        )
+    logger.info(
+        "Lot FIFO replay | %d buys, %d disposals, %d assets",
+        n_buys,
+        len(rows),
+        len(queues),
+    )
+    return book
+
+
+def main(argv: list[str] | None = None) -> None:
+    import portfolio_summary
+    import report_io
+    import storage
+
+    parser = argparse.ArgumentParser(
+        description="Lot-level FIFO: realised P&L per disposal + open lots"
+    )
+    parser.add_argument("--out-dir", default=storage.BALANCES_DIR)
+    args = parser.parse_args(argv)
+
+    book = replay_events(portfolio_summary.trade_events(storage.load_trades()))
+    for name, df in ((DISPOSALS_FILE, book.disposals()), (LOTS_FILE, book.lots())):
+        path = os.path.join(args.out_dir, name)
+        report_io.write_csv(path, report_io.iter_chunks(df), sep=";", index=False)
+        logger.info("%d rows written to %s", len(df), path)
+    realised = book.realised()
+    for asset in sorted(realised):
+        print(f"{asset:<10}{realised[asset]:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,7 @@ os.makedirs(DATA_DIR, exist_ok=True)
 
 KEYFILE = os.path.join(DATA_DIR, "kraken.key")  # encrypted API keys
 MASTER_FILE = os.path.join(DATA_DIR, ".master")  # master key file
+ACCOUNT = None  # named key set in use (None = default kraken.key)
 
 
 class KeysError(Exception):
@@ -52,6 +53,27 @@ def _get_fernet(create_if_missing: bool = False) -> Fernet:
     return Fernet(_get_master_key(create_if_missing))
 
 
+# ---------------- Named key sets ---------------- #
+
+
+def account_keyfile(account: str | None) -> str:
+    """Encrypted key file of a named account (kraken-<account>.key)."""
+    if not account:
+        return os.path.join(DATA_DIR, "kraken.key")
+    return os.path.join(DATA_DIR, f"kraken-{account}.key")
+
+
+def use_account(account: str | None):
+    """
+    Switch save_keys()/load_keys() to the key set of `account` (None = default).
+    All key sets share the same master key. For a named account the env
+    fallback is KRAKEN_API_KEY_<ACCOUNT> / KRAKEN_API_SECRET_<ACCOUNT>.
+    """
+    global KEYFILE, ACCOUNT
+    KEYFILE = account_keyfile(account)
+    ACCOUNT = account or None
+
+
 # ---------------- API Keys ---------------- #
 
 
@@ -109,8 +131,9 @@ def load_keys() -> tuple[str, str]:
             return lines[0], lines[1]
 
     # 3. Environment variables
-    api_key = os.getenv("KRAKEN_API_KEY")
-    api_secret = os.getenv("KRAKEN_API_SECRET")
+    suffix = f"_{ACCOUNT.upper().replace('-', '_')}" if ACCOUNT else ""
+    api_key = os.getenv(f"KRAKEN_API_KEY{suffix}")
+    api_secret = os.getenv(f"KRAKEN_API_SECRET{suffix}")
     if api_key and api_secret:
         return api_key.strip(), api_secret.strip()
 
@@ -1,13 +1,18 @@
 # ledger_asset_report.py
 import argparse
+import json
 import logging
 import os
-import time
-from datetime import date, datetime, timezone
-from collections import defaultdict
-from typing import Any, DefaultDict
+import sqlite3
+from collections.abc import Iterable
+from datetime import date
+from typing import Any
 
 import pandas as pd
+import report_engine
+import report_io
+import report_long
+import report_rollup
 import storage
 
 LEDGER_ASSET_FILE = os.path.join(storage.BALANCES_DIR, "ledger_asset_report.csv")
@@ -18,92 +23,193 @@ if not logger.handlers:
     )
 
 
-def build_asset_report(entries: dict[str, Any], days: int = 7) -> pd.DataFrame:
-    """Aggregate received assets by day (all buys)."""
-    if not entries:
-        return pd.DataFrame()
+DAILY_COLUMNS = ["Date", "asset", "amount"]
+
+
+def _daily_rows(
+    db_path: str,
+    first: str,
+    last: str | None = None,
+    dates: Iterable[str] | None = None,
+) -> pd.DataFrame:
+    """`asset_daily` rows (maintained by storage on insert) with first <= date_iso
+    (<= last, in `dates` if given), one range SELECT."""
+    if not os.path.exists(db_path):
+        return pd.DataFrame(columns=DAILY_COLUMNS)
+    conn = sqlite3.connect(db_path)
+    try:
+        query, params = (
+            "SELECT date_iso, asset, amount FROM asset_daily WHERE date_iso >= ?",
+            [first],
+        )
+        if last is not None:
+            query += " AND date_iso <= ?"
+            params.append(last)
+        if dates is not None:
+            query += " AND date_iso IN (SELECT value FROM json_each(?))"
+            params.append(json.dumps(sorted(dates)))
+        rows = conn.execute(query, params).fetchall()
+    except sqlite3.OperationalError as e:
+        logger.warning("asset_daily table not available in %s: %s", db_path, e)
+        return pd.DataFrame(columns=DAILY_COLUMNS)
+    finally:
+        conn.close()
+    return pd.DataFrame(rows, columns=DAILY_COLUMNS)
+
 
-    cutoff = time.time() - days * 86400
-    filtered = {}
-    for txid, e in entries.items():
-        try:
-            ts = float(e.get("time", 0))
-        except (TypeError, ValueError):
-            logger.debug(
-                "Skipping ledger entry %s: unparsable time value %r",
-                txid,
-                e.get("time"),
-            )
-            continue
-        if ts >= cutoff:
-            filtered[txid] = e
-
-    if not filtered:
+def _pivot(daily: pd.DataFrame) -> pd.DataFrame:
+    """Report frame from daily-table rows; `Date` may also be a period start
+    (report_rollup), rows sharing a Date and asset are summed. Asset columns
+    keep the in-memory builder's first-seen order: by the first Date an
+    asset appears on, alphabetical among assets first seen the same day."""
+    if daily.empty:
         return pd.DataFrame()
+    first_seen = daily.sort_values(["Date", "asset"]).drop_duplicates("asset")
+    df = daily.pivot_table(
+        index="Date", columns="asset", values="amount", aggfunc="sum", fill_value=0.0
+    )
+    df = df.reset_index()
+    df.columns.name = None
+    df = df[["Date", *first_seen["asset"]]]
+
+    df["Date"] = pd.to_datetime(df["Date"])
+    df.sort_values("Date", inplace=True)
+    df.reset_index(drop=True, inplace=True)
+    for a in [c for c in df.columns if c != "Date"]:
+        df[a] = df[a].round(8)
+    return df
+
+
+def _build_from_db(
+    db_path: str,
+    days: int,
+    dates: Iterable[str] | None = None,
+    start: report_engine.DateLike | None = None,
+    end: report_engine.DateLike | None = None,
+) -> pd.DataFrame:
+    """Range SELECT on `asset_daily` + pivot."""
+    first, last = report_engine.date_bounds(days, start, end)
+    return _pivot(_daily_rows(db_path, first, last, dates))
+
 
-    groups: DefaultDict[str, list[dict[str, Any]]] = defaultdict(list)
-    for txid, e in filtered.items():
-        ref = str(e.get("refid") or txid)
-        groups[ref].append(e)
+class AssetReport(report_engine.Aggregator):
+    """Crypto received per day (buys, staking, deposits - any non-EUR inflow)."""
 
-    daily: dict[date, dict[str, Any]] = {}
+    name = "asset"
+    daily_table = "asset_daily"
+    metrics = tuple(DAILY_COLUMNS[2:])
+    totals = ()
 
-    for ref, items in groups.items():
+    def __init__(self) -> None:
+        self.daily: dict[date, dict[str, Any]] = {}
+
+    def add(self, refid: str, legs: list[report_engine.Leg]) -> None:
         receives = [
-            i
-            for i in items
-            if float(i.get("amount", 0)) > 0 and i.get("asset") not in {"ZEUR", "EUR"}
+            leg
+            for leg in legs
+            if leg.amount > 0 and leg.asset not in report_engine.EUR_ASSETS
         ]
         if not receives:
-            continue
+            return
 
-        first = receives[0]
-        if first.get("date"):
-            date_obj = datetime.fromisoformat(first["date"]).date()
-        else:
-            ts = float(first.get("time", 0))
-            date_obj = datetime.fromtimestamp(ts, tz=timezone.utc).date()
+        date_obj = receives[0].date
+        daily_row = self.daily.setdefault(date_obj, {"Date": date_obj})
+        for r in receives:
+            daily_row[r.asset] = daily_row.get(r.asset, 0.0) + r.amount
 
-        if date_obj not in daily:
-            daily[date_obj] = {"Date": date_obj}
+    def result(self) -> pd.DataFrame:
+        df = pd.DataFrame(list(self.daily.values()))
+        df = df.fillna(0.0)
 
-        for r in receives:
-            asset = str(r.get("asset"))
-            amt = float(r.get("amount", 0))
-            daily[date_obj][asset] = daily[date_obj].get(asset, 0.0) + amt
+        if "Date" in df.columns:
+            df["Date"] = pd.to_datetime(df["Date"])
+            df.sort_values("Date", inplace=True)
+            df.reset_index(drop=True, inplace=True)
 
-    rows = list(daily.values())
-    df = pd.DataFrame(rows)
-    df = df.fillna(0.0)
+        asset_cols = [c for c in df.columns if c != "Date"]
+        for a in asset_cols:
+            df[a] = df[a].round(8)
+        return df
 
-    if "Date" in df.columns:
-        df["Date"] = pd.to_datetime(df["Date"])
-        df.sort_values("Date", inplace=True)
-        df.reset_index(drop=True, inplace=True)
+    @classmethod
+    def from_db(
+        cls,
+        db_path: str,
+        days: int,
+        dates: Iterable[str] | None = None,
+        start: report_engine.DateLike | None = None,
+        end: report_engine.DateLike | None = None,
+    ) -> pd.DataFrame:
+        return _build_from_db(db_path, days, dates, start, end)
 
-    asset_cols = [c for c in df.columns if c != "Date"]
-    for a in asset_cols:
-        df[a] = df[a].round(8)
+    @classmethod
+    def daily_rows(
+        cls, db_path: str, first: str, last: str | None = None
+    ) -> pd.DataFrame:
+        return _daily_rows(db_path, first, last)
+
+    @classmethod
+    def pivot(cls, daily: pd.DataFrame) -> pd.DataFrame:
+        return _pivot(daily)
 
-    return df
+
+def build_asset_report(
+    source: dict[str, Any] | str,
+    days: int = 7,
+    start: report_engine.DateLike | None = None,
+    end: report_engine.DateLike | None = None,
+    granularity: str = "day",
+    layout: str = "wide",
+) -> pd.DataFrame:
+    """Aggregate received assets by day (all buys).
+
+    `source` is either the ledger DB path (reads `asset_daily` for the last
+    `days` calendar days) or an entries dict (rolling `days * 86400` cutoff).
+    To build several reports in one ledger pass use report_engine.build_reports().
+    `start`/`end` (dates or ISO strings) select the UTC calendar days
+    start..end instead, through the same indexed date range.
+    `granularity` week/month/year rolls the daily table up per period
+    (report_rollup; DB source only). `layout="long"` returns
+    (Date, asset, metric, value) rows instead of one column per asset
+    (report_long; DB source only).
+    """
+    if layout not in report_long.LAYOUTS:
+        raise ValueError(f"layout must be one of {report_long.LAYOUTS}")
+    if layout == "long":
+        if not isinstance(source, str):
+            raise ValueError("long reports are built from the ledger DB")
+        return report_long.build_long(
+            AssetReport, source, days, start, end, granularity
+        )
+    if granularity != "day":
+        if not isinstance(source, str):
+            raise ValueError("rollups are built from the ledger DB")
+        return report_rollup.build_rollup(
+            AssetReport, source, granularity, days, start, end
+        )
+    return report_engine.build_reports(source, [AssetReport], days, start, end)["asset"]
 
 
 def save_asset_report(df: pd.DataFrame):
     os.makedirs(storage.BALANCES_DIR, exist_ok=True)
-    out = df.copy()
-    if "Date" in out.columns:
-        out["Date"] = pd.to_datetime(out["Date"]).dt.strftime("%d.%m.%Y")
-    out.to_csv(LEDGER_ASSET_FILE, sep=";", index=False, encoding="utf-8")
+    report_io.save_report_csv(df, LEDGER_ASSET_FILE)
     logger.info(f"ASSET report saved to {LEDGER_ASSET_FILE}")
 
 
+def refresh_asset_report(days: int = 7, db_path: str | None = None) -> int:
+    """Incrementally update LEDGER_ASSET_FILE from the daily tables: only dates
+    changed since the last refresh are rebuilt (see report_io). Returns
+    the number of report rows."""
+    return report_io.refresh_report_csv(LEDGER_ASSET_FILE, AssetReport, days, db_path)
+
+
 def update_asset_report(days: int = 7, write_csv: bool = False):
-    entries = storage.load_entries_from_db()
-    if not entries:
+    if not os.path.exists(storage.LEDGER_DB_FILE):
         logger.warning("No data for ASSET report")
         return pd.DataFrame()
 
-    df = build_asset_report(entries, days=days)
+    storage.init_db()  # creates/backfills the daily tables on older DBs
+    df = build_asset_report(storage.LEDGER_DB_FILE, days=days)
     if df.empty:
         logger.warning("ASSET report is empty")
         return df
@@ -118,16 +224,49 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--days", type=int, default=7, help="Number of days to include")
     parser.add_argument("--csv", action="store_true", help="Export to CSV")
+    parser.add_argument(
+        "--from",
+        dest="start",
+        type=date.fromisoformat,
+        help="First day (YYYY-MM-DD, UTC); with --from/--to --days is ignored",
+    )
+    parser.add_argument(
+        "--to", dest="end", type=date.fromisoformat, help="Last day (YYYY-MM-DD, UTC)"
+    )
+    parser.add_argument(
+        "--granularity",
+        choices=report_rollup.GRANULARITIES,
+        default="day",
+        help="Report rows per day (default) or rolled up per week/month/year",
+    )
+    parser.add_argument(
+        "--long",
+        action="store_true",
+        help="Rows of (date, asset, metric, value) instead of one column per asset",
+    )
     args = parser.parse_args()
 
-    entries = storage.load_entries_from_db()
-    df = build_asset_report(entries, days=args.days)
+    if os.path.exists(storage.LEDGER_DB_FILE):
+        storage.init_db()
+    df = build_asset_report(
+        storage.LEDGER_DB_FILE,
+        days=args.days,
+        start=args.start,
+        end=args.end,
+        granularity=args.granularity,
+        layout="long" if args.long else "wide",
+    )
 
     if df.empty:
         logger.warning("No data for asset report")
         return
 
-    if args.csv:
+    if args.csv and (args.long or args.granularity != "day"):
+        out = report_rollup.rollup_path(LEDGER_ASSET_FILE, args.granularity)
+        out = report_long.long_path(out) if args.long else out
+        report_io.save_report_csv(df, out)
+        logger.info(f"ASSET {args.granularity} report saved to {out}")
+    elif args.csv:
         save_asset_report(df)
     else:
         print(df)
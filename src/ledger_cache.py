@@ -0,0 +1,205 @@
+# ledger_cache.py
+"""
+Memory-mapped columnar cache of the `ledger` table for analytics.
+
+The cache holds one NumPy array per column, ordered by (time, rowid):
+  time, amount, fee            float64
+  asset, type, refid           int32 codes into the matching `*_values` array
+  txid                         fixed-width unicode
+Empty/NULL refids fall back to the txid, matching how the report builders
+and FIFO group legs (`e.get("refid") or txid`). Yearly archives
+(storage.connect()) are included, so the cache covers the full history.
+
+Arrays are stored as `.npy` files under `balances_history/.cache/ledger/`
+and opened with `mmap_mode="r"`, so loading costs a few page faults instead
+of a JSON parse per row. The cache is rebuilt only when the DB fingerprint
+(row count + max rowid + last daily_changes sequence, which also moves when
+stored entries are updated in place) differs from the one in `meta.json`.
+
+Each rebuild writes a new generation of files and then atomically replaces
+`meta.json`, so a reader never sees a half-written mix of generations.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+import storage
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
+    )
+
+CACHE_DIR = os.path.join(storage.BALANCES_DIR, ".cache", "ledger")
+META_FILE = "meta.json"
+NUMERIC_COLUMNS = ("time", "amount", "fee")
+CODED_COLUMNS = ("asset", "type", "refid")
+
+
+def _cache_dir(cache_dir: str | None) -> str:
+    return cache_dir or CACHE_DIR
+
+
+def db_fingerprint(db_path: str | None = None) -> dict[str, int] | None:
+    """
+    Cheap change detector for the ledger table: row count + max rowid, plus
+    the last daily_changes sequence for updates that keep both unchanged.
+    """
+    db_path = db_path or storage.LEDGER_DB_FILE
+    if not os.path.exists(db_path):
+        return None
+    conn = storage.connect(db_path)
+    try:
+        rows, max_rowid = conn.execute(
+            "SELECT COUNT(*), COALESCE(MAX(rowid), 0) FROM ledger"
+        ).fetchone()
+        try:
+            seq = conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM main.daily_changes"
+            ).fetchone()[0]
+        except sqlite3.OperationalError:
+            seq = 0  # DB from before migration 10
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        conn.close()
+    return {"rows": int(rows), "max_rowid": int(max_rowid), "daily_seq": int(seq)}
+
+
+def _read_meta(cache_dir: str) -> dict[str, Any] | None:
+    try:
+        with open(os.path.join(cache_dir, META_FILE), encoding="utf-8") as f:
+            meta: dict[str, Any] = json.load(f)
+            return meta
+    except (OSError, ValueError):
+        return None
+
+
+def current_generation(cache_dir: str | None = None) -> int | None:
+    """Generation recorded in `meta.json`, None without a cache."""
+    meta = _read_meta(_cache_dir(cache_dir))
+    return int(meta["generation"]) if meta and "generation" in meta else None
+
+
+def _file(cache_dir: str, name: str, generation: int) -> str:
+    return os.path.join(cache_dir, f"{name}.{generation}.npy")
+
+
+def _encode(values: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """Dictionary-encode strings -> (sorted unique values, int32 codes)."""
+    uniques, codes = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    return uniques, codes.astype(np.int32)
+
+
+def build_cache(
+    db_path: str | None = None, cache_dir: str | None = None
+) -> dict[str, Any]:
+    """Read the ledger columns from SQLite and write a fresh cache generation."""
+    db_path = db_path or storage.LEDGER_DB_FILE
+    cache_dir = _cache_dir(cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    fingerprint = db_fingerprint(db_path) or {"rows": 0, "max_rowid": 0, "daily_seq": 0}
+    conn = storage.connect(db_path)
+    try:
+        rows = conn.execute(
+            """
+            SELECT txid, COALESCE(NULLIF(refid, ''), txid), time,
+                   COALESCE(type, ''), COALESCE(asset, ''), amount, fee
+            FROM ledger
+            ORDER BY time, rowid
+            """
+        ).fetchall()
+    finally:
+        conn.close()
+
+    txids, refids, times, types, assets, amounts, fees = (
+        zip(*rows) if rows else ([],) * 7
+    )
+    arrays: dict[str, np.ndarray] = {
+        "txid": np.asarray(txids, dtype=str),
+        "time": np.asarray(times, dtype=np.float64),
+        "amount": np.asarray(amounts, dtype=np.float64),
+        "fee": np.asarray(fees, dtype=np.float64),
+    }
+    for name, values in (("asset", assets), ("type", types), ("refid", refids)):
+        uniques, codes = _encode(list(values))
+        arrays[name] = codes
+        arrays[f"{name}_values"] = uniques
+
+    old_meta = _read_meta(cache_dir)
+    old_generation = old_meta.get("generation") if old_meta else None
+    generation = (old_generation or 0) + 1
+    for name, arr in arrays.items():
+        np.save(_file(cache_dir, name, generation), arr, allow_pickle=False)
+
+    meta = {"generation": generation, "fingerprint": fingerprint}
+    fd, tmp = tempfile.mkstemp(prefix=META_FILE + ".tmp", dir=cache_dir)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(cache_dir, META_FILE))
+
+    if old_generation is not None:
+        for name in arrays:
+            try:
+                os.remove(_file(cache_dir, name, old_generation))
+            except OSError:  # nosec B110 - stale generation may be partially gone
+                pass
+
+    logger.info(
+        "Columnar ledger cache rebuilt (%d rows, generation %d)", len(rows), generation
+    )
+    return open_generation(cache_dir, generation)
+
+
+def open_generation(cache_dir: str, generation: int) -> dict[str, Any]:
+    """Memory-map one cache generation; other processes (report_runner
+    workers) open the same files without copying or rebuilding them."""
+    names: tuple[str, ...] = ("txid",) + NUMERIC_COLUMNS
+    names += tuple(c for col in CODED_COLUMNS for c in (col, f"{col}_values"))
+    return {
+        name: np.load(_file(cache_dir, name, generation), mmap_mode="r")
+        for name in names
+    }
+
+
+def load_ledger_columns(
+    db_path: str | None = None, cache_dir: str | None = None, rebuild: bool = False
+) -> dict[str, Any] | None:
+    """
+    Return the memory-mapped ledger columns, rebuilding the cache first if
+    the DB fingerprint changed (or `rebuild=True`). None if there is no DB.
+    """
+    db_path = db_path or storage.LEDGER_DB_FILE
+    cache_dir = _cache_dir(cache_dir)
+    fingerprint = db_fingerprint(db_path)
+    if fingerprint is None:
+        return None
+
+    meta = _read_meta(cache_dir)
+    if not rebuild and meta and meta.get("fingerprint") == fingerprint:
+        try:
+            return open_generation(cache_dir, int(meta["generation"]))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Columnar cache unreadable, rebuilding: %s", e)
+    return build_cache(db_path, cache_dir)
+
+
+def to_frame(columns: dict[str, Any]) -> pd.DataFrame:
+    """View the cached columns as a DataFrame (string columns as categoricals)."""
+    data: dict[str, Any] = {"txid": columns["txid"]}
+    for name in NUMERIC_COLUMNS:
+        data[name] = columns[name]
+    for name in CODED_COLUMNS:
+        data[name] = pd.Categorical.from_codes(
+            np.asarray(columns[name]), categories=pd.Index(columns[f"{name}_values"])
+        )
+    return pd.DataFrame(data)
@@ -1,13 +1,18 @@
 # ledger_eur_report.py
 import os
+import json
 import logging
-import time
+import sqlite3
 import argparse
-from typing import Any, DefaultDict
-from collections import defaultdict
-from datetime import date, datetime, timezone
+from collections.abc import Iterable
+from typing import Any
+from datetime import date
 
 import pandas as pd
+import report_engine
+import report_io
+import report_long
+import report_rollup
 import storage
 
 LEDGER_EUR_FILE = os.path.join(storage.BALANCES_DIR, "ledger_eur_report.csv")
@@ -17,7 +22,8 @@ if not logger.handlers:
         level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
     )
 
-EUR_ASSETS = {"ZEUR", "EUR"}
+EUR_ASSETS = report_engine.EUR_ASSETS
+EUR_TYPES = {"receive", "spend", "trade"}
 
 
 # ledger_eur_report.py (relevant parts)
@@ -25,135 +31,224 @@ EUR_ASSETS = {"ZEUR", "EUR"}
 # ... other imports and constants remain
 
 
-def build_eur_report(entries: dict[str, Any], days: int = 7) -> pd.DataFrame:
-    """Build a DataFrame where Date is a real datetime (not string)."""
-    if not entries:
+DAILY_COLUMNS = ["Date", "asset", "spent", "fee"]
+
+
+def _daily_rows(
+    db_path: str,
+    first: str,
+    last: str | None = None,
+    dates: Iterable[str] | None = None,
+) -> pd.DataFrame:
+    """`eur_daily` rows (maintained by storage on insert) with first <= date_iso
+    (<= last, in `dates` if given), one range SELECT."""
+    if not os.path.exists(db_path):
+        return pd.DataFrame(columns=DAILY_COLUMNS)
+    conn = sqlite3.connect(db_path)
+    try:
+        query, params = (
+            "SELECT date_iso, asset, spent_eur, fee FROM eur_daily WHERE date_iso >= ?",
+            [first],
+        )
+        if last is not None:
+            query += " AND date_iso <= ?"
+            params.append(last)
+        if dates is not None:
+            query += " AND date_iso IN (SELECT value FROM json_each(?))"
+            params.append(json.dumps(sorted(dates)))
+        rows = conn.execute(query, params).fetchall()
+    except sqlite3.OperationalError as e:
+        logger.warning("eur_daily table not available in %s: %s", db_path, e)
+        return pd.DataFrame(columns=DAILY_COLUMNS)
+    finally:
+        conn.close()
+    return pd.DataFrame(rows, columns=DAILY_COLUMNS)
+
+
+def _pivot(daily: pd.DataFrame) -> pd.DataFrame:
+    """Report frame from daily-table rows; `Date` may also be a period start
+    (report_rollup), rows sharing a Date and asset are summed."""
+    if daily.empty:
         return pd.DataFrame()
+    df = daily.pivot_table(
+        index="Date", columns="asset", values="spent", aggfunc="sum", fill_value=0.0
+    )
+    assets = sorted(df.columns)
+    totals = daily.groupby("Date")[["fee", "spent"]].sum()
+    df["Total Fee"] = totals["fee"]
+    df["Total Spent EUR"] = totals["spent"]
+    df = df.reset_index().reindex(
+        columns=["Date", "Total Fee", "Total Spent EUR"] + assets
+    )
+    df.columns.name = None
 
-    cutoff = time.time() - days * 86400
-    filtered = {}
-    for txid, e in entries.items():
-        try:
-            ts = float(e.get("time", 0))
-        except (
-            Exception
-        ):  # nosec B112 - skip malformed ledger entry, continue processing
-            continue
-        typ = str(e.get("type") or "").lower()
-        if ts >= cutoff and typ in {"receive", "spend", "trade"}:
-            out = dict(e)
-            out["_txid"] = txid
-            out["_time"] = ts
-            out["_type"] = typ
-            out["_asset"] = out.get("asset")
-            filtered[txid] = out
-
-    if not filtered:
-        return pd.DataFrame()
+    df["Date"] = pd.to_datetime(df["Date"])
+    df.sort_values("Date", inplace=True)
+    df.reset_index(drop=True, inplace=True)
+    for col in ["Total Fee", "Total Spent EUR"] + assets:
+        df[col] = df[col].round(2)
+    return df
 
-    groups: DefaultDict[str, list[dict[str, Any]]] = defaultdict(list)
-    for txid, e in filtered.items():
-        ref = str(e.get("refid") or txid)
-        groups[ref].append(e)
 
-    # accumulate per date (use datetime.date objects as keys)
-    daily: dict[date, dict[str, Any]] = {}
+def _build_from_db(
+    db_path: str,
+    days: int,
+    dates: Iterable[str] | None = None,
+    start: report_engine.DateLike | None = None,
+    end: report_engine.DateLike | None = None,
+) -> pd.DataFrame:
+    """Range SELECT on `eur_daily` + pivot."""
+    first, last = report_engine.date_bounds(days, start, end)
+    return _pivot(_daily_rows(db_path, first, last, dates))
 
-    for ref, items in groups.items():
-        spends = [
-            it
-            for it in items
-            if it["_asset"] in EUR_ASSETS and float(it.get("amount", 0)) < 0
-        ]
-        receives = [
-            it
-            for it in items
-            if it["_asset"] not in EUR_ASSETS and float(it.get("amount", 0)) > 0
-        ]
 
-        if not spends or not receives:
-            continue
+class EurReport(report_engine.Aggregator):
+    """EUR spent on buys (receive/spend/trade refids: EUR out, crypto in) per day."""
 
-        # Prefer canonical date (from DB) if present, else compute from timestamp (UTC)
-        first_spend = spends[0]
-        if first_spend.get("date"):
-            date_obj = datetime.fromisoformat(first_spend["date"]).date()
-        else:
-            ts = float(first_spend["_time"])
-            date_obj = datetime.fromtimestamp(ts, tz=timezone.utc).date()
+    name = "eur"
+    daily_table = "eur_daily"
+    metrics = tuple(DAILY_COLUMNS[2:])
+    totals = ("Total Fee", "Total Spent EUR")
+
+    def __init__(self) -> None:
+        self.daily: dict[date, dict[str, Any]] = {}
 
-        total_spent = sum(-float(s.get("amount", 0)) for s in spends)
-        total_fee = sum(float(s.get("fee", 0)) for s in spends)
+    def add(self, refid: str, legs: list[report_engine.Leg]) -> None:
+        legs = [leg for leg in legs if leg.type in EUR_TYPES]
+        spends = [leg for leg in legs if leg.asset in EUR_ASSETS and leg.amount < 0]
+        receives = [
+            leg for leg in legs if leg.asset not in EUR_ASSETS and leg.amount > 0
+        ]
+        if not spends or not receives:
+            return
 
-        recv_amounts = [abs(float(r.get("amount", 0))) for r in receives]
-        total_recv_amount = sum(recv_amounts) if recv_amounts else 0.0
+        date_obj = spends[0].date
+        total_spent = sum(-s.amount for s in spends)
+        total_fee = sum(s.fee for s in spends)
+        total_recv_amount = sum(abs(r.amount) for r in receives)
 
         alloc: dict[str, float] = {}
         if total_recv_amount > 0 and len(receives) > 1:
-            for r, amt in zip(receives, recv_amounts):
-                asset = str(r.get("asset"))
-                alloc[asset] = alloc.get(asset, 0.0) + total_spent * (
-                    amt / total_recv_amount
+            for r in receives:
+                alloc[r.asset] = alloc.get(r.asset, 0.0) + total_spent * (
+                    abs(r.amount) / total_recv_amount
                 )
         else:
-            first_asset = str(receives[0].get("asset"))
-            alloc[first_asset] = alloc.get(first_asset, 0.0) + total_spent
+            alloc[receives[0].asset] = total_spent
 
-        if date_obj not in daily:
-            daily[date_obj] = {
+        if date_obj not in self.daily:
+            self.daily[date_obj] = {
                 "Date": date_obj,
                 "Total Fee": 0.0,
                 "Total Spent EUR": 0.0,
             }
-        daily_row = daily[date_obj]
+        daily_row = self.daily[date_obj]
         daily_row["Total Fee"] += total_fee
         daily_row["Total Spent EUR"] += total_spent
         for asset, eur_val in alloc.items():
             daily_row[asset] = daily_row.get(asset, 0.0) + eur_val
 
-    if not daily:
-        return pd.DataFrame()
-
-    rows = list(daily.values())
-    df = pd.DataFrame(rows)
-
-    assets = sorted(
-        [c for c in df.columns if c not in {"Date", "Total Fee", "Total Spent EUR"}]
-    )
-    ordered_cols = ["Date", "Total Fee", "Total Spent EUR"] + assets
-    df = df.reindex(columns=ordered_cols).fillna(0.0)
-
-    # Ensure Date is datetime (not string), sort by it
-    df["Date"] = pd.to_datetime(df["Date"])
-    df.sort_values("Date", inplace=True)
-    df.reset_index(drop=True, inplace=True)
+    def result(self) -> pd.DataFrame:
+        if not self.daily:
+            return pd.DataFrame()
+        df = pd.DataFrame(list(self.daily.values()))
+
+        assets = sorted(
+            [c for c in df.columns if c not in {"Date", "Total Fee", "Total Spent EUR"}]
+        )
+        ordered_cols = ["Date", "Total Fee", "Total Spent EUR"] + assets
+        df = df.reindex(columns=ordered_cols).fillna(0.0)
+
+        # Ensure Date is datetime (not string), sort by it
+        df["Date"] = pd.to_datetime(df["Date"])
+        df.sort_values("Date", inplace=True)
+        df.reset_index(drop=True, inplace=True)
+
+        # numeric rounding
+        df["Total Fee"] = df["Total Fee"].round(2)
+        df["Total Spent EUR"] = df["Total Spent EUR"].round(2)
+        for a in assets:
+            df[a] = df[a].round(2)
+        return df
 
-    # numeric rounding
-    df["Total Fee"] = df["Total Fee"].round(2)
-    df["Total Spent EUR"] = df["Total Spent EUR"].round(2)
-    for a in assets:
-        df[a] = df[a].round(2)
-
-    return df
+    @classmethod
+    def from_db(
+        cls,
+        db_path: str,
+        days: int,
+        dates: Iterable[str] | None = None,
+        start: report_engine.DateLike | None = None,
+        end: report_engine.DateLike | None = None,
+    ) -> pd.DataFrame:
+        return _build_from_db(db_path, days, dates, start, end)
+
+    @classmethod
+    def daily_rows(
+        cls, db_path: str, first: str, last: str | None = None
+    ) -> pd.DataFrame:
+        return _daily_rows(db_path, first, last)
+
+    @classmethod
+    def pivot(cls, daily: pd.DataFrame) -> pd.DataFrame:
+        return _pivot(daily)
+
+
+def build_eur_report(
+    source: dict[str, Any] | str,
+    days: int = 7,
+    start: report_engine.DateLike | None = None,
+    end: report_engine.DateLike | None = None,
+    granularity: str = "day",
+    layout: str = "wide",
+) -> pd.DataFrame:
+    """Build a DataFrame where Date is a real datetime (not string).
+
+    `source` is either the ledger DB path - the report is then read from the
+    `eur_daily` table for the last `days` calendar days - or an entries dict,
+    aggregated in memory with a rolling `days * 86400` cutoff. To build
+    several reports in one ledger pass use report_engine.build_reports().
+    `start`/`end` (dates or ISO strings) select the UTC calendar days
+    start..end instead, through the same indexed date range.
+    `granularity` week/month/year rolls the daily table up per period
+    (report_rollup; DB source only). `layout="long"` returns
+    (Date, asset, metric, value) rows instead of one column per asset
+    (report_long; DB source only).
+    """
+    if layout not in report_long.LAYOUTS:
+        raise ValueError(f"layout must be one of {report_long.LAYOUTS}")
+    if layout == "long":
+        if not isinstance(source, str):
+            raise ValueError("long reports are built from the ledger DB")
+        return report_long.build_long(EurReport, source, days, start, end, granularity)
+    if granularity != "day":
+        if not isinstance(source, str):
+            raise ValueError("rollups are built from the ledger DB")
+        return report_rollup.build_rollup(
+            EurReport, source, granularity, days, start, end
+        )
+    return report_engine.build_reports(source, [EurReport], days, start, end)["eur"]
 
 
 def save_eur_report(df: pd.DataFrame):
     os.makedirs(storage.BALANCES_DIR, exist_ok=True)
-    # copy and format Date for human CSV
-    out = df.copy()
-    if "Date" in out.columns:
-        out["Date"] = pd.to_datetime(out["Date"]).dt.strftime("%d.%m.%Y")
-    out.to_csv(LEDGER_EUR_FILE, sep=";", index=False, encoding="utf-8")
+    report_io.save_report_csv(df, LEDGER_EUR_FILE)
     logger.info(f"EUR report saved to {LEDGER_EUR_FILE}")
 
 
+def refresh_eur_report(days: int = 7, db_path: str | None = None) -> int:
+    """Incrementally update LEDGER_EUR_FILE from the daily tables: only dates
+    changed since the last refresh are rebuilt (see report_io). Returns
+    the number of report rows."""
+    return report_io.refresh_report_csv(LEDGER_EUR_FILE, EurReport, days, db_path)
+
+
 def update_eur_report(days: int = 7, write_csv: bool = False):
-    entries = storage.load_entries_from_db()
-    if not entries:
+    if not os.path.exists(storage.LEDGER_DB_FILE):
         logger.warning("No data for EUR report")
         return pd.DataFrame()
 
-    df = build_eur_report(entries, days=days)
+    storage.init_db()  # creates/backfills the daily tables on older DBs
+    df = build_eur_report(storage.LEDGER_DB_FILE, days=days)
     if df.empty:
         logger.warning("EUR report is empty")
         return df
@@ -168,18 +263,49 @@ def main():
     parser = argparse.ArgumentParser(description="Build EUR ledger report from DB")
     parser.add_argument("--days", type=int, default=7, help="Number of days to include")
     parser.add_argument("--csv", action="store_true", help="Export to CSV")
+    parser.add_argument(
+        "--from",
+        dest="start",
+        type=date.fromisoformat,
+        help="First day (YYYY-MM-DD, UTC); with --from/--to --days is ignored",
+    )
+    parser.add_argument(
+        "--to", dest="end", type=date.fromisoformat, help="Last day (YYYY-MM-DD, UTC)"
+    )
+    parser.add_argument(
+        "--granularity",
+        choices=report_rollup.GRANULARITIES,
+        default="day",
+        help="Report rows per day (default) or rolled up per week/month/year",
+    )
+    parser.add_argument(
+        "--long",
+        action="store_true",
+        help="Rows of (date, asset, metric, value) instead of one column per asset",
+    )
     args = parser.parse_args()
 
-    # entries = storage.load_entries() # backup method from JSON file
-    entries = storage.load_entries_from_db()
-    df = build_eur_report(entries, days=args.days)
+    if os.path.exists(storage.LEDGER_DB_FILE):
+        storage.init_db()
+    df = build_eur_report(
+        storage.LEDGER_DB_FILE,
+        days=args.days,
+        start=args.start,
+        end=args.end,
+        granularity=args.granularity,
+        layout="long" if args.long else "wide",
+    )
 
     if df.empty:
         logger.warning("No data for asset report")
         return df  # instead of just `return`
 
     if args.csv:
-        out = os.path.join(storage.BALANCES_DIR, "ledger_eur_report.csv")
+        out = report_rollup.rollup_path(
+            os.path.join(storage.BALANCES_DIR, "ledger_eur_report.csv"),
+            args.granularity,
+        )
+        out = report_long.long_path(out) if args.long else out
         os.makedirs(storage.BALANCES_DIR, exist_ok=True)
         df.to_csv(out, sep=";", index=False, encoding="utf-8")
         logger.info(f"EUR report saved to {out}")
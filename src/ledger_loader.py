@@ -3,6 +3,7 @@ import time
 import random
 import logging
 import argparse
+from collections.abc import Callable, Iterable
 from datetime import datetime, timezone
 from typing import Any
 
@@ -105,6 +106,7 @@ def fetch_ledger(
     *,
     since_ts: int | None = None,
     stop_on_txids: set[str] | None = None,
+    known_txids_lookup: Callable[[Iterable[str]], set[str]] | None = None,
     max_consecutive_page_failures: int = 3,
 ) -> dict[str, Any]:
     """
@@ -117,6 +119,11 @@ def fetch_ledger(
       as soon as any fetched txid matches one from that set (avoids duplicates).
       Already-known txids are NOT included in the returned dict.
 
+    - known_txids_lookup (e.g. storage.existing_txids) is the scalable form
+      of stop_on_txids: it is called once per page with that page's txids
+      and returns the ones already stored, so nobody has to load every
+      known txid into memory up front.
+
     - Transient errors (timeouts, rate limits, connection drops) no longer
       abort the whole fetch. Each page is retried with exponential backoff
       + random jitter (see _fetch_page_with_retry). The fetch only stops
@@ -183,9 +190,14 @@ def fetch_ledger(
         except Exception:
             items_sorted = items
 
+        page_known = (
+            known_txids_lookup(txid for txid, _ in items_sorted)
+            if known_txids_lookup
+            else set()
+        )
         page_new = 0
         for txid, entry in items_sorted:
-            if txid in stop_on_txids_local:
+            if txid in stop_on_txids_local or txid in page_known:
                 known_hit_count += 1
                 found_known = True
                 continue
@@ -1,13 +1,18 @@
 # ledger_sell_report.py
 import argparse
+import json
 import logging
 import os
-import time
-from datetime import date, datetime, timezone
-from collections import defaultdict
-from typing import Any, DefaultDict
+import sqlite3
+from collections.abc import Iterable
+from datetime import date
+from typing import Any
 
 import pandas as pd
+import report_engine
+import report_io
+import report_long
+import report_rollup
 import storage
 
 LEDGER_SELL_FILE = os.path.join(storage.BALANCES_DIR, "ledger_sell_report.csv")
@@ -17,116 +22,208 @@ if not logger.handlers:
         level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
     )
 
-EUR_ASSETS = {"ZEUR", "EUR"}
-
-
-def build_sell_report(entries: dict[str, Any], days: int = 7) -> pd.DataFrame:
-    """Aggregate sells (crypto → EUR)."""
-    if not entries:
+EUR_ASSETS = report_engine.EUR_ASSETS
+
+
+DAILY_COLUMNS = ["Date", "asset", "amount", "eur", "fee"]
+
+
+def _daily_rows(
+    db_path: str,
+    first: str,
+    last: str | None = None,
+    dates: Iterable[str] | None = None,
+) -> pd.DataFrame:
+    """`sell_daily` rows (maintained by storage on insert) with first <= date_iso
+    (<= last, in `dates` if given), one range SELECT."""
+    if not os.path.exists(db_path):
+        return pd.DataFrame(columns=DAILY_COLUMNS)
+    conn = sqlite3.connect(db_path)
+    try:
+        query, params = (
+            "SELECT date_iso, asset, amount, eur, fee FROM sell_daily WHERE date_iso >= ?",
+            [first],
+        )
+        if last is not None:
+            query += " AND date_iso <= ?"
+            params.append(last)
+        if dates is not None:
+            query += " AND date_iso IN (SELECT value FROM json_each(?))"
+            params.append(json.dumps(sorted(dates)))
+        rows = conn.execute(query, params).fetchall()
+    except sqlite3.OperationalError as e:
+        logger.warning("sell_daily table not available in %s: %s", db_path, e)
+        return pd.DataFrame(columns=DAILY_COLUMNS)
+    finally:
+        conn.close()
+    return pd.DataFrame(rows, columns=DAILY_COLUMNS)
+
+
+def _pivot(daily: pd.DataFrame) -> pd.DataFrame:
+    """Report frame from daily-table rows; `Date` may also be a period start
+    (report_rollup), rows sharing a Date and asset are summed."""
+    if daily.empty:
         return pd.DataFrame()
+    df = daily.pivot_table(
+        index="Date", columns="asset", values="amount", aggfunc="sum", fill_value=0.0
+    )
+    assets = sorted(df.columns)
+    totals = daily.groupby("Date")[["eur", "fee"]].sum()
+    df["Total EUR"] = totals["eur"]
+    df["Total Fee"] = totals["fee"]
+    df = df.reset_index().reindex(columns=["Date", "Total EUR", "Total Fee"] + assets)
+    df.columns.name = None
+
+    df["Date"] = pd.to_datetime(df["Date"])
+    df.sort_values("Date", inplace=True)
+    df.reset_index(drop=True, inplace=True)
+    df["Total EUR"] = df["Total EUR"].round(2)
+    df["Total Fee"] = df["Total Fee"].round(2)
+    for a in assets:
+        df[a] = df[a].round(8)
+    return df
 
-    cutoff = time.time() - days * 86400
-    filtered = {}
-    for txid, e in entries.items():
-        try:
-            ts = float(e.get("time", 0))
-        except (TypeError, ValueError):
-            logger.debug(
-                "Skipping ledger entry %s: unparsable time value %r",
-                txid,
-                e.get("time"),
-            )
-            continue
-        if ts >= cutoff:
-            filtered[txid] = e
-
-    if not filtered:
-        return pd.DataFrame()
 
-    groups: DefaultDict[str, list[dict[str, Any]]] = defaultdict(list)
-    for txid, e in filtered.items():
-        ref = str(e.get("refid") or txid)
-        groups[ref].append(e)
-
-    daily: dict[date, dict[str, Any]] = {}
-
-    for ref, items in groups.items():
-        sells = [
-            it
-            for it in items
-            if it.get("asset") not in EUR_ASSETS and float(it.get("amount", 0)) < 0
-        ]
-        eur = [
-            it
-            for it in items
-            if it.get("asset") in EUR_ASSETS and float(it.get("amount", 0)) > 0
-        ]
+def _build_from_db(
+    db_path: str,
+    days: int,
+    dates: Iterable[str] | None = None,
+    start: report_engine.DateLike | None = None,
+    end: report_engine.DateLike | None = None,
+) -> pd.DataFrame:
+    """Range SELECT on `sell_daily` + pivot."""
+    first, last = report_engine.date_bounds(days, start, end)
+    return _pivot(_daily_rows(db_path, first, last, dates))
 
-        if not sells or not eur:
-            continue
 
-        first = sells[0]
-        if first.get("date"):
-            date_obj = datetime.fromisoformat(first["date"]).date()
-        else:
-            ts = float(first.get("time", 0))
-            date_obj = datetime.fromtimestamp(ts, tz=timezone.utc).date()
+class SellReport(report_engine.Aggregator):
+    """Crypto sold for EUR per day: amounts per asset, EUR received, fees."""
 
-        if date_obj not in daily:
-            daily[date_obj] = {"Date": date_obj, "Total EUR": 0.0, "Total Fee": 0.0}
-        daily_row = daily[date_obj]
+    name = "sell"
+    daily_table = "sell_daily"
+    metrics = tuple(DAILY_COLUMNS[2:])
+    totals = ("Total EUR", "Total Fee")
 
-        total_fee = sum(float(s.get("fee", 0)) for s in sells)
-        total_eur = sum(float(r.get("amount", 0)) for r in eur)
+    def __init__(self) -> None:
+        self.daily: dict[date, dict[str, Any]] = {}
 
-        daily_row["Total Fee"] += total_fee
-        daily_row["Total EUR"] += total_eur
+    def add(self, refid: str, legs: list[report_engine.Leg]) -> None:
+        sells = [leg for leg in legs if leg.asset not in EUR_ASSETS and leg.amount < 0]
+        eur = [leg for leg in legs if leg.asset in EUR_ASSETS and leg.amount > 0]
+        if not sells or not eur:
+            return
+
+        date_obj = sells[0].date
+        if date_obj not in self.daily:
+            self.daily[date_obj] = {
+                "Date": date_obj,
+                "Total EUR": 0.0,
+                "Total Fee": 0.0,
+            }
+        daily_row = self.daily[date_obj]
+        daily_row["Total Fee"] += sum(s.fee for s in sells)
+        daily_row["Total EUR"] += sum(r.amount for r in eur)
         for s in sells:
-            asset = str(s.get("asset"))
-            amt = abs(float(s.get("amount", 0)))
-            daily_row[asset] = daily_row.get(asset, 0.0) + amt
+            daily_row[s.asset] = daily_row.get(s.asset, 0.0) + abs(s.amount)
 
-    if not daily:
-        return pd.DataFrame()
-
-    rows = list(daily.values())
-    df = pd.DataFrame(rows)
+    def result(self) -> pd.DataFrame:
+        if not self.daily:
+            return pd.DataFrame()
+        df = pd.DataFrame(list(self.daily.values()))
 
-    assets = sorted(
-        [c for c in df.columns if c not in {"Date", "Total EUR", "Total Fee"}]
-    )
-    ordered_cols = ["Date", "Total EUR", "Total Fee"] + assets
-    df = df.reindex(columns=ordered_cols).fillna(0.0)
+        assets = sorted(
+            [c for c in df.columns if c not in {"Date", "Total EUR", "Total Fee"}]
+        )
+        ordered_cols = ["Date", "Total EUR", "Total Fee"] + assets
+        df = df.reindex(columns=ordered_cols).fillna(0.0)
 
-    if "Date" in df.columns:
         df["Date"] = pd.to_datetime(df["Date"])
         df.sort_values("Date", inplace=True)
         df.reset_index(drop=True, inplace=True)
 
-    df["Total EUR"] = df["Total EUR"].round(2)
-    df["Total Fee"] = df["Total Fee"].round(2)
-    for a in assets:
-        df[a] = df[a].round(8)
+        df["Total EUR"] = df["Total EUR"].round(2)
+        df["Total Fee"] = df["Total Fee"].round(2)
+        for a in assets:
+            df[a] = df[a].round(8)
+        return df
 
-    return df
+    @classmethod
+    def from_db(
+        cls,
+        db_path: str,
+        days: int,
+        dates: Iterable[str] | None = None,
+        start: report_engine.DateLike | None = None,
+        end: report_engine.DateLike | None = None,
+    ) -> pd.DataFrame:
+        return _build_from_db(db_path, days, dates, start, end)
+
+    @classmethod
+    def daily_rows(
+        cls, db_path: str, first: str, last: str | None = None
+    ) -> pd.DataFrame:
+        return _daily_rows(db_path, first, last)
+
+    @classmethod
+    def pivot(cls, daily: pd.DataFrame) -> pd.DataFrame:
+        return _pivot(daily)
+
+
+def build_sell_report(
+    source: dict[str, Any] | str,
+    days: int = 7,
+    start: report_engine.DateLike | None = None,
+    end: report_engine.DateLike | None = None,
+    granularity: str = "day",
+    layout: str = "wide",
+) -> pd.DataFrame:
+    """Aggregate sells (crypto → EUR).
+
+    `source` is either the ledger DB path (reads `sell_daily` for the last
+    `days` calendar days) or an entries dict (rolling `days * 86400` cutoff).
+    To build several reports in one ledger pass use report_engine.build_reports().
+    `start`/`end` (dates or ISO strings) select the UTC calendar days
+    start..end instead, through the same indexed date range.
+    `granularity` week/month/year rolls the daily table up per period
+    (report_rollup; DB source only). `layout="long"` returns
+    (Date, asset, metric, value) rows instead of one column per asset
+    (report_long; DB source only).
+    """
+    if layout not in report_long.LAYOUTS:
+        raise ValueError(f"layout must be one of {report_long.LAYOUTS}")
+    if layout == "long":
+        if not isinstance(source, str):
+            raise ValueError("long reports are built from the ledger DB")
+        return report_long.build_long(SellReport, source, days, start, end, granularity)
+    if granularity != "day":
+        if not isinstance(source, str):
+            raise ValueError("rollups are built from the ledger DB")
+        return report_rollup.build_rollup(
+            SellReport, source, granularity, days, start, end
+        )
+    return report_engine.build_reports(source, [SellReport], days, start, end)["sell"]
 
 
 def save_sell_report(df: pd.DataFrame):
     os.makedirs(storage.BALANCES_DIR, exist_ok=True)
-    out = df.copy()
-    if "Date" in out.columns:
-        out["Date"] = pd.to_datetime(out["Date"]).dt.strftime("%d.%m.%Y")
-    out.to_csv(LEDGER_SELL_FILE, sep=";", index=False, encoding="utf-8")
+    report_io.save_report_csv(df, LEDGER_SELL_FILE)
     logger.info(f"SELL report saved to {LEDGER_SELL_FILE}")
 
 
+def refresh_sell_report(days: int = 7, db_path: str | None = None) -> int:
+    """Incrementally update LEDGER_SELL_FILE from the daily tables: only dates
+    changed since the last refresh are rebuilt (see report_io). Returns
+    the number of report rows."""
+    return report_io.refresh_report_csv(LEDGER_SELL_FILE, SellReport, days, db_path)
+
+
 def update_sell_report(days: int = 7, write_csv: bool = False):
-    entries = storage.load_entries_from_db()
-    if not entries:
+    if not os.path.exists(storage.LEDGER_DB_FILE):
         logger.warning("No data for SELL report")
         return pd.DataFrame()
 
-    df = build_sell_report(entries, days=days)
+    storage.init_db()  # creates/backfills the daily tables on older DBs
+    df = build_sell_report(storage.LEDGER_DB_FILE, days=days)
     if df.empty:
         logger.warning("SELL report is empty")
         return df
@@ -141,16 +238,49 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--days", type=int, default=7, help="Number of days to include")
     parser.add_argument("--csv", action="store_true", help="Export to CSV")
+    parser.add_argument(
+        "--from",
+        dest="start",
+        type=date.fromisoformat,
+        help="First day (YYYY-MM-DD, UTC); with --from/--to --days is ignored",
+    )
+    parser.add_argument(
+        "--to", dest="end", type=date.fromisoformat, help="Last day (YYYY-MM-DD, UTC)"
+    )
+    parser.add_argument(
+        "--granularity",
+        choices=report_rollup.GRANULARITIES,
+        default="day",
+        help="Report rows per day (default) or rolled up per week/month/year",
+    )
+    parser.add_argument(
+        "--long",
+        action="store_true",
+        help="Rows of (date, asset, metric, value) instead of one column per asset",
+    )
     args = parser.parse_args()
 
-    entries = storage.load_entries_from_db()
-    df = build_sell_report(entries, days=args.days)
+    if os.path.exists(storage.LEDGER_DB_FILE):
+        storage.init_db()
+    df = build_sell_report(
+        storage.LEDGER_DB_FILE,
+        days=args.days,
+        start=args.start,
+        end=args.end,
+        granularity=args.granularity,
+        layout="long" if args.long else "wide",
+    )
 
     if df.empty:
         logger.warning("No data for sell report")
         return
 
-    if args.csv:
+    if args.csv and (args.long or args.granularity != "day"):
+        out = report_rollup.rollup_path(LEDGER_SELL_FILE, args.granularity)
+        out = report_long.long_path(out) if args.long else out
+        report_io.save_report_csv(df, out)
+        logger.info(f"SELL {args.granularity} report saved to {out}")
+    elif args.csv:
         save_sell_report(df)
     else:
         print(df)
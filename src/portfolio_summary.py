@@ -16,20 +16,30 @@ roll up into ticker 'SUI' for FIFO and balance purposes.
 Design decisions (per project review):
 - No DataNormalization/FIFOState/AssetPriceState persistent tables.
   Full ledger history is always available in SQLite -> recompute on every run.
+  Legs are read pre-paired from the storage `trades` table (maintained on
+  insert), so a run does not regroup the ledger by refid. Opt-in exception:
+  run_fifo_incremental() keeps the FIFO + price state and a ledger watermark
+  in a report_cache state slot (a disposable file, not a table) and applies
+  only newer entries; `--verify` checks it against a full replay.
 - `summary` table is a derived, disposable output (INSERT OR REPLACE),
   never incrementally patched. Idempotent, always correct.
 - FIFO and forecast NEVER apply a --days cutoff. Full history required
   for correct running average cost and regression trend.
 """
 
+import argparse
 import logging
+import math
+import os
 import re
 import sqlite3
-from collections import defaultdict
+import sys
 from datetime import datetime, timezone
-from typing import Any, DefaultDict
+from typing import Any
 
+import fifo_lots
 import pandas as pd
+import report_cache
 import storage
 
 logger = logging.getLogger(__name__)
@@ -45,6 +55,11 @@ EUR_ASSETS = {"ZEUR", "EUR"}
 # nets to zero real acquisition or disposal).
 NON_TRADE_TYPES = {"transfer"}
 
+# Disposal accounting: "average" sells at the pooled average cost (the Apps
+# Script port, _apply_sell); "fifo" consumes the oldest lots (fifo_lots).
+COST_METHODS = ("average", "fifo")
+COST_METHOD = "average"
+
 # Kraken legacy asset code normalization (X/Z prefixed codes -> common ticker)
 ASSET_ALIASES = {
     "XXBT": "BTC",
@@ -92,17 +107,8 @@ def normalize_asset(raw: str | None) -> str:
 # ---------------------------------------------------------------------------
 
 
-def _group_by_refid(entries: dict[str, Any]) -> DefaultDict[str, list[dict[str, Any]]]:
-    groups: DefaultDict[str, list[dict[str, Any]]] = defaultdict(list)
-    for txid, e in entries.items():
-        if str(e.get("type", "")).lower() in NON_TRADE_TYPES:
-            continue  # exclude wallet transfers (spot<->staking) entirely
-        ref = e.get("refid") or txid
-        groups[ref].append(e)
-    return groups
-
-
-def _entry_date(e: dict[str, Any]):
+def _entry_date(e: dict[str, Any], ts: float | None = None):
+    """Leg datetime from its ISO `date`, else from `time` (`ts` if already parsed)."""
     if e.get("date"):
         try:
             return datetime.fromisoformat(e["date"])
@@ -110,118 +116,202 @@ def _entry_date(e: dict[str, Any]):
             Exception
         ):  # nosec B110 - fall back to timestamp-based date if ISO parse fails
             pass
-    ts = float(e.get("time", 0))
+    if ts is None:
+        ts = float(e.get("time", 0))
     return datetime.fromtimestamp(ts, tz=timezone.utc) if ts else None
 
 
-def extract_buys(entries: dict[str, Any]) -> list[dict[str, Any]]:
+def extract_trades(entries: dict[str, Any]) -> list[dict[str, Any]]:
     """
-    Pair EUR-out legs with asset-in legs per refid -> individual buy transactions.
-    Also captures fee-free asset inflows (staking rewards, airdrops - NOT
-    spot<->staking transfers, which are already excluded) with paid=0, which
-    correctly dilutes average cost like a free lot.
+    Buy and sell records of extract_buys()/extract_sells() in one pass: the
+    ledger is grouped by refid once, every amount/fee/date is parsed once,
+    and the records come back as a single stream ordered by (date, time),
+    a buy before a sell at the same time. record["side"] is "buy" or "sell".
     """
-    buys = []
-    for ref, items in _group_by_refid(entries).items():
-        eur_legs = [
-            i
-            for i in items
-            if i.get("asset") in EUR_ASSETS and float(i.get("amount", 0)) < 0
-        ]
-        asset_legs = [
-            i
-            for i in items
-            if i.get("asset") not in EUR_ASSETS and float(i.get("amount", 0)) > 0
-        ]
-
-        if not asset_legs:
+    groups: dict[str, list[dict[str, Any]]] = {}
+    for txid, e in entries.items():
+        if str(e.get("type", "")).lower() in NON_TRADE_TYPES:
+            continue  # exclude wallet transfers (spot<->staking) entirely
+        ref = e.get("refid") or txid
+        legs = groups.get(ref)
+        if legs is None:
+            groups[ref] = [e]
+        else:
+            legs.append(e)
+
+    tickers: dict[Any, str] = {}  # raw asset code -> normalize_asset()
+    events = []
+    n_buys = 0
+    for ref, legs in groups.items():
+        paid = proceeds = bought = fee = 0.0
+        has_eur_in = False
+        asset_in, asset_out = [], []
+        for e in legs:
+            amount = float(e.get("amount", 0))
+            fee += float(e.get("fee", 0))
+            if e.get("asset") in EUR_ASSETS:
+                if amount < 0:
+                    paid -= amount
+                elif amount > 0:
+                    proceeds += amount
+                    has_eur_in = True
+            elif amount > 0:
+                asset_in.append((e, amount))
+                bought += amount
+            elif amount < 0:
+                asset_out.append((e, -amount))
+        if not asset_in and not (asset_out and has_eur_in):
             continue
 
-        paid = sum(abs(float(leg_item.get("amount", 0))) for leg_item in eur_legs)
-        fee = sum(float(leg_item.get("fee", 0)) for leg_item in items)
-        total_asset_amount = sum(
-            float(leg_item.get("amount", 0)) for leg_item in asset_legs
-        )
-
-        for leg in asset_legs:
-            asset = normalize_asset(leg.get("asset"))
-            amount = float(leg.get("amount", 0))
-            if amount <= 0 or not asset:
+        # Pair EUR-out legs with asset-in legs. Fee-free asset inflows
+        # (staking rewards, airdrops - NOT spot<->staking transfers, which
+        # are already excluded) get paid=0, which correctly dilutes average
+        # cost like a free lot.
+        for e, amount in asset_in:
+            raw = e.get("asset")
+            asset = tickers.get(raw)
+            if asset is None:
+                asset = tickers[raw] = normalize_asset(raw)
+            if not asset:
                 continue
-            date = _entry_date(leg)
+            ts = float(e.get("time") or 0.0)
+            date = _entry_date(e, ts)
             if not date:
                 logger.warning(
                     "Skipped buy leg with invalid date | refid=%s asset=%s", ref, asset
                 )
                 continue
-
-            share = amount / total_asset_amount if total_asset_amount else 1.0
+            share = amount / bought if bought else 1.0
             leg_paid = paid * share
-            leg_fee = fee * share
-            price = (leg_paid / amount) if (amount and leg_paid > 0) else 0.0
-
-            buys.append(
+            events.append(
                 {
+                    "side": "buy",
                     "asset": asset,
                     "date": date,
+                    "time": ts,
                     "amount": amount,
                     "paid": leg_paid,
-                    "fee": leg_fee,
-                    "price": price,
+                    "fee": fee * share,
+                    "price": (leg_paid / amount) if leg_paid > 0 else 0.0,
                 }
             )
+            n_buys += 1
 
-    buys.sort(key=lambda r: r["date"])
-    logger.info("Extracted %d buy transactions", len(buys))
-    return buys
-
-
-def extract_sells(entries: dict[str, Any]) -> list[dict[str, Any]]:
-    """Pair asset-out legs with EUR-in legs per refid -> individual sell transactions."""
-    sells = []
-    for ref, items in _group_by_refid(entries).items():
-        asset_legs = [
-            i
-            for i in items
-            if i.get("asset") not in EUR_ASSETS and float(i.get("amount", 0)) < 0
-        ]
-        eur_legs = [
-            i
-            for i in items
-            if i.get("asset") in EUR_ASSETS and float(i.get("amount", 0)) > 0
-        ]
-
-        if not asset_legs or not eur_legs:
+        # Pair asset-out legs with EUR-in legs.
+        if not has_eur_in:
             continue
-
-        proceeds = sum(float(leg_item.get("amount", 0)) for leg_item in eur_legs)
-        fee = sum(float(leg_item.get("fee", 0)) for leg_item in items)
-
-        for leg in asset_legs:
-            asset = normalize_asset(leg.get("asset"))
-            amount = abs(float(leg.get("amount", 0)))
-            if amount <= 0 or not asset:
+        for e, amount in asset_out:
+            raw = e.get("asset")
+            asset = tickers.get(raw)
+            if asset is None:
+                asset = tickers[raw] = normalize_asset(raw)
+            if not asset:
                 continue
-            date = _entry_date(leg)
+            ts = float(e.get("time") or 0.0)
+            date = _entry_date(e, ts)
             if not date:
                 logger.warning(
                     "Skipped sell with invalid date | refid=%s asset=%s", ref, asset
                 )
                 continue
-
-            sells.append(
+            events.append(
                 {
+                    "side": "sell",
                     "asset": asset,
                     "date": date,
+                    "time": ts,
                     "amount": amount,
                     "proceeds": proceeds,
                     "fee": fee,
                 }
             )
 
-    sells.sort(key=lambda r: r["date"])
-    logger.info("Extracted %d sell transactions", len(sells))
-    return sells
+    events.sort(key=_event_order)
+    logger.info("Extracted %d buy / %d sell transactions", n_buys, len(events) - n_buys)
+    return events
+
+
+def _event_order(r: dict[str, Any]) -> tuple:
+    return r["date"], r["time"], r["side"] == "sell"
+
+
+def extract_buys(entries: dict[str, Any]) -> list[dict[str, Any]]:
+    """
+    Pair EUR-out legs with asset-in legs per refid -> individual buy transactions
+    (the buy records of extract_trades()).
+    """
+    return [r for r in extract_trades(entries) if r["side"] == "buy"]
+
+
+def extract_sells(entries: dict[str, Any]) -> list[dict[str, Any]]:
+    """Pair asset-out legs with EUR-in legs per refid -> individual sell transactions."""
+    return [r for r in extract_trades(entries) if r["side"] == "sell"]
+
+
+def trade_events(trades: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    Convert pre-paired rows of the storage `trades` table into the same
+    time-ordered buy/sell stream extract_trades() derives from raw entries,
+    without regrouping the ledger by refid.
+    """
+    events = []
+    for t in trades:
+        if str(t.get("type") or "").lower() in NON_TRADE_TYPES:
+            continue
+        asset = normalize_asset(t.get("asset"))
+        amount = float(t.get("base_amount") or 0.0)
+        if amount <= 0 or not asset or t.get("side") not in {"buy", "in", "sell"}:
+            continue
+        date = _entry_date({"date": t.get("date_iso"), "time": t.get("time") or 0})
+        if not date:
+            logger.warning(
+                "Skipped trade with invalid date | refid=%s asset=%s",
+                t.get("refid"),
+                asset,
+            )
+            continue
+        fee = float(t.get("fee") or 0.0)
+        quote = float(t.get("quote_amount") or 0.0)
+        ts = float(t.get("time") or 0.0)
+        if t["side"] == "sell":
+            events.append(
+                {
+                    "side": "sell",
+                    "asset": asset,
+                    "date": date,
+                    "time": ts,
+                    "amount": amount,
+                    "proceeds": quote,
+                    "fee": fee,
+                }
+            )
+        else:
+            events.append(
+                {
+                    "side": "buy",
+                    "asset": asset,
+                    "date": date,
+                    "time": ts,
+                    "amount": amount,
+                    "paid": quote,
+                    "fee": fee,
+                    "price": quote / amount if quote > 0 else 0.0,
+                }
+            )
+    events.sort(key=_event_order)
+    logger.info("Read %d trades into %d buy/sell records", len(trades), len(events))
+    return events
+
+
+def split_trades(
+    trades: list[dict[str, Any]],
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """trade_events() split into (buys, sells)."""
+    buys: list[dict[str, Any]] = []
+    sells: list[dict[str, Any]] = []
+    for r in trade_events(trades):
+        (sells if r["side"] == "sell" else buys).append(r)
+    return buys, sells
 
 
 # ---------------------------------------------------------------------------
@@ -261,6 +351,8 @@ def _apply_buy(state: dict[str, Any], buy: dict[str, Any]):
 
 
 def _apply_sell(state: dict[str, Any], sell: dict[str, Any]):
+    """Average-cost disposal: the sold amount leaves the pooled position at
+    avg_price, so no per-lot basis exists (lot-level FIFO: fifo_lots)."""
     s = state.get(sell["asset"])
     if not s:
         logger.warning("Sell skipped, asset not in FIFO state | %s", sell)
@@ -320,28 +412,9 @@ def _apply_buy_to_price_state(price_state: dict[str, Any], buy: dict[str, Any]):
         ps["last_date"] = buy["date"]
 
 
-def run_fifo(entries: dict[str, Any]) -> pd.DataFrame:
-    """
-    Full-history FIFO recompute — NEVER pass a days-filtered entries dict here.
-    Returns a DataFrame equivalent to the Google Sheets Summary tab (cols A-H).
-    """
-    if not entries:
-        logger.warning("run_fifo called with empty entries")
-        return pd.DataFrame()
-
-    buys = extract_buys(entries)
-    sells = extract_sells(entries)
-
-    fifo_state: dict[str, Any] = {}
-    price_state: dict[str, Any] = {}
-
-    for b in buys:
-        _apply_buy(fifo_state, b)
-        _apply_buy_to_price_state(price_state, b)
-
-    for s in sells:
-        _apply_sell(fifo_state, s)
-
+def _summary_frame(
+    fifo_state: dict[str, Any], price_state: dict[str, Any]
+) -> pd.DataFrame:
     rows = []
     for asset in sorted(fifo_state.keys()):
         st = fifo_state[asset]
@@ -360,10 +433,254 @@ def run_fifo(entries: dict[str, Any]) -> pd.DataFrame:
 
     df = pd.DataFrame(rows)
     df.attrs["price_state"] = price_state  # carried internally to forecast_prices()
+    return df
+
+
+def _replay(events: list[dict[str, Any]]) -> pd.DataFrame:
+    fifo_state: dict[str, Any] = {}
+    price_state: dict[str, Any] = {}
+
+    sells = []
+    for r in events:
+        if r["side"] == "sell":
+            sells.append(r)
+            continue
+        _apply_buy(fifo_state, r)
+        _apply_buy_to_price_state(price_state, r)
+
+    for s in sells:
+        _apply_sell(fifo_state, s)
+
+    df = _summary_frame(fifo_state, price_state)
     logger.info("run_fifo finished | assets=%d", len(df))
     return df
 
 
+def _replay_lots(events: list[dict[str, Any]]) -> pd.DataFrame:
+    """_replay() with lot-level FIFO disposals: remaining amount/cost are the
+    open lots, plus a realised_pnl column."""
+    fifo_state: dict[str, Any] = {}
+    price_state: dict[str, Any] = {}
+    for r in events:
+        if r["side"] == "buy":
+            _apply_buy(fifo_state, r)
+            _apply_buy_to_price_state(price_state, r)
+
+    book = fifo_lots.replay_events(events)
+    for asset, st in fifo_state.items():
+        q = book.queues.get(asset)
+        amount, cost = q.totals() if q else (0.0, 0.0)
+        st["remaining_amount"], st["remaining_cost"] = amount, cost
+        st["avg_price"] = cost / amount if amount > 0 else 0.0
+
+    df = _summary_frame(fifo_state, price_state)
+    if not df.empty:
+        df["realised_pnl"] = df["asset"].map(book.realised()).fillna(0.0)
+    logger.info("run_fifo finished (lot FIFO) | assets=%d", len(df))
+    return df
+
+
+def _run(events: list[dict[str, Any]], method: str | None) -> pd.DataFrame:
+    method = method or COST_METHOD
+    if method not in COST_METHODS:
+        raise ValueError(f"method must be one of {COST_METHODS}, got {method!r}")
+    return (_replay_lots if method == "fifo" else _replay)(events)
+
+
+def run_fifo(entries: dict[str, Any], method: str | None = None) -> pd.DataFrame:
+    """
+    Full-history FIFO recompute — NEVER pass a days-filtered entries dict here.
+    Returns a DataFrame equivalent to the Google Sheets Summary tab (cols A-H).
+    `method` (default COST_METHOD): "average" cost or lot-level "fifo".
+    """
+    if not entries:
+        logger.warning("run_fifo called with empty entries")
+        return pd.DataFrame()
+
+    return _run(extract_trades(entries), method)
+
+
+def run_fifo_from_trades(
+    trades: list[dict[str, Any]], method: str | None = None
+) -> pd.DataFrame:
+    """Same as run_fifo(), fed from the pre-paired storage `trades` table."""
+    if not trades:
+        logger.warning("run_fifo_from_trades called with no trades")
+        return pd.DataFrame()
+
+    return _run(trade_events(trades), method)
+
+
+# ---------------------------------------------------------------------------
+# INCREMENTAL FIFO (opt-in) — persisted state + ledger watermark
+# ---------------------------------------------------------------------------
+# _replay() applies every buy, then every sell at the running average cost,
+# so its result only depends on the time-ordered buys and on the total sold
+# per asset. The state slot keeps exactly that: the buy-only FIFO state, the
+# price state (EMA7 + regression sums), the amount sold per asset and the
+# (time, txid) watermark of the newest ledger entry it covers. A run applies
+# the trades of entries after the watermark and falls back to a full replay
+# when the state is missing or stale, or when entries at/before the
+# watermark were inserted since (ledger count moved) or joined a refid that
+# was already applied. Ledger entries are immutable on Kraken; an edited
+# old entry is not detected.
+
+INCREMENTAL = False  # update_summary() default; update.py --incremental-fifo
+FIFO_STATE_SLOT = "fifo-state"  # report_cache.load_state()/store_state() name
+FIFO_STATE_VERSION = 1
+
+
+def _load_trade_rows(
+    conn: sqlite3.Connection, refids: list[str] | None = None
+) -> list[dict[str, Any]]:
+    """`trades` rows (all, or those of `refids`) ordered like load_trades()."""
+    conn.row_factory = sqlite3.Row
+    if refids is None:
+        return [
+            dict(r) for r in conn.execute("SELECT * FROM trades ORDER BY time, refid")
+        ]
+    rows = []
+    for i in range(0, len(refids), storage.TXID_BATCH_SIZE):
+        batch = refids[i : i + storage.TXID_BATCH_SIZE]
+        rows += [
+            dict(r)
+            for r in conn.execute(
+                f"SELECT * FROM trades WHERE refid IN ({','.join('?' * len(batch))})",  # nosec B608 - only '?' placeholders are interpolated
+                batch,
+            )
+        ]
+    rows.sort(key=lambda r: (r["time"] or 0.0, r["refid"]))
+    return rows
+
+
+def _new_refids(
+    conn: sqlite3.Connection, state: dict[str, Any], count: int
+) -> tuple[list[str] | None, str]:
+    """
+    Refids of the ledger entries after the state's watermark, or None and
+    the reason when the state cannot be extended.
+    """
+    if not state or state.get("version") != FIFO_STATE_VERSION:
+        return None, "no saved state"
+    wm_time, wm_txid = state["watermark"]
+    after = conn.execute(
+        """
+        SELECT COALESCE(NULLIF(refid, ''), txid) FROM ledger
+        WHERE time > ? OR (time = ? AND txid > ?)
+        """,
+        (wm_time, wm_time, wm_txid),
+    ).fetchall()
+    if count - len(after) != state["count"]:
+        return None, "entries inserted before the watermark"
+    refids = list(dict.fromkeys(r[0] for r in after))
+    for i in range(0, len(refids), storage.TXID_BATCH_SIZE):
+        batch = refids[i : i + storage.TXID_BATCH_SIZE]
+        seen = conn.execute(
+            f"""
+            SELECT 1 FROM ledger
+            WHERE refid IN ({','.join('?' * len(batch))})
+              AND (time < ? OR (time = ? AND txid <= ?))
+            LIMIT 1
+            """,  # nosec B608 - only '?' placeholders are interpolated
+            [*batch, wm_time, wm_time, wm_txid],
+        ).fetchone()
+        if seen:
+            return None, "new legs for an already applied refid"
+    return refids, ""
+
+
+def _apply_trade_rows(state: dict[str, Any], trades: list[dict[str, Any]]) -> None:
+    buys, sells = split_trades(trades)
+    for b in buys:
+        _apply_buy(state["fifo"], b)
+        _apply_buy_to_price_state(state["price"], b)
+    for s in sells:
+        state["sold"][s["asset"]] = state["sold"].get(s["asset"], 0.0) + s["amount"]
+
+
+def _state_frame(state: dict[str, Any]) -> pd.DataFrame:
+    """Summary of a saved state: its buy-only FIFO state minus the sold totals."""
+    fifo_state = {asset: dict(st) for asset, st in state["fifo"].items()}
+    for asset, amount in state["sold"].items():
+        _apply_sell(fifo_state, {"asset": asset, "amount": amount})
+    return _summary_frame(fifo_state, state["price"])
+
+
+def run_fifo_incremental() -> pd.DataFrame:
+    """
+    Same result as run_fifo_from_trades(storage.load_trades()), computed
+    from the saved FIFO state plus the trades of ledger entries newer than
+    its watermark (full replay when that is not possible). Saves the new
+    state next to the ledger DB.
+    """
+    db_path = storage.LEDGER_DB_FILE
+    if not os.path.exists(db_path):
+        logger.warning("run_fifo_incremental: no ledger DB")
+        return pd.DataFrame()
+    storage.init_db()
+    state = report_cache.load_state(db_path, FIFO_STATE_SLOT) or {}
+
+    conn = storage.connect()
+    try:
+        conn.execute("BEGIN")  # watermark and trades from one read snapshot
+        mark = conn.execute(
+            "SELECT time, txid FROM ledger ORDER BY time DESC, txid DESC LIMIT 1"
+        ).fetchone()
+        count = conn.execute("SELECT COUNT(*) FROM ledger").fetchone()[0]
+        if mark is None:
+            logger.warning("run_fifo_incremental called with an empty ledger")
+            return pd.DataFrame()
+        refids, reason = _new_refids(conn, state, count)
+        if refids is None:
+            logger.info("Incremental FIFO: full replay (%s)", reason)
+            state = {"fifo": {}, "price": {}, "sold": {}}
+        trades = _load_trade_rows(conn, refids)
+    finally:
+        conn.close()
+
+    _apply_trade_rows(state, trades)
+    state.update(version=FIFO_STATE_VERSION, watermark=(mark[0], mark[1]), count=count)
+    report_cache.store_state(db_path, FIFO_STATE_SLOT, state)
+    if refids is not None:
+        logger.info(
+            "Incremental FIFO: %d trade rows of %d refids applied",
+            len(trades),
+            len(refids),
+        )
+    df = _state_frame(state)
+    logger.info("run_fifo_incremental finished | assets=%d", len(df))
+    return df
+
+
+def verify_incremental(rel_tol: float = 1e-9) -> list[str]:
+    """
+    Refresh the incremental FIFO state and compare its summary + forecast
+    with a full replay of the `trades` table. Returns the differences
+    ("<asset> <column>: <incremental> != <full>"); empty when they match.
+    """
+    incremental = forecast_prices(run_fifo_incremental())
+    full = forecast_prices(run_fifo_from_trades(storage.load_trades()))
+    if incremental.empty or full.empty:
+        return [] if incremental.empty and full.empty else ["one summary is empty"]
+
+    inc: dict[str, Any] = {r["asset"]: r for r in incremental.to_dict("records")}
+    ref: dict[str, Any] = {r["asset"]: r for r in full.to_dict("records")}
+    diffs = [f"{a} missing from incremental" for a in sorted(ref.keys() - inc.keys())]
+    diffs += [f"{a} missing from full replay" for a in sorted(inc.keys() - ref.keys())]
+    for asset in sorted(inc.keys() & ref.keys()):
+        for col, b in ref[asset].items():
+            a = inc[asset].get(col)  # floats, plus asset / update_date
+            if isinstance(a, float) and isinstance(b, float):
+                same = (math.isnan(a) and math.isnan(b)) or math.isclose(
+                    a, b, rel_tol=rel_tol, abs_tol=1e-9
+                )
+            else:
+                same = (pd.isna(a) and pd.isna(b)) or a == b
+            if not same:
+                diffs.append(f"{asset} {col}: {a} != {b}")
+    return diffs
+
+
 # ---------------------------------------------------------------------------
 # FORECAST (direct port of forecastPrices)
 # ---------------------------------------------------------------------------
@@ -415,26 +732,37 @@ def forecast_prices(summary_df: pd.DataFrame) -> pd.DataFrame:
 # ---------------------------------------------------------------------------
 
 
+SUMMARY_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS summary (
+        asset TEXT PRIMARY KEY,
+        latest_price REAL,
+        update_date TEXT,
+        remaining_amount REAL,
+        total_paid REAL,
+        total_fee REAL,
+        remaining_cost REAL,
+        avg_price REAL,
+        ema7 REAL,
+        forecast_7d REAL,
+        forecast_30d REAL,
+        computed_at TEXT
+    )
+"""
+
+_SUMMARY_READY_DBS: set[str] = set()
+
+
 def init_summary_table(conn: sqlite3.Connection):
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS summary (
-            asset TEXT PRIMARY KEY,
-            latest_price REAL,
-            update_date TEXT,
-            remaining_amount REAL,
-            total_paid REAL,
-            total_fee REAL,
-            remaining_cost REAL,
-            avg_price REAL,
-            ema7 REAL,
-            forecast_7d REAL,
-            forecast_30d REAL,
-            computed_at TEXT
-        )
     """
-    )
-    conn.commit()
+    Ensure the summary table exists — DDL runs once per process per DB file,
+    inside the caller's transaction (no separate commit on the hot path).
+    """
+    db_file = conn.execute("PRAGMA database_list").fetchone()[2]
+    if db_file and db_file in _SUMMARY_READY_DBS and os.path.exists(db_file):
+        return
+    conn.execute(SUMMARY_TABLE_DDL)
+    if db_file:
+        _SUMMARY_READY_DBS.add(db_file)
 
 
 def save_summary(df: pd.DataFrame, db_path: str | None = None):
@@ -485,20 +813,64 @@ def save_summary(df: pd.DataFrame, db_path: str | None = None):
         conn.close()
 
 
-def update_summary() -> pd.DataFrame:
-    """Convenience entrypoint mirroring update_asset_report()/update_sell_report()."""
-    entries = storage.load_entries_from_db()
-    if not entries:
-        logger.warning("No data for portfolio summary")
-        return pd.DataFrame()
-
-    df = run_fifo(entries)  # full history, NEVER days-filtered
+def update_summary(
+    incremental: bool | None = None, method: str | None = None
+) -> pd.DataFrame:
+    """Convenience entrypoint mirroring update_asset_report()/update_sell_report().
+    Reads the pre-paired `trades` table instead of regrouping raw entries;
+    with `incremental` (default INCREMENTAL) only the entries after the saved
+    FIFO state's watermark (run_fifo_incremental(), average cost only).
+    `method` defaults to COST_METHOD."""
+    method = method or COST_METHOD
+    incremental = INCREMENTAL if incremental is None else incremental
+    if incremental and method == "average":
+        df = run_fifo_incremental()
+    else:
+        if incremental:
+            logger.info(
+                "Incremental FIFO keeps average-cost state; full %s replay", method
+            )
+        trades = storage.load_trades()
+        if not trades:
+            logger.warning("No data for portfolio summary")
+            return pd.DataFrame()
+        df = run_fifo_from_trades(trades, method)  # full history, NEVER days-filtered
     df = forecast_prices(df)
     if not df.empty:
         save_summary(df)
     return df
 
 
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="FIFO cost basis + price forecast")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Apply only ledger entries newer than the saved FIFO state",
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="Compare the incremental FIFO state with a full replay (exit 1 on mismatch)",
+    )
+    parser.add_argument(
+        "--method",
+        choices=COST_METHODS,
+        default=None,
+        help="Disposal accounting (default: %s)" % COST_METHOD,
+    )
+    args = parser.parse_args(argv)
+
+    if args.verify:
+        diffs = verify_incremental()
+        for d in diffs:
+            logger.error("FIFO mismatch: %s", d)
+        if not diffs:
+            logger.info("Incremental FIFO matches a full replay")
+        return 1 if diffs else 0
+    print(update_summary(incremental=args.incremental or None, method=args.method))
+    return 0
+
+
 if __name__ == "__main__":
-    result_df = update_summary()
-    print(result_df)
+    sys.exit(main())
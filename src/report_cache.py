@@ -0,0 +1,145 @@
+# report_cache.py
+"""
+Result cache for reports built from the ledger DB.
+
+Results are keyed on a cheap fingerprint of the DB - ledger row count, max
+rowid and max time (one index lookup each) plus the last daily_changes
+sequence, which also moves when stored entries are updated - and on the
+report parameters including today's date, so a rolling window moves on at
+midnight. Each (name, parameters) pair has one slot,
+`<db dir>/.cache/<name>-<hash>.pkl`, overwritten on every miss.
+
+Slots are pickles written by this module only. A DB without a ledger
+table has no fingerprint and is never cached. load_state()/store_state()
+keep un-keyed slots for callers that invalidate their own state, such as
+report_rollup's closed periods.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle  # nosec B403 - only unpickles this module's own cache files
+import sqlite3
+import tempfile
+import time
+from collections.abc import Callable
+from datetime import datetime, timezone
+from typing import Any, TypeVar
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
+    )
+
+CACHE_DIRNAME = ".cache"
+
+T = TypeVar("T")
+
+
+def cache_dir(db_path: str) -> str:
+    return os.path.join(os.path.dirname(db_path) or ".", CACHE_DIRNAME)
+
+
+def fingerprint(db_path: str) -> list[Any] | None:
+    """[row count, max rowid, max time, daily seq] of the hot ledger DB, or
+    None if there is no ledger table to fingerprint."""
+    if not os.path.exists(db_path):
+        return None
+    conn = sqlite3.connect(db_path)
+    try:
+        fp = list(
+            conn.execute(
+                "SELECT COUNT(*), MAX(rowid), MAX(time) FROM ledger"
+            ).fetchone()
+        )
+        try:
+            fp.append(conn.execute("SELECT MAX(seq) FROM daily_changes").fetchone()[0])
+        except sqlite3.OperationalError:
+            fp.append(None)
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        conn.close()
+    return fp
+
+
+def _params(params: dict[str, Any]) -> dict[str, Any]:
+    today = datetime.fromtimestamp(time.time(), tz=timezone.utc).date()
+    return {**params, "today": today.isoformat()}
+
+
+def _slot(db_path: str, name: str, params: dict[str, Any]) -> str:
+    digest = hashlib.sha256(
+        json.dumps(params, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()[:16]
+    return os.path.join(cache_dir(db_path), f"{name}-{digest}.pkl")
+
+
+def _read(path: str) -> Any | None:
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)  # nosec B301
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+        return None
+
+
+def _write(path: str, value: Any) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".tmp_", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("Could not write report cache %s: %s", path, e)
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def load(
+    db_path: str, name: str, params: dict[str, Any], fp: list[Any] | None
+) -> Any | None:
+    """Cached value of (name, params) if it was stored for fingerprint `fp`."""
+    if fp is None:
+        return None
+    params = _params(params)
+    slot = _read(_slot(db_path, name, params))
+    if not isinstance(slot, tuple) or len(slot) != 3:
+        return None
+    stored_fp, stored_params, value = slot
+    if stored_fp != fp or stored_params != params:
+        return None
+    return value
+
+
+def store(
+    db_path: str, name: str, params: dict[str, Any], fp: list[Any] | None, value: Any
+) -> None:
+    if fp is None:
+        return
+    params = _params(params)
+    _write(_slot(db_path, name, params), (fp, params, value))
+
+
+def load_state(db_path: str, name: str) -> Any | None:
+    return _read(os.path.join(cache_dir(db_path), f"{name}.pkl"))
+
+
+def store_state(db_path: str, name: str, value: Any) -> None:
+    _write(os.path.join(cache_dir(db_path), f"{name}.pkl"), value)
+
+
+def cached(
+    db_path: str, name: str, params: dict[str, Any], build: Callable[[], T]
+) -> T:
+    """build() once per DB fingerprint, parameters and day."""
+    fp = fingerprint(db_path)
+    hit: T | None = load(db_path, name, params, fp)
+    if hit is not None:
+        logger.debug("Report cache hit: %s %s", name, params)
+        return hit
+    value = build()
+    store(db_path, name, params, fp, value)
+    return value
@@ -0,0 +1,242 @@
+# report_engine.py
+"""
+Single-pass engine for the ledger reports.
+
+One traversal of the ledger - an entries dict or any iterable of
+(txid, entry) pairs, e.g. storage.iter_entries() - applies the `days`
+cutoff, parses every leg once into a Leg (floats, lower-case type, UTC
+date) and groups the legs by refid. Each report is an Aggregator that
+receives every refid group through add() and turns its state into a
+DataFrame in result(), so building N reports costs one pass, not N.
+
+With a DB path as source the reports are read from the daily tables kept
+by storage (Aggregator.from_db()), which needs no ledger pass at all.
+
+Reports cover either a rolling window of `days` ending now or, given
+`start` and/or `end`, the absolute UTC calendar days start..end
+(inclusive, either side open if omitted); see time_bounds()/date_bounds().
+"""
+
+import logging
+import math
+import time
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from functools import partial
+from datetime import date, datetime, timedelta, timezone
+from typing import Any
+
+import pandas as pd
+
+import report_cache
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
+    )
+
+EUR_ASSETS = {"ZEUR", "EUR"}
+
+DateLike = date | str  # datetime.date/datetime or an ISO "YYYY-MM-DD" string
+
+
+@dataclass(slots=True)
+class Leg:
+    txid: str
+    asset: str
+    type: str  # lower-case
+    amount: float
+    fee: float
+    time: float
+    date: date  # canonical `date` from the DB if present, else UTC from time
+
+
+def _as_date(value: DateLike) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _day_start(day: date) -> float:
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp()
+
+
+def time_bounds(
+    days: int = 7, start: DateLike | None = None, end: DateLike | None = None
+) -> tuple[float, float]:
+    """[lo, hi) UTC timestamps of a report: the last `days * 86400` s, or the
+    calendar days start..end if either is given."""
+    if start is None and end is None:
+        return time.time() - days * 86400, math.inf
+    lo = _day_start(_as_date(start)) if start is not None else -math.inf
+    hi = _day_start(_as_date(end) + timedelta(days=1)) if end is not None else math.inf
+    return lo, hi
+
+
+def date_bounds(
+    days: int = 7, start: DateLike | None = None, end: DateLike | None = None
+) -> tuple[str, str | None]:
+    """First and last ISO day (inclusive, None = open) of a report read from
+    the daily tables: the calendar days a `days` window ending now touches,
+    or start..end."""
+    if start is None and end is None:
+        first = datetime.fromtimestamp(time.time() - days * 86400, tz=timezone.utc)
+        return first.date().isoformat(), None
+    return (
+        _as_date(start).isoformat() if start is not None else "",
+        _as_date(end).isoformat() if end is not None else None,
+    )
+
+
+class Aggregator:
+    """
+    Base class of a report: add() is called once per refid group (legs in
+    ledger order), result() builds the report. Instances are single-use.
+    """
+
+    name = ""
+    daily_table = ""  # storage daily table read by from_db()
+    totals: tuple[str, ...] = ()  # report columns between Date and the assets
+    metrics: tuple[str, ...] = ()  # value columns of daily_rows()
+
+    def add(self, refid: str, legs: list[Leg]) -> None:
+        raise NotImplementedError
+
+    def result(self) -> pd.DataFrame:
+        raise NotImplementedError
+
+    @classmethod
+    def from_db(
+        cls,
+        db_path: str,
+        days: int,
+        dates: Iterable[str] | None = None,
+        start: DateLike | None = None,
+        end: DateLike | None = None,
+    ) -> pd.DataFrame:
+        """Build the report from the ledger DB instead of a ledger pass
+        (only the rows of `dates`, ISO days, if given)."""
+        raise NotImplementedError
+
+    @classmethod
+    def daily_rows(
+        cls, db_path: str, first: str, last: str | None = None
+    ) -> pd.DataFrame:
+        """Rows of the report's daily table for first..last (ISO days): a
+        `Date` and an `asset` column plus the summable value columns."""
+        raise NotImplementedError
+
+    @classmethod
+    def pivot(cls, daily: pd.DataFrame) -> pd.DataFrame:
+        """The report frame for daily_rows()-shaped rows."""
+        raise NotImplementedError
+
+
+def _items(
+    source: Mapping[str, dict[str, Any]] | Iterable[tuple[str, dict[str, Any]]],
+) -> Iterable[tuple[str, dict[str, Any]]]:
+    return source.items() if isinstance(source, Mapping) else source
+
+
+def group_legs(
+    source: Mapping[str, dict[str, Any]] | Iterable[tuple[str, dict[str, Any]]],
+    cutoff: float = 0.0,
+    until: float = math.inf,
+) -> dict[str, list[Leg]]:
+    """Parse every entry with cutoff <= time < until once into a Leg, grouped
+    by refid (groups and legs in ledger order). Malformed entries are
+    skipped."""
+    groups: dict[str, list[Leg]] = {}
+    # a ledger spans few distinct days: parse each day once
+    days_by_iso: dict[str, date] = {}
+    days_by_num: dict[int, date] = {}
+    for txid, e in _items(source):
+        get = e.get
+        try:
+            ts = float(get("time", 0))
+            if ts < cutoff or ts >= until:
+                continue
+            amount = float(get("amount", 0))
+            fee = float(get("fee", 0))
+            iso = get("date")
+            if iso:
+                day = days_by_iso.get(iso)
+                if day is None:
+                    day = days_by_iso[iso] = datetime.fromisoformat(iso).date()
+            else:
+                num = int(ts // 86400)
+                day = days_by_num.get(num)
+                if day is None:
+                    day = days_by_num[num] = datetime.fromtimestamp(
+                        ts, tz=timezone.utc
+                    ).date()
+        except (TypeError, ValueError, OverflowError, OSError):
+            logger.debug("Skipping malformed ledger entry %s", txid)
+            continue
+        leg = Leg(
+            txid,
+            str(get("asset")),
+            str(get("type") or "").lower(),
+            amount,
+            fee,
+            ts,
+            day,
+        )
+        refid = get("refid") or txid
+        group = groups.get(refid)
+        if group is None:
+            groups[refid] = [leg]
+        else:
+            group.append(leg)
+    return groups
+
+
+def run(
+    source: Mapping[str, dict[str, Any]] | Iterable[tuple[str, dict[str, Any]]],
+    aggregators: Iterable[Aggregator],
+    days: int = 7,
+    start: DateLike | None = None,
+    end: DateLike | None = None,
+) -> None:
+    """Feed every refid group within time_bounds(days, start, end) to each
+    aggregator."""
+    adds = [agg.add for agg in aggregators]
+    for refid, legs in group_legs(source, *time_bounds(days, start, end)).items():
+        for add in adds:
+            add(str(refid), legs)
+
+
+def build_reports(
+    source: str | Mapping[str, dict[str, Any]] | Iterable[tuple[str, dict[str, Any]]],
+    reports: Iterable[type[Aggregator]],
+    days: int = 7,
+    start: DateLike | None = None,
+    end: DateLike | None = None,
+) -> dict[str, pd.DataFrame]:
+    """
+    Build several reports at once -> {report name: DataFrame}.
+    `source` is the ledger DB path (daily tables, see Aggregator.from_db),
+    an entries dict or an iterable of (txid, entry) pairs (one pass).
+    `start`/`end` select calendar days instead of the `days` window.
+    """
+    reports = list(reports)
+    if isinstance(source, str):
+        params: dict[str, Any] = {"days": days}
+        if start is not None or end is not None:
+            params["range"] = date_bounds(days, start, end)
+        # results are cached per DB fingerprint, parameters and day (report_cache)
+        return {
+            r.name: report_cache.cached(
+                source,
+                f"report-{r.name}",
+                params,
+                partial(r.from_db, source, days, start=start, end=end),
+            )
+            for r in reports
+        }
+    aggregators = [r() for r in reports]
+    run(source, aggregators, days, start, end)
+    return {agg.name: agg.result() for agg in aggregators}
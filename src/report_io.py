@@ -0,0 +1,303 @@
+# report_io.py
+"""
+CSV output of the ledger reports.
+
+save_report_csv() writes a whole report (`;`-separated, Date as
+dd.mm.YYYY) atomically. refresh_report_csv() keeps a report CSV current
+incrementally: a watermark next to the CSV records the
+storage.daily_changes() sequence the file reflects, the window length and
+the header. On the next run only the dates changed since then are rebuilt
+from the daily tables and spliced into the file, and dates that left the
+window are dropped. Anything the splice cannot reproduce exactly - no
+watermark, another `days`, an asset column appearing or disappearing, a
+replaced DB or CSV - falls back to a full rebuild. When neither the DB
+(report_cache fingerprint) nor the CSV changed since the last refresh of
+the day, the refresh returns right away.
+
+Writers stream: write_csv() takes DataFrame chunks (iter_chunks() slices a
+frame into CHUNK_ROWS-row views) and write_csv_rows() plain row tuples,
+formatting dates per chunk/row into a temp file that is renamed over the
+target at the end. Peak memory is one chunk, not the frame plus a
+formatted copy plus the whole CSV text.
+"""
+
+import csv
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+from collections.abc import Iterable, Iterator, Sequence
+from contextlib import contextmanager
+from datetime import date
+from typing import IO, Any
+
+import pandas as pd
+
+import report_cache
+import report_engine
+import storage
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
+    )
+
+CSV_SEP = ";"
+DATE_FORMAT = "%d.%m.%Y"
+CHUNK_ROWS = 20_000
+
+
+def watermark_path(path: str) -> str:
+    dirn, name = os.path.split(path)
+    return os.path.join(dirn, f".{name}.watermark.json")
+
+
+@contextmanager
+def _atomic_open(path: str, encoding: str = "utf-8") -> Iterator[IO[str]]:
+    """Text file at a temp path next to `path`, renamed over `path` when the
+    block exits cleanly and removed otherwise."""
+    dirn = os.path.dirname(path) or "."
+    os.makedirs(dirn, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".tmp_", dir=dirn)
+    try:
+        with os.fdopen(fd, "w", encoding=encoding, newline="") as f:
+            yield f
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _atomic_write_text(path: str, text: str) -> None:
+    with _atomic_open(path) as f:
+        f.write(text)
+
+
+def iter_chunks(df: pd.DataFrame, rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """`df` as consecutive row slices (views, no copy); an empty frame
+    yields itself once so its header still gets written."""
+    if df.empty:
+        yield df
+        return
+    for i in range(0, len(df), rows):
+        yield df.iloc[i : i + rows]
+
+
+def _format_dates(chunk: pd.DataFrame, date_format: str | None) -> pd.DataFrame:
+    if date_format is None or "Date" not in chunk.columns:
+        return chunk
+    dates = pd.to_datetime(chunk["Date"]).dt.strftime(date_format)
+    return chunk.assign(Date=dates)
+
+
+def write_csv(
+    path: str,
+    chunks: Iterable[pd.DataFrame],
+    date_format: str | None = None,
+    encoding: str = "utf-8",
+    **to_csv_kwargs: Any,
+) -> int:
+    """
+    Stream DataFrame chunks into the CSV `path` atomically: the header comes
+    from the first chunk, a `Date` column is formatted with `date_format`
+    (if given) one chunk at a time, other options go to DataFrame.to_csv().
+    Returns the number of data rows written.
+    """
+    rows = 0
+    with _atomic_open(path, encoding) as f:
+        for i, chunk in enumerate(chunks):
+            _format_dates(chunk, date_format).to_csv(f, header=i == 0, **to_csv_kwargs)
+            rows += len(chunk)
+    return rows
+
+
+def _cell(value: Any, date_format: str) -> Any:
+    if isinstance(value, date):  # also datetime / pd.Timestamp
+        return value.strftime(date_format)
+    if isinstance(value, float):
+        return "" if value != value else repr(value)  # NaN -> empty, like pandas
+    return value
+
+
+def write_csv_rows(
+    path: str,
+    header: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    sep: str = CSV_SEP,
+    date_format: str = DATE_FORMAT,
+) -> int:
+    """write_csv() for plain rows (e.g. straight from a cursor): dates are
+    written with `date_format`, floats like pandas does. Returns the number
+    of data rows written."""
+    count = 0
+    with _atomic_open(path) as f:
+        writer = csv.writer(f, delimiter=sep, lineterminator=os.linesep)
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow([_cell(v, date_format) for v in row])
+            count += 1
+    return count
+
+
+def _csv_text(df: pd.DataFrame, header: bool = True) -> str:
+    text: str = _format_dates(df, DATE_FORMAT).to_csv(
+        sep=CSV_SEP, index=False, header=header
+    )
+    return text
+
+
+def _load_watermark(path: str) -> dict[str, Any] | None:
+    try:
+        with open(watermark_path(path), encoding="utf-8") as f:
+            state: dict[str, Any] = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return state
+
+
+def _save_watermark(path: str, state: dict[str, Any]) -> None:
+    _atomic_write_text(watermark_path(path), json.dumps(state))
+
+
+def _clear_watermark(path: str) -> None:
+    try:
+        os.remove(watermark_path(path))
+    except FileNotFoundError:
+        pass
+
+
+def save_report_csv(df: pd.DataFrame, path: str) -> None:
+    """Write a whole report to `path` atomically. The file no longer matches
+    any watermark, so the next refresh_report_csv() rebuilds it."""
+    _clear_watermark(path)
+    write_csv(path, iter_chunks(df), DATE_FORMAT, sep=CSV_SEP, index=False)
+
+
+def _iso(line: str) -> str:
+    day, month, year = line.split(CSV_SEP, 1)[0].split(".")
+    return f"{year}-{month}-{day}"
+
+
+def _window_assets(db_path: str, table: str, since: str) -> set[str]:
+    conn = sqlite3.connect(db_path)
+    try:
+        # table comes from the report class, the date is bound as '?'
+        rows = conn.execute(
+            f"SELECT DISTINCT asset FROM {table} WHERE date_iso >= ?",  # nosec B608
+            (since,),
+        ).fetchall()
+    finally:
+        conn.close()
+    return {row[0] for row in rows}
+
+
+def _splice(
+    path: str,
+    report: type[report_engine.Aggregator],
+    days: int,
+    db_path: str,
+    columns: list[str],
+    changed: set[str],
+) -> int | None:
+    """Rebuild the rows of `changed` dates in the CSV; None if the file
+    cannot be updated in place and needs a full rebuild."""
+    with open(path, encoding="utf-8", newline="") as f:
+        lines = f.readlines()
+    if not lines or lines[0].rstrip("\r\n").split(CSV_SEP) != columns:
+        return None
+    header = lines[0]
+    rows = {_iso(line): line for line in lines[1:]}
+    since = report_engine.date_bounds(days)[0]
+    dropped = [d for d in rows if d < since]
+    changed = {d for d in changed if d >= since}
+    if not dropped and not changed:
+        return len(rows)
+
+    assets = set(columns[1 + len(report.totals) :])
+    if _window_assets(db_path, report.daily_table, since) != assets:
+        return None
+    for d in dropped:
+        del rows[d]
+    for d in changed:
+        rows.pop(d, None)
+    part = report.from_db(db_path, days, changed) if changed else pd.DataFrame()
+    if not part.empty:
+        part = part.reindex(columns=columns, fill_value=0.0)
+        for line in _csv_text(part, header=False).splitlines(keepends=True):
+            rows[_iso(line)] = line
+    if not rows:
+        return None
+    with _atomic_open(path) as f:
+        f.write(header)
+        f.writelines(rows[d] for d in sorted(rows))
+    logger.info("%s: %d date(s) rebuilt, %d dropped", path, len(changed), len(dropped))
+    return len(rows)
+
+
+def refresh_report_csv(
+    path: str,
+    report: type[report_engine.Aggregator],
+    days: int = 7,
+    db_path: str | None = None,
+) -> int:
+    """
+    Bring the CSV of `report` (built from the daily tables of db_path) up to
+    date, rewriting only the dates changed since its watermark. Returns the
+    number of report rows; an empty report leaves any existing CSV alone.
+    """
+    db_path = db_path or storage.LEDGER_DB_FILE
+    if not os.path.exists(db_path):
+        return 0
+    # an unchanged DB and CSV since the last refresh today: nothing to do
+    params = {"csv": os.path.abspath(path), "days": days}
+    fp = report_cache.fingerprint(db_path)
+    hit = report_cache.load(db_path, f"csv-{report.name}", params, fp)
+    if hit is not None and hit[1] == _csv_stat(path):
+        return int(hit[0])
+    rows = _refresh(path, report, days, db_path)
+    report_cache.store(
+        db_path, f"csv-{report.name}", params, fp, (rows, _csv_stat(path))
+    )
+    return rows
+
+
+def _csv_stat(path: str) -> tuple[int, int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _refresh(
+    path: str, report: type[report_engine.Aggregator], days: int, db_path: str
+) -> int:
+    state = _load_watermark(path)
+    since_seq = int(state["seq"]) if state else 0
+    try:
+        seq, changed = storage.daily_changes(since_seq, db_path)
+    except sqlite3.OperationalError:  # DB from before migration 10
+        seq, changed, state = 0, set(), None
+    if state and state.get("days") == days and seq >= since_seq:
+        try:
+            rows = _splice(path, report, days, db_path, state["columns"], changed)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Rebuilding %s: %s", path, e)
+            rows = None
+        if rows is not None:
+            if seq != since_seq:
+                state["seq"] = seq
+                _save_watermark(path, state)
+            return rows
+
+    df = report.from_db(db_path, days)
+    if df.empty:
+        _clear_watermark(path)
+        return 0
+    save_report_csv(df, path)
+    _save_watermark(path, {"seq": seq, "days": days, "columns": list(df.columns)})
+    logger.info("%s rebuilt (%d rows)", path, len(df))
+    return len(df)
@@ -0,0 +1,99 @@
+# report_long.py
+"""
+Long (tidy) layout of the EUR, asset and sell reports.
+
+The wide reports have one column per asset ever touched in the window, so
+with a long tail of assets almost every cell is a zero. The long layout
+keeps one row per non-zero (Date, asset, metric) value instead, where
+`metric` is a value column of the report's daily table (Aggregator.metrics:
+eur `spent`/`fee`, asset `amount`, sell `amount`/`eur`/`fee`).
+
+build_long() melts the daily-table rows (Aggregator.daily_rows(), or
+report_rollup.rollup_rows() for week/month/year) directly, so the wide
+frame is never built. to_wide() derives the usual wide report from long
+rows; (Date, asset) pairs whose values are all zero are not kept in the long
+layout and so have no column of zeros there.
+"""
+
+import os
+
+import pandas as pd
+
+import report_engine
+import report_rollup
+import storage
+
+LAYOUTS = ("wide", "long")
+LONG_COLUMNS = ["Date", "asset", "metric", "value"]
+
+
+def long_path(path: str) -> str:
+    """CSV path of the long layout next to the wide report CSV `path`."""
+    root, ext = os.path.splitext(path)
+    return f"{root}_long{ext}"
+
+
+def to_long(daily: pd.DataFrame, metrics: tuple[str, ...]) -> pd.DataFrame:
+    """daily_rows()-shaped rows -> LONG_COLUMNS rows, zeros dropped, sorted
+    by Date, asset, metric. asset and metric are categoricals."""
+    if daily.empty:
+        return pd.DataFrame(columns=LONG_COLUMNS)
+    parts = []
+    for metric in metrics:
+        values = daily[metric].to_numpy(dtype="float64")
+        keep = values != 0.0
+        parts.append(
+            pd.DataFrame(
+                {
+                    "Date": daily["Date"].to_numpy()[keep],
+                    "asset": daily["asset"].to_numpy()[keep],
+                    "metric": metric,
+                    "value": values[keep],
+                }
+            )
+        )
+    df = pd.concat(parts, ignore_index=True)
+    df["Date"] = pd.to_datetime(df["Date"])
+    df["asset"] = df["asset"].astype("category")
+    df["metric"] = pd.Categorical(df["metric"], categories=list(metrics))
+    df.sort_values(["Date", "asset", "metric"], inplace=True, ignore_index=True)
+    return df
+
+
+def to_wide(long: pd.DataFrame, report: type[report_engine.Aggregator]) -> pd.DataFrame:
+    """The wide `report` frame (report.pivot()) for long rows."""
+    if long.empty:
+        return pd.DataFrame()
+    daily = long.pivot_table(
+        index=["Date", "asset"],
+        columns="metric",
+        values="value",
+        aggfunc="sum",
+        fill_value=0.0,
+        observed=True,
+    )
+    daily = daily.reindex(columns=list(report.metrics), fill_value=0.0)
+    daily = daily.reset_index()
+    daily.columns.name = None
+    daily["asset"] = daily["asset"].astype(str)
+    return report.pivot(daily)
+
+
+def build_long(
+    report: type[report_engine.Aggregator],
+    db_path: str | None = None,
+    days: int = 7,
+    start: report_engine.DateLike | None = None,
+    end: report_engine.DateLike | None = None,
+    granularity: str = "day",
+) -> pd.DataFrame:
+    """`report` in the long layout, read from its daily table."""
+    db_path = db_path or storage.LEDGER_DB_FILE
+    if granularity == "day":
+        first, last = report_engine.date_bounds(days, start, end)
+        daily = report.daily_rows(db_path, first, last)
+    else:
+        daily = report_rollup.rollup_rows(
+            report, db_path, granularity, days, start, end
+        )
+    return to_long(daily, report.metrics)
@@ -0,0 +1,175 @@
+# report_rollup.py
+"""
+Weekly, monthly and yearly rollups of the EUR, asset and sell reports.
+
+A rollup regroups the rows of the report's daily table
+(Aggregator.daily_rows()) by period - ISO week from Monday, calendar month
+or calendar year, `Date` = first day of the period - and pivots them like
+the daily report (Aggregator.pivot()), so no ledger entry is read. A report
+window (`days`, or `start`..`end`) selects every period it touches, in full.
+
+Closed periods (ended before today, UTC) are kept per report and
+granularity in a report_cache state slot, together with the
+storage.daily_changes() sequence they reflect. A later build re-reads only
+the open periods and the closed ones holding a date changed since.
+"""
+
+import logging
+import os
+import sqlite3
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any
+
+import pandas as pd
+
+import report_cache
+import report_engine
+import storage
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
+    )
+
+GRANULARITIES = ("day", "week", "month", "year")
+
+
+def period_start(day: date, granularity: str) -> date:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    if granularity == "year":
+        return day.replace(month=1, day=1)
+    return day
+
+
+def next_period(start: date, granularity: str) -> date:
+    """First day of the period after the one starting at `start`."""
+    if granularity == "week":
+        return start + timedelta(days=7)
+    if granularity == "month":
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    if granularity == "year":
+        return start.replace(year=start.year + 1, month=1, day=1)
+    return start + timedelta(days=1)
+
+
+def rollup_path(path: str, granularity: str) -> str:
+    """CSV path of a rollup next to the daily report CSV `path`."""
+    root, ext = os.path.splitext(path)
+    return path if granularity == "day" else f"{root}_{granularity}{ext}"
+
+
+def _first_day(db_path: str, table: str) -> str | None:
+    conn = sqlite3.connect(db_path)
+    try:
+        # the table name comes from the report class
+        row = conn.execute(
+            f"SELECT MIN(date_iso) FROM {table}"  # nosec B608
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+def _roll(daily: pd.DataFrame, granularity: str) -> pd.DataFrame:
+    """Daily-table rows -> one row per (period start, asset), values summed."""
+    if daily.empty:
+        return daily
+    starts = {
+        d: period_start(date.fromisoformat(d), granularity).isoformat()
+        for d in daily["Date"].unique()
+    }
+    rolled: pd.DataFrame = (
+        daily.assign(Date=daily["Date"].map(starts))
+        .groupby(["Date", "asset"], as_index=False, sort=True)
+        .sum()
+    )
+    return rolled
+
+
+def rollup_rows(
+    report: type[report_engine.Aggregator],
+    db_path: str | None = None,
+    granularity: str = "month",
+    days: int = 7,
+    start: report_engine.DateLike | None = None,
+    end: report_engine.DateLike | None = None,
+) -> pd.DataFrame:
+    """daily_rows()-shaped rows of `report` with `Date` = period start, one
+    per (period, asset), over the periods touched by the window."""
+    if granularity not in GRANULARITIES or granularity == "day":
+        raise ValueError(f"granularity must be one of {GRANULARITIES[1:]}")
+    db_path = db_path or storage.LEDGER_DB_FILE
+    if not os.path.exists(db_path):
+        return pd.DataFrame()
+
+    today = datetime.fromtimestamp(time.time(), tz=timezone.utc).date()
+    first, last = report_engine.date_bounds(days, start, end)
+    if not first:
+        first = _first_day(db_path, report.daily_table) or ""
+        if not first:
+            return pd.DataFrame()
+    periods = []
+    p = period_start(date.fromisoformat(first), granularity)
+    stop = period_start(date.fromisoformat(last) if last else today, granularity)
+    while p <= stop:
+        periods.append(p)
+        p = next_period(p, granularity)
+
+    name = f"rollup-{report.name}-{granularity}"
+    state: dict[str, Any] = report_cache.load_state(db_path, name) or {}
+    since_seq = int(state.get("seq", 0))
+    try:
+        seq, changed = storage.daily_changes(since_seq, db_path)
+    except sqlite3.OperationalError:  # DB from before migration 10: no caching
+        seq, changed, state = -1, set(), {}
+    closed: dict[str, pd.DataFrame] = (
+        state.get("periods", {}) if seq >= since_seq else {}
+    )
+    for d in changed:
+        closed.pop(period_start(date.fromisoformat(d), granularity).isoformat(), None)
+
+    frames = [closed[p.isoformat()] for p in periods if p.isoformat() in closed]
+    missing = [p for p in periods if p.isoformat() not in closed]
+    if missing:
+        last_day = next_period(missing[-1], granularity) - timedelta(days=1)
+        rolled = _roll(
+            report.daily_rows(db_path, missing[0].isoformat(), last_day.isoformat()),
+            granularity,
+        )
+        for p in missing:
+            rows = (
+                rolled[rolled["Date"] == p.isoformat()] if not rolled.empty else rolled
+            )
+            frames.append(rows)
+            if next_period(p, granularity) <= today:
+                closed[p.isoformat()] = rows
+        logger.debug("%s: %d period(s) rebuilt", name, len(missing))
+        if seq >= 0:
+            report_cache.store_state(db_path, name, {"seq": seq, "periods": closed})
+
+    frames = [f for f in frames if not f.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def build_rollup(
+    report: type[report_engine.Aggregator],
+    db_path: str | None = None,
+    granularity: str = "month",
+    days: int = 7,
+    start: report_engine.DateLike | None = None,
+    end: report_engine.DateLike | None = None,
+) -> pd.DataFrame:
+    """`report` per week/month/year over the periods touched by the window."""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {GRANULARITIES}")
+    db_path = db_path or storage.LEDGER_DB_FILE
+    if granularity == "day":
+        return report.from_db(db_path, days, start=start, end=end)
+    return report.pivot(rollup_rows(report, db_path, granularity, days, start, end))
@@ -0,0 +1,170 @@
+# report_runner.py
+"""
+Parallel report generation.
+
+run_reports() refreshes the EUR, asset and sell report CSVs (and, on
+request, the portfolio summary), in a process pool of `workers` processes
+when asked for more than one, one job per report. The
+jobs share no mutable state: each reads the ledger DB on its own
+connection, and the CSVs are written by report_io (temp file + atomic
+rename), so a crash never leaves a half-written report behind.
+
+build_vectorized_reports() runs the report_vectorized builders in the pool.
+The parsed ledger arrays are not pickled to the workers: the parent
+makes sure the ledger_cache generation is current and passes only its
+number, and every worker memory-maps the same `.npy` files
+(ledger_cache.open_generation()), so the pages are shared through the OS
+page cache.
+
+By default (workers=None or 1) everything runs in-process: the daily-table
+report jobs take milliseconds, less than starting a pool, and with the
+"spawn" start method (Windows, macOS) every worker re-imports pandas.
+"""
+
+import logging
+import os
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+import pandas as pd
+
+import ledger_asset_report
+import ledger_cache
+import ledger_eur_report
+import ledger_sell_report
+import portfolio_summary
+import report_engine
+import report_vectorized
+import storage
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
+    )
+
+REPORT_JOBS = ("eur", "asset", "sell")
+JOBS = REPORT_JOBS + ("summary",)
+
+
+def _summary(days: int, db_path: str | None) -> int:
+    # FIFO always replays the full history; `days` does not apply
+    return len(portfolio_summary.update_summary())
+
+
+def _runner(name: str) -> Callable[[int, str | None], int]:
+    # looked up per call, so the report modules' functions can be replaced
+    if name == "summary":
+        return _summary
+    module = {
+        "eur": ledger_eur_report,
+        "asset": ledger_asset_report,
+        "sell": ledger_sell_report,
+    }[name]
+    runner: Callable[[int, str | None], int] = getattr(module, f"refresh_{name}_report")
+    return runner
+
+
+def _workers(workers: int | None, jobs: int) -> int:
+    return max(1, min(workers or 1, jobs))
+
+
+def _run_job(name: str, days: int, db_path: str | None) -> tuple[str, int, float]:
+    started = time.monotonic()
+    rows = _runner(name)(days, db_path)
+    return name, rows, time.monotonic() - started
+
+
+def run_reports(
+    days: int = 7,
+    db_path: str | None = None,
+    jobs: Iterable[str] = REPORT_JOBS,
+    workers: int | None = None,
+) -> dict[str, int]:
+    """
+    Refresh the report CSVs named in `jobs` (see JOBS), in a pool of up to
+    `workers` processes if `workers` > 1 (default: in-process, also without
+    a DB). Returns {job: report rows}; a job that fails is logged and
+    reported as -1.
+    """
+    names = list(jobs)
+    unknown = [n for n in names if n not in JOBS]
+    if unknown:
+        raise ValueError(f"Unknown report jobs: {unknown}, expected some of {JOBS}")
+    max_workers = _workers(workers, len(names))
+    if not os.path.exists(db_path or storage.LEDGER_DB_FILE):
+        max_workers = 1  # nothing to build, not worth a pool
+    results: dict[str, int] = {}
+
+    if max_workers == 1:
+        for name in names:
+            try:
+                _, results[name], secs = _run_job(name, days, db_path)
+                logger.debug("Report %s: %d rows in %.2fs", name, results[name], secs)
+            except Exception as e:
+                logger.exception("Report %s failed: %s", name, e)
+                results[name] = -1
+        return results
+
+    logger.info("Building %d reports with %d workers", len(names), max_workers)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {n: pool.submit(_run_job, n, days, db_path) for n in names}
+        for name, fut in futures.items():
+            try:
+                _, results[name], secs = fut.result()
+                logger.debug("Report %s: %d rows in %.2fs", name, results[name], secs)
+            except Exception as e:
+                logger.exception("Report %s failed: %s", name, e)
+                results[name] = -1
+    return results
+
+
+def _build_vectorized(
+    name: str,
+    cache_dir: str,
+    generation: int,
+    days: int,
+    start: report_engine.DateLike | None,
+    end: report_engine.DateLike | None,
+) -> pd.DataFrame:
+    columns = ledger_cache.open_generation(cache_dir, generation)
+    frame = report_vectorized.frame_from_columns(columns)
+    return report_vectorized.BUILDERS[name](frame, days, start, end)
+
+
+def build_vectorized_reports(
+    db_path: str | None = None,
+    days: int = 7,
+    names: Iterable[str] = tuple(report_vectorized.BUILDERS),
+    workers: int | None = None,
+    start: report_engine.DateLike | None = None,
+    end: report_engine.DateLike | None = None,
+    cache_dir: str | None = None,
+) -> dict[str, pd.DataFrame]:
+    """report_vectorized.build_reports() over the ledger_cache columns; with
+    `workers` > 1 one worker process per report, all mapping the same cache
+    generation."""
+    names = list(names)
+    columns: dict[str, Any] | None = ledger_cache.load_ledger_columns(
+        db_path, cache_dir
+    )
+    generation = ledger_cache.current_generation(cache_dir)
+    if columns is None or generation is None:
+        return {name: pd.DataFrame() for name in names}
+    cache_dir = cache_dir or ledger_cache.CACHE_DIR
+
+    max_workers = _workers(workers, len(names))
+    if max_workers == 1:
+        frame = report_vectorized.frame_from_columns(columns)
+        return report_vectorized.build_reports(frame, days, names, start, end)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            name: pool.submit(
+                _build_vectorized, name, cache_dir, generation, days, start, end
+            )
+            for name in names
+        }
+        return {name: fut.result() for name, fut in futures.items()}
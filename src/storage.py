@@ -1,12 +1,17 @@
 # src/storage.py
 import os
-import json
 import sqlite3
 import tempfile
 import shutil
 import logging
+import re
+import zlib
+from collections.abc import Iterable, Iterator
 from typing import Any
 from datetime import datetime, timezone
+from pathlib import Path
+
+import codec
 
 logger = logging.getLogger(__name__)
 if not logger.handlers:
@@ -16,17 +21,94 @@ if not logger.handlers:
 
 BALANCES_DIR = "balances_history"
 RAW_LEDGER_FILE = os.path.join(BALANCES_DIR, "raw-ledger.json")
-UPDATE_LEDGER_FILE = os.path.join(BALANCES_DIR, "update-ledger.json")
 LEDGER_DB_FILE = os.path.join(BALANCES_DIR, "ledger.db")
 DB_FILE = LEDGER_DB_FILE
 
+# Append-only journal of fetched ledger batches (one JSON object per line).
+# raw-ledger.json is now a compacted snapshot: snapshot + journal replay
+# always yields the full ledger, so the DB can be rebuilt from the two.
+LEDGER_JOURNAL_FILE = os.path.join(BALANCES_DIR, "ledger-journal.jsonl")
+JOURNAL_CHUNK_SIZE = 500  # entries per journal line
+JOURNAL_COMPACT_BYTES = 8 * 1024 * 1024  # fold journal into snapshot above this
+BACKUP_RETENTION = 5  # keep at most N timestamped .bak copies per file
+TXID_BATCH_SIZE = 500  # txids per IN (...) query, below SQLite's variable limit
+
+
+# Every ledger row keeps its full entry in `data`, as plain JSON TEXT by
+# default. Opt-in KRAKEN_DATA_ENCODING=zlib stores new rows as a BLOB: a
+# format byte + JSON deflated with a preset dictionary of the keys/values
+# Kraken repeats in every entry (single rows are too small to compress well
+# on their own), about -60% for `data` but ~2x slower load_entries_from_db();
+# compress_data() (update.py --compress-data) re-encodes the existing TEXT
+# rows. Both forms stay readable either way: decode_data() dispatches on type.
+DATA_ENCODINGS = ("json", "zlib")
+DATA_ENCODING = os.getenv("KRAKEN_DATA_ENCODING") or "json"
+if DATA_ENCODING not in DATA_ENCODINGS:
+    raise ValueError(f"KRAKEN_DATA_ENCODING must be one of {DATA_ENCODINGS}")
+DATA_ZLIB_LEVEL = 6
+# raw deflate (no zlib header/checksum, ~10 bytes/row) with a 1 KiB window:
+# rows are a few hundred bytes, and the small window/memLevel make the
+# per-row compressor setup ~2x cheaper than the defaults
+DATA_ZLIB_WBITS = -10
+DATA_ZLIB_MEMLEVEL = 4
+# Format byte -> preset dictionary. Never change a published dictionary (or
+# WBITS): add a new format byte and keep the old ones decodable.
+# \x01: stdlib json.dumps spacing ('"key": value, ')
+# \x02: compact codec.dumps() output ('"key":value,')
+DATA_FORMAT_ZLIB_V1 = b"\x01"
+DATA_FORMAT_ZLIB = b"\x02"
+_DATA_ZDICT_V1 = (
+    b'"type": "deposit", "type": "withdrawal", "type": "transfer", '
+    b'"type": "staking", "type": "earn", "type": "spend", "type": "receive", '
+    b'"subtype": "spottostaking", "subtype": "stakingfromspot", '
+    b'"asset": "XXBT", "asset": "XETH", "asset": "ZUSD", "asset": "ZEUR", '
+    b'{"refid": "", "time": 17, "type": "trade", "subtype": "", '
+    b'"aclass": "currency", "asset": "", "wallet": "spot / main", '
+    b'"amount": "", "fee": "0.0000000000", "balance": "0.0000000000"}'
+)
+_DATA_ZDICTS = {
+    DATA_FORMAT_ZLIB_V1: _DATA_ZDICT_V1,
+    DATA_FORMAT_ZLIB: _DATA_ZDICT_V1.replace(b'": ', b'":').replace(b', "', b',"'),
+}
+
+
+def _compress_text(text: str | bytes) -> bytes:
+    c = zlib.compressobj(
+        DATA_ZLIB_LEVEL,
+        zlib.DEFLATED,
+        DATA_ZLIB_WBITS,
+        DATA_ZLIB_MEMLEVEL,
+        zdict=_DATA_ZDICTS[DATA_FORMAT_ZLIB],
+    )
+    raw = text.encode("utf-8") if isinstance(text, str) else text
+    return DATA_FORMAT_ZLIB + c.compress(raw) + c.flush()
+
+
+def encode_data(entry: dict[str, Any]) -> str | bytes:
+    """Serialise one entry for the ledger `data` column (see DATA_ENCODING)."""
+    raw = codec.dumps(entry)
+    return _compress_text(raw) if DATA_ENCODING == "zlib" else raw.decode("utf-8")
+
+
+def decode_data(value: str | bytes) -> dict[str, Any]:
+    """Inverse of encode_data(); accepts both TEXT and compressed BLOB rows."""
+    if isinstance(value, (bytes, memoryview)):
+        raw = bytes(value)
+        zdict = _DATA_ZDICTS.get(raw[:1])
+        if zdict is None:
+            raise ValueError(f"Unknown ledger data format {raw[:1]!r}")
+        d = zlib.decompressobj(DATA_ZLIB_WBITS, zdict=zdict)
+        value = d.decompress(raw[1:]) + d.flush()
+    obj: dict[str, Any] = codec.loads(value)
+    return obj
+
 
 def _ensure_dir():
     os.makedirs(BALANCES_DIR, exist_ok=True)
 
 
-def _backup_file(path: str):
-    """Create a timestamped backup of path (if exists)."""
+def _backup_file(path: str, keep: int = BACKUP_RETENTION):
+    """Create a timestamped backup of path (if exists), keeping the newest `keep`."""
     try:
         if os.path.exists(path):
             ts = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
@@ -35,14 +117,36 @@ def _backup_file(path: str):
             logger.info("Backup created: %s", backup)
     except Exception as e:
         logger.warning("Failed to backup %s: %s", path, e)
+    _prune_backups(path, keep)
 
 
-def init_db():
-    """Create ledger table if it doesn't exist and ensure date_iso column exists."""
-    _ensure_dir()
-    conn = sqlite3.connect(LEDGER_DB_FILE)
-    cur = conn.cursor()
-    cur.execute(
+def _prune_backups(path: str, keep: int):
+    """Delete all but the newest `keep` timestamped backups of `path`."""
+    dirn = os.path.dirname(path) or "."
+    prefix = os.path.basename(path) + ".bak."
+    try:
+        backups = sorted(f for f in os.listdir(dirn) if f.startswith(prefix))
+    except OSError:
+        return
+    # timestamps are fixed-width UTC, so lexical order == chronological order
+    for name in backups[: max(len(backups) - keep, 0)]:
+        try:
+            os.remove(os.path.join(dirn, name))
+            logger.info("Old backup removed: %s", name)
+        except OSError as e:
+            logger.warning("Failed to remove old backup %s: %s", name, e)
+
+
+# ------------------ schema migrations ------------------
+# Schema changes are ordered migrations keyed on PRAGMA user_version.
+# init_db() applies the pending ones once per process per DB file, so the
+# save/load hot paths no longer inspect the schema on every call.
+# Append new migrations at the end; never renumber or edit applied ones.
+MIGRATION_BATCH_SIZE = 10000  # rows per transaction when backfilling
+
+
+def _m1_create_ledger(conn: sqlite3.Connection):
+    conn.execute(
         """
         CREATE TABLE IF NOT EXISTS ledger (
             txid TEXT PRIMARY KEY,
@@ -57,21 +161,462 @@ def init_db():
         )
         """
     )
-    conn.commit()
-    cur.execute("PRAGMA table_info(ledger)")
-    cols = [r[1] for r in cur.fetchall()]
+
+
+def _m2_add_date_iso(conn: sqlite3.Connection):
+    cols = [r[1] for r in conn.execute("PRAGMA table_info(ledger)")]
     if "date_iso" not in cols:
+        conn.execute("ALTER TABLE ledger ADD COLUMN date_iso TEXT")
+        logger.info("Added missing column date_iso to ledger table")
+
+
+def _m3_backfill_date_iso(conn: sqlite3.Connection):
+    """Derive date_iso (UTC calendar date) from time for rows that lack it."""
+    total = 0
+    while True:
+        conn.execute("BEGIN")
+        cur = conn.execute(
+            """
+            UPDATE ledger SET date_iso = date(time, 'unixepoch')
+            WHERE rowid IN (
+                SELECT rowid FROM ledger
+                WHERE date_iso IS NULL AND time > 0
+                LIMIT ?
+            )
+            """,
+            (MIGRATION_BATCH_SIZE,),
+        )
+        conn.execute("COMMIT")
+        total += cur.rowcount
+        if cur.rowcount < MIGRATION_BATCH_SIZE:
+            break
+    if total:
+        logger.info("Backfilled date_iso for %d ledger rows", total)
+
+
+def _m4_ledger_indexes(conn: sqlite3.Connection):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ledger_time ON ledger(time)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ledger_refid ON ledger(refid)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ledger_date_iso ON ledger(date_iso)")
+
+
+def _m5_create_trades(conn: sqlite3.Connection):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS trades (
+            refid TEXT NOT NULL,
+            asset TEXT NOT NULL,
+            side TEXT NOT NULL,
+            type TEXT,
+            time REAL,
+            date_iso TEXT,
+            base_amount REAL,
+            quote_amount REAL,
+            fee REAL,
+            quote_fee REAL,
+            base_fee REAL,
+            PRIMARY KEY (refid, asset, side)
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_time ON trades(time)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_date_iso ON trades(date_iso)")
+
+
+def _m6_backfill_trades(conn: sqlite3.Connection):
+    """Pair every existing ledger refid into `trades`, one batch per transaction."""
+    keys = [
+        r[0]
+        for r in conn.execute(
+            "SELECT DISTINCT COALESCE(NULLIF(refid, ''), txid) FROM ledger"
+        )
+    ]
+    for i in range(0, len(keys), MIGRATION_BATCH_SIZE):
+        conn.execute("BEGIN")
+        _refresh_trades(conn, keys[i : i + MIGRATION_BATCH_SIZE])
+        conn.execute("COMMIT")
+    if keys:
+        logger.info("Backfilled trades for %d refids", len(keys))
+
+
+def _m7_create_daily_tables(conn: sqlite3.Connection):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS eur_daily (
+            date_iso TEXT NOT NULL,
+            asset TEXT NOT NULL,
+            spent_eur REAL,
+            fee REAL,
+            PRIMARY KEY (date_iso, asset)
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS asset_daily (
+            date_iso TEXT NOT NULL,
+            asset TEXT NOT NULL,
+            amount REAL,
+            PRIMARY KEY (date_iso, asset)
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS sell_daily (
+            date_iso TEXT NOT NULL,
+            asset TEXT NOT NULL,
+            amount REAL,
+            eur REAL,
+            fee REAL,
+            PRIMARY KEY (date_iso, asset)
+        )
+        """
+    )
+
+
+def _m8_backfill_daily_tables(conn: sqlite3.Connection):
+    _refresh_daily(conn)
+
+
+def _compact_json(text: str) -> str:
+    """`text` re-serialised the way encode_data() writes it (as is if invalid)."""
+    try:
+        return codec.dumps(codec.loads(text)).decode("utf-8")
+    except ValueError:
+        return text  # decode_data() reports it on load
+
+
+def _compress_rows(conn: sqlite3.Connection) -> int:
+    """
+    Re-encode the TEXT `data` rows as compressed BLOBs, one batch of
+    MIGRATION_BATCH_SIZE per transaction, then VACUUM so the freed pages are
+    returned to the filesystem. Returns the number of rows re-encoded.
+    """
+    total = 0
+    while True:
+        rows = conn.execute(
+            "SELECT rowid, data FROM ledger WHERE typeof(data) = 'text' LIMIT ?",
+            (MIGRATION_BATCH_SIZE,),
+        ).fetchall()
+        if not rows:
+            break
+        conn.execute("BEGIN")
+        conn.executemany(
+            "UPDATE ledger SET data = ? WHERE rowid = ?",
+            ((_compress_text(_compact_json(data)), rowid) for rowid, data in rows),
+        )
+        conn.execute("COMMIT")
+        total += len(rows)
+    if total:
+        conn.execute("VACUUM")
+        logger.info("Compressed the data column of %d ledger rows", total)
+    return total
+
+
+def _m9_compress_data(conn: sqlite3.Connection):
+    # upgrading only rewrites the ledger when compression was opted into
+    if DATA_ENCODING == "zlib":
+        _compress_rows(conn)
+
+
+def compress_data(db_path: str | None = None) -> int:
+    """
+    Compress the existing TEXT `data` rows of the hot DB (see _compress_rows).
+    Run once after setting KRAKEN_DATA_ENCODING=zlib on a DB past migration 9;
+    rows written later are compressed on insert. Returns the number of rows
+    re-encoded.
+    """
+    db_path = db_path or LEDGER_DB_FILE
+    if not os.path.exists(db_path):
+        return 0
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        return _compress_rows(conn)
+    finally:
+        conn.close()
+
+
+def _m10_create_daily_changes(conn: sqlite3.Connection):
+    # date_iso -> sequence number of the last _refresh_daily() that touched
+    # it; report writers keep the last seq they saw as their watermark
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS daily_changes (
+            date_iso TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_daily_changes_seq ON daily_changes(seq)"
+    )
+
+
+def _m11_normalize_data(conn: sqlite3.Connection):
+    """
+    Rewrite TEXT `data` rows stored with json.dumps() spacing in the compact
+    form encode_data() writes, one batch per transaction; otherwise the first
+    re-fetch of every unchanged entry would count as an update.
+    """
+    total = last = 0
+    while True:
+        rows = conn.execute(
+            "SELECT rowid, data FROM ledger WHERE rowid > ? AND typeof(data) = 'text' "
+            "ORDER BY rowid LIMIT ?",
+            (last, MIGRATION_BATCH_SIZE),
+        ).fetchall()
+        if not rows:
+            break
+        last = rows[-1][0]
+        changed = []
+        for rowid, data in rows:
+            compact = _compact_json(data)
+            if compact != data:
+                changed.append((compact, rowid))
+        if changed:
+            conn.execute("BEGIN")
+            conn.executemany("UPDATE ledger SET data = ? WHERE rowid = ?", changed)
+            conn.execute("COMMIT")
+            total += len(changed)
+    if total:
+        logger.info("Normalised the data column of %d ledger rows", total)
+
+
+# (version, description, function, manages_own_transactions)
+MIGRATIONS = [
+    (1, "create ledger table", _m1_create_ledger, False),
+    (2, "add ledger.date_iso", _m2_add_date_iso, False),
+    (3, "backfill ledger.date_iso", _m3_backfill_date_iso, True),
+    (4, "ledger indexes on time/refid/date_iso", _m4_ledger_indexes, False),
+    (5, "create trades table", _m5_create_trades, False),
+    (6, "backfill trades", _m6_backfill_trades, True),
+    (7, "create eur/asset/sell daily tables", _m7_create_daily_tables, False),
+    (8, "backfill daily tables", _m8_backfill_daily_tables, False),
+    (9, "compress ledger.data (KRAKEN_DATA_ENCODING=zlib)", _m9_compress_data, True),
+    (10, "create daily_changes table", _m10_create_daily_changes, False),
+    (11, "normalise ledger.data to compact JSON", _m11_normalize_data, True),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+_MIGRATED_DBS: set[str] = set()
+
+
+def migrate(db_path: str | None = None) -> int:
+    """
+    Apply every migration newer than the DB's PRAGMA user_version, in order.
+    Each migration runs in its own transaction together with the
+    user_version bump (batched migrations commit per batch and bump the
+    version afterwards), so an interrupted run resumes where it stopped.
+    Returns the resulting schema version.
+    """
+    db_path = db_path or LEDGER_DB_FILE
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, description, fn, own_tx in MIGRATIONS:
+            if number <= version:
+                continue
+            if own_tx:
+                fn(conn)
+                conn.execute(f"PRAGMA user_version = {int(number)}")
+            else:
+                conn.execute("BEGIN")
+                try:
+                    fn(conn)
+                    conn.execute(f"PRAGMA user_version = {int(number)}")
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+            logger.info("Applied migration %d: %s", number, description)
+            version = number
+        return int(version)
+    finally:
+        conn.close()
+
+
+def init_db():
+    """Create/upgrade the ledger schema (once per process per DB file)."""
+    _ensure_dir()
+    key = os.path.abspath(LEDGER_DB_FILE)
+    if key in _MIGRATED_DBS and os.path.exists(key):
+        return
+    migrate(LEDGER_DB_FILE)
+    _MIGRATED_DBS.add(key)
+
+
+# ------------------ yearly archives ------------------
+# Closed years can be moved out of ledger.db into per-year archives
+# `ledger_<year>.db` next to it (same schema, created by the same
+# MIGRATIONS). Archives are written once by archive_closed_years() and
+# otherwise only ATTACHed read-only: connect() adds TEMP views `ledger` and
+# `trades` (main UNION ALL archives) that shadow the main tables, so reader
+# queries see the full history unchanged. Writers keep plain connections to
+# the hot DB; upsert_entries() never re-inserts archived txids. The daily
+# report tables are small and stay in the hot DB.
+ARCHIVE_PREFIX = "ledger_"
+ARCHIVE_KEEP_YEARS = 1  # closed years kept hot besides the current one
+_ARCHIVE_RE = re.compile(rf"^{ARCHIVE_PREFIX}(\d{{4}})\.db$")
+LEDGER_COLUMNS = "txid, refid, time, date_iso, type, asset, amount, fee, data"
+TRADES_COLUMNS = (
+    "refid, asset, side, type, time, date_iso, "
+    "base_amount, quote_amount, fee, quote_fee, base_fee"
+)
+
+
+def archive_path(year: int, db_path: str | None = None) -> str:
+    db_path = db_path or LEDGER_DB_FILE
+    dirn = os.path.dirname(db_path) or "."
+    return os.path.join(dirn, f"{ARCHIVE_PREFIX}{int(year)}.db")
+
+
+def list_archives(db_path: str | None = None) -> list[tuple[int, str]]:
+    """(year, path) of every yearly archive next to db_path, oldest first."""
+    dirn = os.path.dirname(db_path or LEDGER_DB_FILE) or "."
+    try:
+        names = os.listdir(dirn)
+    except OSError:
+        return []
+    found = []
+    for name in names:
+        m = _ARCHIVE_RE.match(name)
+        if m:
+            found.append((int(m.group(1)), os.path.join(dirn, name)))
+    return sorted(found)
+
+
+def connect(db_path: str | None = None, archives: bool = True) -> sqlite3.Connection:
+    """
+    Open the hot ledger DB for reading. With `archives` the yearly archives
+    are ATTACHed read-only (as `a<year>`) and `ledger` / `trades` resolve to
+    UNION ALL views over main + archives; `main.ledger` is the hot table.
+    SQLite attaches at most 10 databases by default.
+    """
+    db_path = db_path or LEDGER_DB_FILE
+    conn = sqlite3.connect(db_path)
+    found = list_archives(db_path) if archives else []
+    if not found:
+        return conn
+    try:
+        for year, path in found:
+            uri = Path(path).resolve().as_uri() + "?mode=ro"
+            conn.execute(f"ATTACH DATABASE ? AS a{year}", (uri,))
+        schemas = ["main"] + [f"a{year}" for year, _ in found]
+        # identifiers come from the constants above and `a<int year>`;
+        # `rowid AS rowid` keeps `ORDER BY time, rowid` readers working
+        for table, cols in (
+            ("ledger", "rowid AS rowid, " + LEDGER_COLUMNS),
+            ("trades", TRADES_COLUMNS),
+        ):
+            union = " UNION ALL ".join(
+                f"SELECT {cols} FROM {s}.{table}" for s in schemas  # nosec B608
+            )
+            conn.execute(f"CREATE TEMP VIEW {table} AS {union}")  # nosec B608
+    except sqlite3.Error:
+        conn.close()
+        raise
+    return conn
+
+
+def _archive_year(conn: sqlite3.Connection, db_path: str, year: int) -> int:
+    """Move the ledger/trades rows of `year` into its archive, in one
+    transaction across both files. Returns the ledger rows moved."""
+    path = archive_path(year, db_path)
+    migrate(path)
+    span = (f"{year:04d}-01-01", f"{year + 1:04d}-01-01")
+    where = "date_iso >= ? AND date_iso < ?"
+    conn.execute("ATTACH DATABASE ? AS archive", (path,))
+    try:
+        conn.execute("BEGIN")
         try:
-            cur.execute("ALTER TABLE ledger ADD COLUMN date_iso TEXT")
-            conn.commit()
-            logger.info("Added missing column date_iso to ledger table")
-        except Exception as e:
-            logger.warning("Could not add date_iso column: %s", e)
-    conn.close()
+            moved = conn.execute(
+                f"INSERT OR REPLACE INTO archive.ledger ({LEDGER_COLUMNS}) "
+                f"SELECT {LEDGER_COLUMNS} FROM main.ledger WHERE {where}",  # nosec B608
+                span,
+            ).rowcount
+            conn.execute(
+                f"INSERT OR REPLACE INTO archive.trades ({TRADES_COLUMNS}) "
+                f"SELECT {TRADES_COLUMNS} FROM main.trades WHERE {where}",  # nosec B608
+                span,
+            )
+            conn.execute(f"DELETE FROM main.ledger WHERE {where}", span)  # nosec B608
+            conn.execute(f"DELETE FROM main.trades WHERE {where}", span)  # nosec B608
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.execute("DETACH DATABASE archive")
+    logger.info("Archived %d ledger rows of %d into %s", moved, year, path)
+    return int(moved)
+
+
+def archive_closed_years(
+    keep_years: int = ARCHIVE_KEEP_YEARS, db_path: str | None = None
+) -> dict[int, int]:
+    """
+    Move every year older than the current UTC year minus `keep_years` out
+    of the hot DB into `ledger_<year>.db`, then VACUUM the hot DB.
+    Returns {year: ledger rows moved}.
+    """
+    db_path = db_path or LEDGER_DB_FILE
+    if not os.path.exists(db_path):
+        return {}
+    migrate(db_path)
+    boundary = f"{datetime.now(timezone.utc).year - keep_years:04d}-01-01"
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    moved: dict[int, int] = {}
+    try:
+        years = [
+            int(r[0])
+            for r in conn.execute(
+                "SELECT DISTINCT substr(date_iso, 1, 4) FROM ledger "
+                "WHERE date_iso < ? ORDER BY 1",
+                (boundary,),
+            )
+        ]
+        archived = {year for year, _ in list_archives(db_path)}
+        limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+        for year in years:
+            if year not in archived and len(archived) >= limit:
+                logger.warning(
+                    "Not archiving %d: SQLite attaches at most %d archives", year, limit
+                )
+                break
+            moved[year] = _archive_year(conn, db_path, year)
+            archived.add(year)
+        if moved:
+            conn.execute("VACUUM")
+    finally:
+        conn.close()
+    return moved
 
 
-def _atomic_write_json(path: str, data: dict[str, Any]):
-    """Write JSON atomically into `path`."""
+def _archived_txids(txids: list[str], batch_size: int = TXID_BATCH_SIZE) -> set[str]:
+    """Subset of `txids` stored in the yearly archives."""
+    archives = list_archives()
+    if not archives or not txids:
+        return set()
+    found: set[str] = set()
+    conn = connect()
+    try:
+        for year, _ in archives:
+            for i in range(0, len(txids), batch_size):
+                batch = txids[i : i + batch_size]
+                placeholders = ",".join("?" * len(batch))
+                cur = conn.execute(
+                    f"SELECT txid FROM a{year}.ledger WHERE txid IN ({placeholders})",  # nosec B608
+                    batch,
+                )
+                found.update(r[0] for r in cur.fetchall())
+    finally:
+        conn.close()
+    return found
+
+
+def _atomic_write_json(path: str, data: dict[str, Any], pretty: bool = False):
+    """Write JSON atomically into `path` (compact unless `pretty`)."""
     _ensure_dir()
     dirn = os.path.dirname(path) or "."
     fd = None
@@ -80,8 +625,8 @@ def _atomic_write_json(path: str, data: dict[str, Any]):
         fd, tmp_path = tempfile.mkstemp(
             prefix=os.path.basename(path) + ".tmp", dir=dirn
         )
-        with os.fdopen(fd, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        with os.fdopen(fd, "wb") as f:
+            f.write(codec.dumps(data, pretty=pretty))
             f.flush()
             os.fsync(f.fileno())
         os.replace(tmp_path, path)  # atomic replace
@@ -93,82 +638,529 @@ def _atomic_write_json(path: str, data: dict[str, Any]):
                 pass
 
 
+def _entry_row(txid: str, entry: dict[str, Any]) -> tuple:
+    """Build the `ledger` row tuple for one Kraken ledger entry."""
+    ts_val = 0.0
+    if entry.get("time"):
+        try:
+            ts_val = float(entry["time"])
+        except Exception:  # nosec B110 - fall back to no timestamp if conversion fails
+            pass
+    date_iso = None
+    if ts_val:
+        try:
+            date_iso = (
+                datetime.fromtimestamp(ts_val, tz=timezone.utc).date().isoformat()
+            )
+        except Exception:  # nosec B110 - fall back to no date if conversion fails
+            pass
+    return (
+        txid,
+        entry.get("refid"),
+        ts_val,
+        date_iso,
+        entry.get("type"),
+        entry.get("asset"),
+        float(entry.get("amount", 0)),
+        float(entry.get("fee", 0)),
+        encode_data(entry),
+    )
+
+
+def upsert_entries(entries: dict[str, Any]) -> tuple[int, int]:
+    """
+    Insert-or-update `entries` into the ledger table in one transaction,
+    re-pairing the `trades` rows of every refid in the batch.
+    Returns (new, updated): txids that were not stored before, and stored
+    txids whose payload actually changed. Counts come from the statements'
+    change counts, so cost scales with the batch, not with the DB size.
+    """
+    if not entries:
+        return 0, 0
+    init_db()
+    archived = _archived_txids(list(entries))
+    if archived:
+        # closed years live in the archives and are not re-inserted here
+        entries = {k: v for k, v in entries.items() if k not in archived}
+        if not entries:
+            return 0, 0
+    rows = [_entry_row(txid, entry) for txid, entry in entries.items()]
+    conn = sqlite3.connect(LEDGER_DB_FILE)
+    try:
+        cur = conn.executemany(
+            """
+            INSERT INTO ledger
+            (txid, refid, time, date_iso, type, asset, amount, fee, data)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(txid) DO NOTHING
+            """,
+            rows,
+        )
+        new = max(cur.rowcount, 0)
+        # rows inserted just above carry identical data -> not counted here
+        cur = conn.executemany(
+            """
+            UPDATE ledger
+            SET refid = ?, time = ?, date_iso = ?, type = ?, asset = ?,
+                amount = ?, fee = ?, data = ?
+            WHERE txid = ? AND data IS NOT ?
+            """,
+            ((*r[1:], r[0], r[8]) for r in rows),
+        )
+        updated = max(cur.rowcount, 0)
+        dates = _refresh_trades(conn, (r[1] or r[0] for r in rows))
+        if updated:
+            # an in-place update keeps count/rowid: log its dates even when
+            # no trades row covers them, so change fingerprints still move
+            dates |= {r[3] for r in rows if r[3]}
+        _refresh_daily(conn, dates)
+        conn.commit()
+    finally:
+        conn.close()
+    return new, updated
+
+
+def existing_txids(txids: Iterable[str], batch_size: int = TXID_BATCH_SIZE) -> set[str]:
+    """Return the subset of `txids` already stored (hot DB + archives),
+    querying in batches."""
+    if not os.path.exists(LEDGER_DB_FILE):
+        return set()
+    wanted = list(dict.fromkeys(txids))
+    found: set[str] = set()
+    conn = connect()
+    try:
+        for i in range(0, len(wanted), batch_size):
+            batch = wanted[i : i + batch_size]
+            placeholders = ",".join("?" * len(batch))
+            cur = conn.execute(
+                f"SELECT txid FROM ledger WHERE txid IN ({placeholders})",  # nosec B608 - only '?' placeholders are interpolated
+                batch,
+            )
+            found.update(r[0] for r in cur.fetchall())
+    finally:
+        conn.close()
+    return found
+
+
+# ------------------ materialised trades ------------------
+# `trades` holds the ledger legs paired per refid, maintained on every
+# upsert for the refids touched, so FIFO and the reports never regroup the
+# whole ledger. One row per (refid, asset, side) for non-EUR legs:
+#   side          buy  = asset in + EUR out     in  = asset in, no EUR out
+#                 sell = asset out + EUR in     out = asset out, no EUR in
+#   base_amount   |sum| of this asset's legs
+#   quote_amount  EUR paid (buy) / received (sell), allocated by amount share
+#   fee           fees of all legs in the refid, allocated by amount share
+#   quote_fee     fees of the EUR legs, allocated by amount share
+#   base_fee      fees of this asset's own legs
+# refid falls back to the txid when empty; `type` is the asset legs' type.
+EUR_ASSETS = {"ZEUR", "EUR"}
+
+
+def _pair_legs(refid: str, legs: list[tuple]) -> list[tuple]:
+    """Turn one refid's ledger legs (type, asset, amount, fee, time, date_iso)
+    into `trades` rows."""
+    eur_out = [lg for lg in legs if lg[1] in EUR_ASSETS and lg[2] < 0]
+    eur_in = [lg for lg in legs if lg[1] in EUR_ASSETS and lg[2] > 0]
+    total_fee = sum(lg[3] for lg in legs)
+    rows = []
+    for direction in (1, -1):
+        side_legs = [
+            lg for lg in legs if lg[1] not in EUR_ASSETS and lg[2] * direction > 0
+        ]
+        if not side_legs:
+            continue
+        if direction > 0:
+            quote, quote_legs = sum(-lg[2] for lg in eur_out), eur_out
+            side = "buy" if eur_out else "in"
+        else:
+            quote, quote_legs = sum(lg[2] for lg in eur_in), eur_in
+            side = "sell" if eur_in else "out"
+        quote_fee = sum(lg[3] for lg in quote_legs)
+        total_amount = sum(abs(lg[2]) for lg in side_legs)
+
+        per_asset: dict[str, list[tuple]] = {}
+        for lg in side_legs:
+            per_asset.setdefault(lg[1], []).append(lg)
+        for asset, asset_legs in per_asset.items():
+            amount = sum(abs(lg[2]) for lg in asset_legs)
+            share = amount / total_amount if total_amount else 1.0
+            first = min(asset_legs, key=lambda lg: lg[4] or 0.0)
+            rows.append(
+                (
+                    refid,
+                    asset,
+                    side,
+                    first[0],
+                    first[4],
+                    first[5],
+                    amount,
+                    quote * share,
+                    total_fee * share,
+                    quote_fee * share,
+                    sum(lg[3] for lg in asset_legs),
+                )
+            )
+    return rows
+
+
+def _refresh_trades(conn: sqlite3.Connection, refids: Iterable[str]) -> set[str]:
+    """Recompute the `trades` rows of `refids` from their ledger legs.
+    Runs inside the caller's transaction. Returns the dates (date_iso) of
+    the replaced and the new rows."""
+    keys = list(dict.fromkeys(refids))
+    dates: set[str] = set()
+    for i in range(0, len(keys), TXID_BATCH_SIZE):
+        batch = keys[i : i + TXID_BATCH_SIZE]
+        placeholders = ",".join("?" * len(batch))
+        # refid IN (...) uses idx_ledger_refid; txid IN (...) catches legs
+        # without refid, whose grouping key is their own txid. Only '?'
+        # placeholders are interpolated.
+        cur = conn.execute(
+            f"""
+            SELECT COALESCE(NULLIF(refid, ''), txid), type, asset, amount, fee,
+                   time, date_iso
+            FROM ledger
+            WHERE refid IN ({placeholders}) OR txid IN ({placeholders})
+            """,  # nosec B608
+            batch + batch,
+        )
+        wanted = set(batch)
+        legs: dict[str, list[tuple]] = {}
+        for key, *leg in cur.fetchall():
+            if key in wanted:
+                legs.setdefault(key, []).append(
+                    (
+                        leg[0],
+                        leg[1],
+                        float(leg[2] or 0.0),
+                        float(leg[3] or 0.0),
+                        leg[4],
+                        leg[5],
+                    )
+                )
+        dates.update(
+            r[0]
+            for r in conn.execute(
+                f"SELECT DISTINCT date_iso FROM trades WHERE refid IN ({placeholders})",  # nosec B608 - only '?' placeholders are interpolated
+                batch,
+            )
+        )
+        conn.execute(
+            f"DELETE FROM trades WHERE refid IN ({placeholders})",  # nosec B608 - only '?' placeholders are interpolated
+            batch,
+        )
+        rows = [
+            row for key, key_legs in legs.items() for row in _pair_legs(key, key_legs)
+        ]
+        dates.update(row[5] for row in rows)
+        conn.executemany(
+            "INSERT INTO trades VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+        )
+    dates.discard(None)
+    return dates
+
+
+# table -> aggregate over `trades` (filtered by the caller's date clause)
+DAILY_AGGREGATES = {
+    "eur_daily": """
+        SELECT date_iso, asset, SUM(quote_amount), SUM(quote_fee)
+        FROM trades
+        WHERE side = 'buy' AND type IN ('receive', 'spend', 'trade') AND {dates}
+        GROUP BY date_iso, asset
+    """,
+    "asset_daily": """
+        SELECT date_iso, asset, SUM(base_amount)
+        FROM trades
+        WHERE side IN ('buy', 'in') AND {dates}
+        GROUP BY date_iso, asset
+    """,
+    "sell_daily": """
+        SELECT date_iso, asset, SUM(base_amount), SUM(quote_amount), SUM(base_fee)
+        FROM trades
+        WHERE side = 'sell' AND {dates}
+        GROUP BY date_iso, asset
+    """,
+}
+
+
+def _refresh_daily(conn: sqlite3.Connection, dates: Iterable[str] | None = None):
+    """Recompute the daily report tables for `dates` (all dates if None)
+    from `trades` and log the dates in `daily_changes`. Runs inside the
+    caller's transaction."""
+    # table names come from DAILY_AGGREGATES, values are bound as '?'
+    if dates is None:
+        touched = _daily_dates(conn)
+        for table, select in DAILY_AGGREGATES.items():
+            conn.execute(f"DELETE FROM {table}")  # nosec B608
+            conn.execute(
+                f"INSERT INTO {table} " + select.format(dates="date_iso IS NOT NULL")
+            )
+        _log_daily_changes(conn, touched | _daily_dates(conn))
+        return
+    days = sorted(dates)
+    for i in range(0, len(days), TXID_BATCH_SIZE):
+        batch = days[i : i + TXID_BATCH_SIZE]
+        clause = f"date_iso IN ({','.join('?' * len(batch))})"
+        for table, select in DAILY_AGGREGATES.items():
+            conn.execute(f"DELETE FROM {table} WHERE {clause}", batch)  # nosec B608
+            conn.execute(f"INSERT INTO {table} " + select.format(dates=clause), batch)
+    _log_daily_changes(conn, days)
+
+
+def _daily_dates(conn: sqlite3.Connection) -> set[str]:
+    return {
+        row[0]
+        for table in DAILY_AGGREGATES
+        for row in conn.execute(f"SELECT DISTINCT date_iso FROM {table}")  # nosec B608
+    }
+
+
+def _log_daily_changes(conn: sqlite3.Connection, dates: Iterable[str]):
+    """Stamp `dates` with the next daily_changes sequence number."""
+    try:
+        seq = conn.execute(
+            "SELECT COALESCE(MAX(seq), 0) + 1 FROM daily_changes"
+        ).fetchone()[0]
+    except sqlite3.OperationalError:
+        return  # daily backfill of migration 8, before daily_changes exists
+    conn.executemany(
+        """
+        INSERT INTO daily_changes (date_iso, seq) VALUES (?, ?)
+        ON CONFLICT(date_iso) DO UPDATE SET seq = excluded.seq
+        """,
+        ((d, seq) for d in dates),
+    )
+
+
+def daily_changes(
+    since_seq: int = 0, db_path: str | None = None
+) -> tuple[int, set[str]]:
+    """
+    Dates whose daily report rows were recomputed after `since_seq` ->
+    (current seq, dates). Pass the returned seq back on the next call to
+    get only the dates changed in between.
+    """
+    db_path = db_path or LEDGER_DB_FILE
+    conn = sqlite3.connect(db_path)
+    try:
+        # seq first: a refresh committed in between is reported again on the
+        # next call instead of being skipped
+        seq = conn.execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM daily_changes"
+        ).fetchone()[0]
+        dates = {
+            row[0]
+            for row in conn.execute(
+                "SELECT date_iso FROM daily_changes WHERE seq > ?", (since_seq,)
+            )
+        }
+    finally:
+        conn.close()
+    return int(seq), dates
+
+
+def load_trades(
+    start: float | None = None, end: float | None = None
+) -> list[dict[str, Any]]:
+    """
+    Return materialised trades (hot DB + yearly archives) ordered by time,
+    optionally limited to start <= time < end (UTC seconds; uses
+    idx_trades_time).
+    """
+    if not os.path.exists(LEDGER_DB_FILE):
+        return []
+    init_db()
+    sql = "SELECT * FROM trades"
+    clauses, params = [], []
+    if start is not None:
+        clauses.append("time >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append("time < ?")
+        params.append(end)
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY time, refid"
+    conn = connect()
+    conn.row_factory = sqlite3.Row
+    try:
+        return [dict(r) for r in conn.execute(sql, params)]
+    finally:
+        conn.close()
+
+
+# ------------------ append-only journal ------------------
+def append_journal(entries: dict[str, Any], source: str = "fetch"):
+    """
+    Append `entries` to the ledger journal as JSON lines of at most
+    JOURNAL_CHUNK_SIZE entries each. Cost is O(len(entries)) regardless of
+    how much history is already stored; each line is fsync'ed so a crash
+    can lose at most the line being written (torn lines are skipped on read).
+    A torn last line is terminated first so the new records start on their
+    own line instead of being merged into it.
+    """
+    if not entries:
+        return
+    _ensure_dir()
+    ts = datetime.now(timezone.utc).isoformat()
+    items = list(entries.items())
+    with open(LEDGER_JOURNAL_FILE, "ab+") as f:
+        if f.seek(0, os.SEEK_END):
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+        for i in range(0, len(items), JOURNAL_CHUNK_SIZE):
+            record = {
+                "ts": ts,
+                "source": source,
+                "entries": dict(items[i : i + JOURNAL_CHUNK_SIZE]),
+            }
+            f.write(codec.dumps(record))
+            f.write(b"\n")
+        f.flush()
+        os.fsync(f.fileno())
+    logger.info("Journal: appended %d entries (%s)", len(entries), source)
+
+
+def _iter_journal():
+    """Yield the `entries` dict of every intact journal record, oldest first."""
+    if not os.path.exists(LEDGER_JOURNAL_FILE):
+        return
+    with open(LEDGER_JOURNAL_FILE, "rb") as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = codec.loads(line)
+            except ValueError:
+                logger.warning(
+                    "Skipping corrupt journal line %d in %s",
+                    lineno,
+                    LEDGER_JOURNAL_FILE,
+                )
+                continue
+            batch = record.get("entries") if isinstance(record, dict) else None
+            if isinstance(batch, dict):
+                yield batch
+
+
+def _read_snapshot() -> dict[str, Any]:
+    """Read raw-ledger.json (empty dict if absent/empty); raises if unreadable."""
+    if not os.path.exists(RAW_LEDGER_FILE):
+        return {}
+    try:
+        if os.path.getsize(RAW_LEDGER_FILE) == 0:
+            return {}
+    except Exception:  # nosec B110 - corrupted/missing file treated as empty state
+        pass
+    with open(RAW_LEDGER_FILE, "rb") as f:
+        data: dict[str, Any] = codec.loads(f.read())
+    return data
+
+
+def _load_snapshot() -> dict[str, Any]:
+    """Load the compacted raw-ledger.json snapshot (empty dict if absent/invalid)."""
+    try:
+        return _read_snapshot()
+    except ValueError:
+        logger.warning(
+            "raw-ledger.json is present but invalid JSON; returning empty dict"
+        )
+        return {}
+    except Exception as e:
+        logger.exception("Unexpected error reading raw-ledger.json: %s", e)
+        return {}
+
+
+def compact_journal() -> int:
+    """
+    Fold the journal into raw-ledger.json and truncate it.
+    The previous snapshot is kept as a retention-bounded .bak copy.
+    The snapshot is replaced before the journal is truncated, so a crash in
+    between only means the same entries are replayed twice (idempotent).
+    An unreadable snapshot is left untouched (nothing is compacted), since
+    overwriting it would leave the rotating .bak copies as the only record.
+    Returns the number of entries in the new snapshot.
+    """
+    try:
+        entries = _read_snapshot()
+    except Exception as e:
+        logger.error(
+            "raw-ledger.json is unreadable (%s); not compacting the journal. "
+            "Restore it from a raw-ledger.json.bak.* copy or move it aside.",
+            e,
+        )
+        return 0
+    for batch in _iter_journal():
+        entries.update(batch)
+    if not entries:
+        return 0
+    _backup_file(RAW_LEDGER_FILE)
+    _atomic_write_json(RAW_LEDGER_FILE, entries)
+    open(LEDGER_JOURNAL_FILE, "w").close()
+    logger.info("Journal compacted into raw-ledger.json (%d entries)", len(entries))
+    return len(entries)
+
+
+def _maybe_compact():
+    """Compact when no snapshot exists yet or the journal outgrew its budget."""
+    try:
+        size = os.path.getsize(LEDGER_JOURNAL_FILE)
+    except OSError:
+        size = 0
+    if not os.path.exists(RAW_LEDGER_FILE) or size >= JOURNAL_COMPACT_BYTES:
+        compact_journal()
+
+
+def rebuild_db_from_journal() -> int:
+    """Re-insert every entry from snapshot + journal into ledger.db."""
+    entries = load_entries()
+    if not entries:
+        logger.warning("Nothing to rebuild: snapshot and journal are empty.")
+        return 0
+    upsert_entries(entries)
+    logger.info("Rebuilt ledger.db from journal (%d entries)", len(entries))
+    return len(entries)
+
+
 def save_entries(entries: dict[str, Any]):
     """
-    Save ledger entries to raw-ledger.json and to SQLite.
+    Save ledger entries to the journal and to SQLite.
     Used by start.py during initialization (full save).
     IMPORTANT: if entries is empty -> skip to avoid accidental wipe.
     """
     if not entries:
         logger.warning("save_entries called with empty entries — skipping write.")
         return
-    _ensure_dir()
-    try:
-        _backup_file(RAW_LEDGER_FILE)
-    except Exception:  # nosec B110 - backup is best-effort, missing source file is fine
-        pass
     try:
-        _atomic_write_json(RAW_LEDGER_FILE, entries)
-        logger.info("raw-ledger.json written (%d entries)", len(entries))
+        append_journal(entries, source="save_entries")
+        _maybe_compact()
     except Exception as e:
-        logger.exception("Failed to write raw-ledger.json: %s", e)
+        logger.exception("Failed to journal ledger entries: %s", e)
     try:
-        init_db()
-        conn = sqlite3.connect(LEDGER_DB_FILE)
-        cur = conn.cursor()
-        for txid, entry in entries.items():
-            try:
-                ts_val = float(entry.get("time", 0))
-            except Exception:
-                ts_val = 0.0
-            try:
-                date_iso = (
-                    datetime.fromtimestamp(ts_val, tz=timezone.utc).date().isoformat()
-                    if ts_val
-                    else None
-                )
-            except Exception:
-                date_iso = None
-            cur.execute(
-                """
-                INSERT OR REPLACE INTO ledger
-                (txid, refid, time, date_iso, type, asset, amount, fee, data)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    txid,
-                    entry.get("refid"),
-                    ts_val,
-                    date_iso,
-                    entry.get("type"),
-                    entry.get("asset"),
-                    float(entry.get("amount", 0)),
-                    float(entry.get("fee", 0)),
-                    json.dumps(entry, ensure_ascii=False),
-                ),
-            )
-        conn.commit()
-        logger.info("Saved %d entries into ledger.db", len(entries))
+        new, updated = upsert_entries(entries)
+        logger.info(
+            "Saved %d entries into ledger.db (new=%d, updated=%d)",
+            len(entries),
+            new,
+            updated,
+        )
     except Exception as e:
         logger.exception("Failed to save entries into DB: %s", e)
-    finally:
-        try:
-            conn.close()
-        except Exception:  # nosec B110 - connection may already be closed
-            pass
 
 
 # ------------------ NEW: save_update_entries ------------------
 def save_update_entries(entries: dict[str, Any]) -> int:
     """
-    Save incremental update entries to a separate JSON file (update-ledger.json)
+    Append incremental update entries to the ledger journal
     AND insert/replace those entries into the SQLite DB.
 
     Returns the number of *new* txids actually inserted (not counting
     already-present txids that were replaced).
 
     Safe to call multiple times — ensures:
-      - all entries written atomically to update-ledger.json
+      - entries are appended to the journal (no full-file rewrite)
       - DB always contains up-to-date records
       - returns count of newly inserted txids
     """
@@ -176,91 +1168,27 @@ def save_update_entries(entries: dict[str, Any]) -> int:
         logger.info("save_update_entries called with empty entries — nothing to do.")
         return 0
 
-    _ensure_dir()
-
-    # --- Step 1: Backup and save JSON file ---
-    try:
-        _backup_file(UPDATE_LEDGER_FILE)
-    except Exception:  # nosec B110 - ignore missing old file
-        pass  # ignore missing old file
-
+    # --- Step 1: append to journal ---
     try:
-        _atomic_write_json(UPDATE_LEDGER_FILE, entries)
-        logger.info("update-ledger.json written (%d entries)", len(entries))
+        append_journal(entries, source="update")
+        _maybe_compact()
     except Exception as e:
-        logger.exception("Failed to write update-ledger.json: %s", e)
+        logger.exception("Failed to journal update entries: %s", e)
 
-    # --- Step 2: Insert entries into SQLite DB ---
+    # --- Step 2: Upsert entries into SQLite DB ---
     inserted_new = 0
-    conn = None
-
     try:
-        init_db()
-        conn = sqlite3.connect(LEDGER_DB_FILE)
-        cur = conn.cursor()
-
-        # Load only txid column (fast)
-        cur.execute("SELECT txid FROM ledger")
-        existing_txids = {r[0] for r in cur.fetchall()}
-
-        for txid, entry in entries.items():
-            # Convert timestamp to ISO date
-            ts_val = 0.0
-            if entry.get("time"):
-                try:
-                    ts_val = float(entry["time"])
-                except (
-                    Exception
-                ):  # nosec B110 - fall back to no timestamp if conversion fails
-                    pass
-            date_iso = None
-            if ts_val:
-                try:
-                    date_iso = (
-                        datetime.fromtimestamp(ts_val, tz=timezone.utc)
-                        .date()
-                        .isoformat()
-                    )
-                except (
-                    Exception
-                ):  # nosec B110 - fall back to no timestamp if conversion fails
-                    pass
-
-            cur.execute(
-                """
-                INSERT OR REPLACE INTO ledger
-                (txid, refid, time, date_iso, type, asset, amount, fee, data)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    txid,
-                    entry.get("refid"),
-                    ts_val,
-                    date_iso,
-                    entry.get("type"),
-                    entry.get("asset"),
-                    float(entry.get("amount", 0)),
-                    float(entry.get("fee", 0)),
-                    json.dumps(entry, ensure_ascii=False),
-                ),
-            )
-
-            # count as new only if txid wasn't already in DB
-            if txid not in existing_txids:
-                inserted_new += 1
-
-        conn.commit()
+        inserted_new, updated = upsert_entries(entries)
         logger.info(
-            "Saved %d entries into ledger.db (new=%d)", len(entries), inserted_new
+            "Saved %d entries into ledger.db (new=%d, updated=%d)",
+            len(entries),
+            inserted_new,
+            updated,
         )
-
     except sqlite3.Error as e:
         logger.exception("SQLite error while saving entries: %s", e)
     except Exception as e:
         logger.exception("Failed to save update entries into DB: %s", e)
-    finally:
-        if conn:
-            conn.close()
 
     return inserted_new
 
@@ -273,7 +1201,7 @@ def load_entries_from_db() -> dict[str, Any]:
     if not os.path.exists(LEDGER_DB_FILE):
         return {}
 
-    conn = sqlite3.connect(LEDGER_DB_FILE)
+    conn = connect()
     cur = conn.cursor()
 
     try:
@@ -287,38 +1215,54 @@ def load_entries_from_db() -> dict[str, Any]:
     conn.close()
 
     entries: dict[str, Any] = {}
-    for txid, data_json, date_iso in rows:
+    for txid, data, date_iso in rows:
         try:
-            obj = json.loads(data_json)
+            obj = decode_data(data)
         except Exception:
-            obj = {"raw": data_json}
+            obj = {"raw": data}
         if date_iso:
             obj["date"] = date_iso
         entries[txid] = obj
     return entries
 
 
-def load_entries() -> dict[str, Any]:
-    """Load ledger from raw-ledger.json (used by start.py)."""
-    if not os.path.exists(RAW_LEDGER_FILE):
-        return {}
+def iter_entries(
+    since: float | None = None, batch_size: int = 1000
+) -> Iterator[tuple[str, dict[str, Any]]]:
+    """
+    Stream (txid, entry) from the DB (hot + archives) in time order, only
+    rows with time >= `since` if given (idx_ledger_time). Entries get
+    `date` like load_entries_from_db(); memory stays at one batch.
+    """
+    if not os.path.exists(LEDGER_DB_FILE):
+        return
+    sql = "SELECT txid, data, date_iso FROM ledger"
+    params: tuple = ()
+    if since is not None:
+        sql += " WHERE time >= ?"
+        params = (since,)
+    conn = connect()
     try:
-        if os.path.getsize(RAW_LEDGER_FILE) == 0:
-            return {}
-    except Exception:  # nosec B110 - corrupted/missing file treated as empty state
-        pass
+        cur = conn.execute(sql + " ORDER BY time", params)
+        while rows := cur.fetchmany(batch_size):
+            for txid, data, date_iso in rows:
+                try:
+                    obj = decode_data(data)
+                except Exception:
+                    obj = {"raw": data}
+                if date_iso:
+                    obj["date"] = date_iso
+                yield txid, obj
+    finally:
+        conn.close()
 
-    try:
-        with open(RAW_LEDGER_FILE, encoding="utf-8") as f:
-            # before return json.load(f)
-            # after
-            data: dict[str, Any] = json.load(f)
-            return data
-    except json.JSONDecodeError:
-        logger.warning(
-            "raw-ledger.json is present but invalid JSON; returning empty dict"
-        )
-        return {}
-    except Exception as e:
-        logger.exception("Unexpected error reading raw-ledger.json: %s", e)
-        return {}
+
+def load_entries() -> dict[str, Any]:
+    """
+    Load the full ledger from raw-ledger.json plus the journal (used by start.py).
+    Journal records are replayed in order on top of the snapshot, later wins.
+    """
+    entries = _load_snapshot()
+    for batch in _iter_journal():
+        entries.update(batch)
+    return entries
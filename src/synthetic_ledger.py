@@ -0,0 +1,366 @@
+# synthetic_ledger.py
+"""
+Synthetic Kraken ledgers for scale tests and benchmarks.
+
+generate() produces a txid -> entry dict shaped like Kraken's `Ledgers`
+result (refid, time, type, subtype, aclass, asset, amount, fee, balance;
+amounts as decimal strings), in time order:
+
+  trade       buys (ZEUR leg out + asset leg in) and sells under one refid,
+              the 0.26% fee on the ZEUR leg
+  staking     rewards credited to a staking wallet (`DOT.S`, `SOL.F`,
+              `ADA.B`, `DOT28.S`, ...)
+  transfer    spot <-> staking moves: two legs under one refid, subtypes
+              spottostaking/stakingfromspot and stakingtospot/spotfromstaking
+  deposit     EUR or crypto in
+  withdrawal  EUR or crypto out, with a withdrawal fee
+
+Balances are tracked per wallet, so nothing is sold, moved or withdrawn that
+was not held; a buy without enough EUR is preceded by an EUR deposit. Asset
+k of `assets` is picked with weight 1 / (k + 1) ** skew (a long tail by
+default, skew=0 for uniform) and prices follow a random walk per asset.
+The same seed gives the same ledger.
+
+to_db() / to_raw_json() write a ledger into ledger.db / raw-ledger.json,
+and SyntheticKrakenAPI serves it through the KrakenAPI methods the loaders
+use (get_ledgers paging, get_balance, get_asset_pairs, get_ticker), so
+ledger_loader.fetch_ledger() and balances run against it offline.
+
+    python src/synthetic_ledger.py --entries 100000 --assets 50 --years 3 --db
+"""
+
+import argparse
+import base64
+import bisect
+import logging
+import math
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any
+
+import codec
+import storage
+from config import DEFAULT_PAGE_SIZE
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
+    )
+
+EUR = "ZEUR"
+KNOWN_ASSETS = (
+    "XXBT",
+    "XETH",
+    "SOL",
+    "DOT",
+    "ADA",
+    "XXRP",
+    "LINK",
+    "ATOM",
+    "GRT",
+    "XXDG",
+    "XLTC",
+    "AVAX",
+    "UNI",
+    "XXLM",
+    "ALGO",
+    "KSM",
+    "XTZ",
+    "FLOW",
+    "TRX",
+    "MINA",
+)
+STAKING_SUFFIXES = (".S", ".F", ".B", "28.S")
+# event kind -> relative frequency
+MIX = {
+    "buy": 0.40,
+    "sell": 0.20,
+    "staking": 0.20,
+    "transfer": 0.08,
+    "deposit": 0.06,
+    "withdrawal": 0.06,
+}
+LEGS = {"buy": 2, "sell": 2, "transfer": 2}  # others have one leg
+TRADE_FEE = 0.0026
+
+
+def asset_names(n: int) -> list[str]:
+    """
+    `n` asset codes: real Kraken codes first, then QAAU, QAAV, ... (letters
+    only: digits before a wallet suffix read as a lock term, A020.S -> A).
+    """
+    names = list(KNOWN_ASSETS[:n])
+    for k in range(len(names), n):
+        names.append("Q" + "".join(chr(65 + k // 26**i % 26) for i in (2, 1, 0)))
+    return names
+
+
+def staking_wallet(asset: str, suffix: str) -> str:
+    """Staking wallet code of a spot asset: XXBT + .S -> XBT.S, DOT + 28.S -> DOT28.S."""
+    base = asset[1:] if len(asset) == 4 and asset[0] in "XZ" else asset
+    return base + suffix
+
+
+def _amount(value: float, asset: str) -> str:
+    return f"{value:.4f}" if asset == EUR else f"{value:.10f}"
+
+
+class _Builder:
+    def __init__(self, rng: random.Random) -> None:
+        self.rng = rng
+        self.entries: dict[str, dict[str, Any]] = {}
+        self.balance: defaultdict[str, float] = defaultdict(float)
+
+    def _id(self, prefix: str) -> str:
+        s = base64.b32encode(self.rng.getrandbits(80).to_bytes(10, "big")).decode()
+        return f"{prefix}{s[:5]}-{s[5:10]}-{s[10:16]}"
+
+    def leg(
+        self,
+        refid: str,
+        ts: float,
+        typ: str,
+        asset: str,
+        amount: float,
+        fee: float = 0.0,
+        subtype: str = "",
+    ) -> None:
+        self.balance[asset] += amount - fee
+        self.entries[self._id("L")] = {
+            "refid": refid,
+            "time": ts,
+            "type": typ,
+            "subtype": subtype,
+            "aclass": "currency",
+            "asset": asset,
+            "amount": _amount(amount, asset),
+            "fee": _amount(fee, asset),
+            "balance": _amount(max(self.balance[asset], 0.0), asset),
+        }
+
+    def refid(self, prefix: str) -> str:
+        return self._id(prefix)
+
+
+def generate(
+    entries: int | None = None,
+    assets: int = 10,
+    years: float = 1.0,
+    trades_per_day: float = 20.0,
+    seed: int = 1,
+    skew: float = 1.0,
+    end: float | None = None,
+) -> dict[str, dict[str, Any]]:
+    """
+    A synthetic ledger over `years` years ending at `end` (default: now).
+    With `entries` the ledger has about that many entries; otherwise
+    `trades_per_day` buy/sell events per day (other events in MIX
+    proportion).
+    """
+    rng = random.Random(seed)  # nosec B311 - synthetic data, not crypto
+    names = asset_names(assets)
+    weights = [1 / (k + 1) ** skew for k in range(assets)]
+    kinds, kind_weights = list(MIX), list(MIX.values())
+    span = years * 365 * 86400
+    end = end if end is not None else time.time() - 60
+    if entries is not None:
+        legs = sum(w * LEGS.get(k, 1) for k, w in MIX.items()) / sum(kind_weights)
+        events = math.ceil(entries / legs)
+    else:
+        trade_share = (MIX["buy"] + MIX["sell"]) / sum(kind_weights)
+        events = math.ceil(trades_per_day * span / 86400 / trade_share)
+    times = sorted(round(end - rng.random() * span, 4) for _ in range(events))
+
+    b = _Builder(rng)
+    price = {a: math.exp(rng.uniform(math.log(0.05), math.log(60000))) for a in names}
+    wallets: dict[str, list[str]] = {a: [] for a in names}  # staking wallets in use
+
+    for ts, kind, asset in zip(
+        times,
+        rng.choices(kinds, kind_weights, k=events),
+        rng.choices(names, weights, k=events),
+    ):
+        price[asset] *= math.exp(rng.gauss(0, 0.02))
+        p = price[asset]
+        if kind == "sell" and b.balance[asset] <= 0:
+            kind = "buy"
+        if kind == "transfer" and b.balance[asset] <= 0 and not wallets[asset]:
+            kind = "buy"
+
+        if kind == "buy":
+            eur = rng.uniform(10, 2000)
+            fee = eur * TRADE_FEE
+            if b.balance[EUR] < eur + fee:
+                b.leg(b.refid("Q"), ts, "deposit", EUR, round(2 * (eur + fee), 2))
+            ref = b.refid("T")
+            b.leg(ref, ts, "trade", EUR, -eur, fee)
+            b.leg(ref, ts, "trade", asset, eur / p)
+        elif kind == "sell":
+            qty = b.balance[asset] * rng.uniform(0.05, 0.6)
+            eur = qty * p
+            ref = b.refid("T")
+            b.leg(ref, ts, "trade", asset, -qty)
+            b.leg(ref, ts, "trade", EUR, eur, eur * TRADE_FEE)
+        elif kind == "staking":
+            if not wallets[asset]:
+                wallets[asset].append(
+                    staking_wallet(asset, rng.choice(STAKING_SUFFIXES))
+                )
+            reward = rng.uniform(1, 20) / p
+            b.leg(b.refid("ST"), ts, "staking", rng.choice(wallets[asset]), reward)
+        elif kind == "transfer":
+            held = [w for w in wallets[asset] if b.balance[w] > 0]
+            ref = b.refid("TR")
+            if b.balance[asset] > 0 and (not held or rng.random() < 0.6):
+                wallet = staking_wallet(asset, rng.choice(STAKING_SUFFIXES))
+                if wallet not in wallets[asset]:
+                    wallets[asset].append(wallet)
+                qty = b.balance[asset] * rng.uniform(0.2, 0.9)
+                b.leg(ref, ts, "transfer", asset, -qty, subtype="spottostaking")
+                b.leg(ref, ts, "transfer", wallet, qty, subtype="stakingfromspot")
+            elif held:
+                wallet = rng.choice(held)
+                qty = b.balance[wallet] * rng.uniform(0.2, 1.0)
+                b.leg(ref, ts, "transfer", wallet, -qty, subtype="stakingtospot")
+                b.leg(ref, ts, "transfer", asset, qty, subtype="spotfromstaking")
+        elif kind == "deposit":
+            if rng.random() < 0.5:
+                b.leg(b.refid("Q"), ts, "deposit", EUR, round(rng.uniform(50, 5000), 2))
+            else:
+                b.leg(b.refid("Q"), ts, "deposit", asset, rng.uniform(20, 2000) / p)
+        else:  # withdrawal
+            code = EUR if rng.random() < 0.5 else asset
+            held_amount = b.balance[code]
+            if held_amount > 0:
+                fee = 0.09 if code == EUR else held_amount * 0.001
+                qty = held_amount * rng.uniform(0.05, 0.5)
+                b.leg(b.refid("Q"), ts, "withdrawal", code, -qty, fee)
+
+    logger.info(
+        "Synthetic ledger: %d entries, %d assets, %.1f years",
+        len(b.entries),
+        assets,
+        years,
+    )
+    return b.entries
+
+
+def to_db(entries: dict[str, Any]) -> tuple[int, int]:
+    """Insert `entries` into the ledger DB (storage.LEDGER_DB_FILE)."""
+    storage.init_db()
+    return storage.upsert_entries(entries)
+
+
+def to_raw_json(entries: dict[str, Any], path: str | None = None) -> str:
+    """Write `entries` as a raw ledger snapshot (default storage.RAW_LEDGER_FILE)."""
+    path = path or storage.RAW_LEDGER_FILE
+    dirn = os.path.dirname(path) or "."
+    os.makedirs(dirn, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".tmp_", dir=dirn)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(codec.dumps(entries))
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return path
+
+
+class SyntheticKrakenAPI:
+    """
+    Offline stand-in for api.KrakenAPI serving a synthetic ledger. Ledgers
+    returns pages of DEFAULT_PAGE_SIZE entries, newest first, after `since`
+    (exclusive, as on Kraken) from offset `ofs`. Balances are summed from the
+    entries, and every spot asset has one <asset>ZEUR pair priced at its last
+    trade.
+    """
+
+    def __init__(self, entries: dict[str, dict[str, Any]]) -> None:
+        self.entries = entries
+        self._newest = sorted(entries.items(), key=lambda kv: -float(kv[1]["time"]))
+        self._times = [-float(e["time"]) for _, e in self._newest]
+        self.calls: list[tuple[str, dict[str, Any]]] = []
+        balances: defaultdict[str, float] = defaultdict(float)
+        self.prices: dict[str, float] = {}
+        trades: defaultdict[str, list[dict[str, Any]]] = defaultdict(list)
+        for e in entries.values():
+            balances[e["asset"]] += float(e["amount"]) - float(e["fee"])
+            if e["type"] == "trade":
+                trades[e["refid"]].append(e)
+        for legs in sorted(trades.values(), key=lambda legs: float(legs[0]["time"])):
+            eur = [abs(float(leg["amount"])) for leg in legs if leg["asset"] == EUR]
+            for leg in legs:
+                if leg["asset"] != EUR and eur and float(leg["amount"]):
+                    self.prices[leg["asset"]] = eur[0] / abs(float(leg["amount"]))
+        self.balances = {a: v for a, v in balances.items() if v > 1e-12}
+
+    def get_ledgers(
+        self, since: int | None = None, ofs: int | None = None
+    ) -> dict[str, Any]:
+        self.calls.append(("Ledgers", {"since": since, "ofs": ofs}))
+        count = (
+            bisect.bisect_left(self._times, -since)
+            if since is not None
+            else len(self._newest)
+        )
+        start = ofs or 0
+        page = self._newest[start : min(start + DEFAULT_PAGE_SIZE, count)]
+        return {"ledger": dict(page), "count": count}
+
+    def get_balance(self) -> dict[str, Any]:
+        self.calls.append(("Balance", {}))
+        return {a: _amount(v, a) for a, v in self.balances.items()}
+
+    def get_asset_pairs(self) -> dict[str, Any]:
+        self.calls.append(("AssetPairs", {}))
+        return {
+            f"{a}{EUR}": {"altname": f"{a}EUR", "base": a, "quote": EUR}
+            for a in self.prices
+        }
+
+    def get_ticker(self, pair: str) -> dict[str, Any]:
+        self.calls.append(("Ticker", {"pair": pair}))
+        out = {}
+        for name in pair.split(","):
+            asset = name[: -len(EUR)]
+            if name.endswith(EUR) and asset in self.prices:
+                out[name] = {"c": [f"{self.prices[asset]:.10g}", "1.0"]}
+        return out
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic Kraken ledger")
+    parser.add_argument("--entries", type=int, default=None, help="About N entries")
+    parser.add_argument("--assets", type=int, default=10)
+    parser.add_argument("--years", type=float, default=1.0)
+    parser.add_argument(
+        "--trades-per-day",
+        type=float,
+        default=20.0,
+        help="Buys + sells per day (ignored with --entries)",
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--db", action="store_true", help="Insert into balances_history/ledger.db"
+    )
+    parser.add_argument("--json", default=None, help="Write a raw ledger JSON file")
+    args = parser.parse_args(argv)
+
+    entries = generate(
+        args.entries, args.assets, args.years, args.trades_per_day, args.seed
+    )
+    if args.json:
+        logger.info("Raw ledger written to %s", to_raw_json(entries, args.json))
+    if args.db or not args.json:
+        new, _ = to_db(entries)
+        logger.info("%d entries inserted into %s", new, storage.LEDGER_DB_FILE)
+
+
+if __name__ == "__main__":
+    main()
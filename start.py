@@ -3,16 +3,16 @@ import logging
 import os
 import sys
 import argparse
+import multiprocessing
 
 # add src to PYTHONPATH
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
 
 import storage
 import ledger_loader
-import ledger_eur_report
-import ledger_asset_report
-import ledger_sell_report
+import report_runner
 import balances
+import accounts
 from keys import save_keys, load_keys, KeysError
 from config import DEFAULT_DAYS  # <- добавлено
 from validators import db_row_count
@@ -37,10 +37,29 @@ def main(argv=None):
         default=DEFAULT_DAYS,
         help="How many days to include when updating ledger and building reports (default: %(default)s)",
     )
+    parser.add_argument(
+        "--account",
+        default=None,
+        help="Named account: creates/uses accounts/<name>/ and kraken-<name>.key",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Parallel report processes (default: 1 = in-process)",
+    )
     # parse_known_args so pytest/CI extra flags don't break our CLI
     args = parser.parse_known_args(argv)[0]
     days = args.days
 
+    if args.account:
+        try:
+            accounts.create_account(args.account)
+            accounts.activate(args.account)
+        except accounts.AccountError as e:
+            logger.error("%s", e)
+            sys.exit(1)
+
     if args.setup_keys:
         try:
             api_key = input("Enter your Kraken API Key: ").strip()
@@ -121,26 +140,22 @@ def main(argv=None):
 
     # --- 3. Reports ---
     logger.info("Generating reports...")
-    entries = storage.load_entries_from_db()
-
-    eur_df = ledger_eur_report.build_eur_report(entries, days=days)
-    asset_df = ledger_asset_report.build_asset_report(entries, days=days)
-    sell_df = ledger_sell_report.build_sell_report(entries, days=days)
-
-    if eur_df is not None and not eur_df.empty:
-        ledger_eur_report.save_eur_report(eur_df)
-    if asset_df is not None and not asset_df.empty:
-        ledger_asset_report.save_asset_report(asset_df)
-    if sell_df is not None and not sell_df.empty:
-        ledger_sell_report.save_sell_report(sell_df)
+    if os.path.exists(storage.DB_FILE):
+        storage.init_db()  # daily report tables on DBs from older versions
+
+    # reports read the daily tables maintained by storage on every insert;
+    # each CSV is refreshed in place, rebuilding only the dates changed
+    # since its last refresh. --workers N > 1 runs them in parallel processes.
+    rows_by_job = report_runner.run_reports(days, storage.DB_FILE, workers=args.workers)
+    report_rows = {
+        "EUR": rows_by_job["eur"],
+        "Asset": rows_by_job["asset"],
+        "Sell": rows_by_job["sell"],
+    }
 
     logger.info("Reports generated:")
-    if eur_df is not None:
-        logger.info(f" - EUR report: {len(eur_df)} rows")
-    if asset_df is not None:
-        logger.info(f" - Asset report: {len(asset_df)} rows")
-    if sell_df is not None:
-        logger.info(f" - Sell report: {len(sell_df)} rows")
+    for label, rows in report_rows.items():
+        logger.info(f" - {label} report: {rows} rows")
 
     ledger_rows = db_row_count(storage.DB_FILE)
     logger.info(f"Ledger contains {ledger_rows} rows")
@@ -173,4 +188,5 @@ def main(argv=None):
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # report process pool in the frozen start.exe
     main()
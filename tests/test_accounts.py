@@ -0,0 +1,91 @@
+"""Unit tests for accounts.py — named accounts and the consolidated summary."""
+
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import accounts
+
+
+@pytest.fixture()
+def accounts_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    root = str(tmp_path / "accounts")
+    monkeypatch.setattr(accounts, "ACCOUNTS_DIR", root)
+    monkeypatch.setattr(
+        accounts, "CONSOLIDATED_SUMMARY_FILE", os.path.join(root, "consolidated.csv")
+    )
+    return root
+
+
+def _summary_db(name, rows):
+    db_dir = os.path.join(accounts.create_account(name), "balances_history")
+    conn = sqlite3.connect(os.path.join(db_dir, "ledger.db"))
+    conn.execute(
+        """CREATE TABLE summary (asset TEXT PRIMARY KEY, latest_price REAL,
+           update_date TEXT, remaining_amount REAL, total_paid REAL,
+           total_fee REAL, remaining_cost REAL, avg_price REAL)"""
+    )
+    conn.executemany("INSERT INTO summary VALUES (?,?,?,?,?,?,?,?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def test_create_and_list_accounts(accounts_dir):
+    assert accounts.list_accounts() == []
+    accounts.create_account("main")
+    accounts.create_account("joint")
+    assert accounts.list_accounts() == ["joint", "main"]
+    assert os.path.isdir(os.path.join(accounts_dir, "main", "balances_history"))
+
+
+@pytest.mark.parametrize("name", ["", "../etc", "a b"])
+def test_invalid_account_name_rejected(accounts_dir, name):
+    with pytest.raises(accounts.AccountError):
+        accounts.account_dir(name)
+
+
+def test_activate_changes_dir_and_key_set(accounts_dir, monkeypatch):
+    used = []
+    monkeypatch.setattr(accounts.keys, "use_account", used.append)
+    path = accounts.create_account("main")
+    accounts.activate("main")
+    assert os.getcwd() == path
+    assert used == ["main"]
+
+
+def test_activate_missing_account_raises(accounts_dir):
+    with pytest.raises(accounts.AccountError):
+        accounts.activate("nope")
+
+
+def test_consolidate_summaries_sums_per_asset(accounts_dir):
+    _summary_db(
+        "a",
+        [
+            ("BTC", 50000.0, "2026-01-01", 1.0, 40000.0, 10.0, 40000.0, 40000.0),
+            ("SOL", 100.0, "2026-01-01", 10.0, 900.0, 1.0, 900.0, 90.0),
+        ],
+    )
+    _summary_db(
+        "b", [("BTC", 51000.0, "2026-01-02", 1.0, 20000.0, 5.0, 20000.0, 20000.0)]
+    )
+
+    df = accounts.consolidate_summaries()
+
+    btc = df.set_index("asset").loc["BTC"]
+    assert btc["remaining_amount"] == 2.0
+    assert btc["remaining_cost"] == 60000.0
+    assert btc["avg_price"] == 30000.0
+    assert btc["latest_price"] == 51000.0
+    assert btc["accounts"] == "a,b"
+    assert df.set_index("asset").loc["SOL", "accounts"] == "a"
+    saved = pd.read_csv(accounts.CONSOLIDATED_SUMMARY_FILE, sep=";")
+    assert list(saved["asset"]) == ["BTC", "SOL"]
+
+
+def test_consolidate_summaries_without_data(accounts_dir):
+    accounts.create_account("empty")
+    assert accounts.consolidate_summaries(write_csv=False).empty
@@ -25,6 +25,8 @@ def balances_mod(tmp_path, monkeypatch):
 
     storage_stub = types.ModuleType("storage")
     storage_stub.load_entries = lambda: {}
+    storage_stub.LEDGER_DB_FILE = str(tmp_path / "ledger.db")
+    storage_stub.init_db = lambda: None
     monkeypatch.setitem(sys.modules, "storage", storage_stub)
 
     ll_stub = types.ModuleType("ledger_loader")
@@ -33,15 +35,18 @@ def balances_mod(tmp_path, monkeypatch):
 
     eur_stub = types.ModuleType("ledger_eur_report")
     eur_stub.build_eur_report = lambda entries, days=7: pd.DataFrame()
+    eur_stub.refresh_eur_report = lambda days=7, db_path=None: 0
     eur_stub.save_eur_report = lambda df: None
     monkeypatch.setitem(sys.modules, "ledger_eur_report", eur_stub)
 
     asset_stub = types.ModuleType("ledger_asset_report")
     asset_stub.build_asset_report = lambda entries, days=7: pd.DataFrame()
+    asset_stub.refresh_asset_report = lambda days=7, db_path=None: 0
     monkeypatch.setitem(sys.modules, "ledger_asset_report", asset_stub)
 
     sell_stub = types.ModuleType("ledger_sell_report")
     sell_stub.build_sell_report = lambda entries, days=7: pd.DataFrame()
+    sell_stub.refresh_sell_report = lambda days=7, db_path=None: 0
     monkeypatch.setitem(sys.modules, "ledger_sell_report", sell_stub)
 
     config_stub = types.ModuleType("config")
@@ -0,0 +1,121 @@
+"""Unit tests for codec.py — pluggable JSON codec."""
+
+import importlib
+import json
+import sys
+import types
+
+import pytest
+
+
+@pytest.fixture(params=["json", "orjson", "msgspec"])
+def codec(request, monkeypatch):
+    if request.param != "json":
+        pytest.importorskip(request.param)
+    monkeypatch.setenv("KRAKEN_JSON_CODEC", request.param)
+    sys.modules.pop("codec", None)
+    mod = importlib.import_module("codec")
+    yield mod
+    sys.modules.pop("codec", None)
+
+
+ENTRY = {
+    "refid": "R1",
+    "time": 1700000000.1234,
+    "type": "trade",
+    "subtype": "",
+    "aclass": "currency",
+    "asset": "XXBT",
+    "amount": "0.5000000000",
+    "fee": "0.0010000000",
+    "balance": "1.2500000000",
+    "note": "Überweisung",
+}
+
+
+def test_dumps_is_compact_utf8_and_roundtrips(codec):
+    out = codec.dumps({"t1": ENTRY})
+    assert isinstance(out, bytes)
+    assert b": " not in out and b", " not in out
+    assert "Überweisung".encode() in out
+    assert codec.loads(out) == {"t1": ENTRY}
+    assert codec.loads(out.decode("utf-8")) == {"t1": ENTRY}
+
+
+def test_output_readable_by_stdlib(codec):
+    assert json.loads(codec.dumps(ENTRY)) == ENTRY
+    assert json.loads(codec.dumps(ENTRY, pretty=True)) == ENTRY
+    assert b"\n  " in codec.dumps(ENTRY, pretty=True)
+
+
+def test_loads_rejects_invalid_json_with_value_error(codec):
+    with pytest.raises(ValueError):
+        codec.loads(b'{"t1": ')
+
+
+@pytest.fixture()
+def msgspec_codec(monkeypatch):
+    """codec on a minimal msgspec stand-in whose decode errors are not
+    ValueErrors, like the real msgspec.DecodeError (installed or not)."""
+
+    class DecodeError(Exception):
+        pass
+
+    def decode(data, **kwargs):
+        try:
+            return json.loads(data)
+        except ValueError as e:
+            raise DecodeError(str(e)) from None
+
+    fake = types.ModuleType("msgspec")
+    fake.DecodeError = DecodeError
+    fake.json = types.ModuleType("msgspec.json")
+    fake.json.decode = decode
+    monkeypatch.setitem(sys.modules, "msgspec", fake)
+    monkeypatch.setitem(sys.modules, "msgspec.json", fake.json)
+    monkeypatch.setenv("KRAKEN_JSON_CODEC", "msgspec")
+    sys.modules.pop("codec", None)
+    yield importlib.import_module("codec")
+    sys.modules.pop("codec", None)
+
+
+def test_msgspec_decode_error_is_value_error(msgspec_codec):
+    assert msgspec_codec.loads(b'{"t1": 1}') == {"t1": 1}
+    for load in (msgspec_codec.loads, msgspec_codec.decode_entries):
+        with pytest.raises(ValueError):
+            load(b'{"t1": ')
+
+
+def test_journal_skips_corrupt_line_with_any_backend(msgspec_codec, tmp_path):
+    sys.modules.pop("storage", None)
+    import storage
+
+    try:
+        storage.LEDGER_JOURNAL_FILE = str(tmp_path / "journal.jsonl")
+        with open(storage.LEDGER_JOURNAL_FILE, "wb") as f:
+            f.write(b'{"entries": {"t1": {"asset": "XXBT"}}}\n{"entries": {"t2"\n')
+        assert list(storage._iter_journal()) == [{"t1": {"asset": "XXBT"}}]
+    finally:
+        sys.modules.pop("storage", None)
+
+
+def test_decode_entries_typed(codec):
+    entries = codec.decode_entries(codec.dumps({"t1": ENTRY}))
+    e = entries["t1"]
+    assert isinstance(e, codec.LedgerEntry)
+    assert e.asset == "XXBT" and e.refid == "R1"
+    assert e.amount == 0.5 and e.fee == 0.001 and e.balance == 1.25
+    assert e.time == 1700000000.1234
+
+
+def test_to_entry_defaults_missing_and_bad_numbers(codec):
+    e = codec.to_entry({"asset": "SOL", "amount": "n/a"})
+    assert e == codec.LedgerEntry(asset="SOL")
+
+
+def test_unknown_backend_rejected(monkeypatch):
+    monkeypatch.setenv("KRAKEN_JSON_CODEC", "yaml")
+    sys.modules.pop("codec", None)
+    with pytest.raises(ValueError):
+        importlib.import_module("codec")
+    sys.modules.pop("codec", None)
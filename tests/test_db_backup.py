@@ -0,0 +1,94 @@
+"""Unit tests for db_backup.py — online SQLite backups, retention, verification."""
+
+import gzip
+import os
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import db_backup
+
+
+@pytest.fixture()
+def ledger_db(tmp_path):
+    db = tmp_path / "ledger.db"
+    conn = sqlite3.connect(str(db))
+    conn.execute("CREATE TABLE ledger (txid TEXT PRIMARY KEY, amount REAL)")
+    conn.executemany(
+        "INSERT INTO ledger VALUES (?, ?)", [(f"t{i}", float(i)) for i in range(500)]
+    )
+    conn.commit()
+    conn.close()
+    return str(db)
+
+
+def _touch_backup(dest, ts: datetime):
+    name = f"{db_backup.BACKUP_PREFIX}{ts.strftime(db_backup.BACKUP_TS_FORMAT)}{db_backup.BACKUP_SUFFIX}"
+    path = os.path.join(dest, name)
+    open(path, "wb").close()
+    return path
+
+
+def test_backup_db_writes_compressed_copy(ledger_db, tmp_path):
+    out = db_backup.backup_db(ledger_db, pages=1)
+    assert out and out.endswith(".db.gz")
+    assert os.path.dirname(out) == str(tmp_path / "backups")
+    restored = tmp_path / "restored.db"
+    with gzip.open(out, "rb") as fin, open(restored, "wb") as fout:
+        fout.write(fin.read())
+    conn = sqlite3.connect(str(restored))
+    assert conn.execute("SELECT COUNT(*) FROM ledger").fetchone()[0] == 500
+    conn.close()
+    # no temp files left behind
+    assert os.listdir(tmp_path / "backups") == [os.path.basename(out)]
+
+
+def test_backup_db_missing_database_returns_none(tmp_path):
+    assert db_backup.backup_db(str(tmp_path / "nope.db")) is None
+
+
+def test_verify_backup_ok_and_corrupt(ledger_db, tmp_path):
+    out = db_backup.backup_db(ledger_db)
+    assert db_backup.verify_backup(out) is True
+    with open(out, "wb") as f:
+        f.write(b"not a gzip file")
+    assert db_backup.verify_backup(out) is False
+
+
+def test_prune_backups_keeps_daily_and_weekly(tmp_path):
+    dest = str(tmp_path)
+    now = datetime(2026, 6, 30, 12, tzinfo=timezone.utc)
+    paths = [_touch_backup(dest, now - timedelta(days=d)) for d in range(60)]
+    # second backup on the newest day: only the newest of the day survives
+    extra = _touch_backup(dest, now - timedelta(hours=1))
+
+    removed = db_backup.prune_backups(dest, keep_daily=7, keep_weekly=4)
+
+    kept = {p for _, p in db_backup.list_backups(dest)}
+    assert extra in removed
+    assert all(p in kept for p in paths[:7])  # last 7 days
+    assert paths[59] in removed
+    assert len(kept) <= 7 + 4
+
+
+def test_run_scheduled_backup_respects_interval(ledger_db, tmp_path):
+    first = db_backup.run_scheduled_backup(ledger_db)
+    assert first is not None
+    assert db_backup.run_scheduled_backup(ledger_db) is None  # too soon
+    assert os.path.exists(tmp_path / "backups" / db_backup.VERIFY_STAMP_FILE)
+
+
+def test_verify_if_due_skips_when_recent(ledger_db, tmp_path, monkeypatch):
+    dest = str(tmp_path / "backups")
+    db_backup.backup_db(ledger_db)
+    assert db_backup.verify_if_due(dest) is True
+    calls = []
+    monkeypatch.setattr(db_backup, "verify_backup", lambda p: calls.append(p))
+    assert db_backup.verify_if_due(dest) is None
+    assert calls == []
+
+
+def test_main_backup_and_verify(ledger_db):
+    assert db_backup.main(["--db", ledger_db]) == 0
+    assert db_backup.main(["--db", ledger_db, "--verify"]) == 0
@@ -0,0 +1,160 @@
+"""Unit tests for fifo_lots.py — lot-level FIFO with compact lot queues."""
+
+import sys
+from datetime import datetime, timezone
+
+import pandas as pd
+import pytest
+
+_MODULES = ("storage", "report_cache", "portfolio_summary", "fifo_lots")
+
+
+@pytest.fixture()
+def mods(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    saved = {name: sys.modules.pop(name, None) for name in _MODULES}
+    import fifo_lots
+    import portfolio_summary
+
+    yield fifo_lots, portfolio_summary
+    for name, mod in saved.items():
+        sys.modules.pop(name, None)
+        if mod is not None:
+            sys.modules[name] = mod
+
+
+def _buy(asset, amount, paid, ts, fee=0.0):
+    date = datetime.fromtimestamp(ts, tz=timezone.utc)
+    price = paid / amount if paid else 0.0
+    return {
+        "asset": asset,
+        "date": date,
+        "time": ts,
+        "amount": amount,
+        "paid": paid,
+        "fee": fee,
+        "price": price,
+    }
+
+
+def _sell(asset, amount, proceeds, ts, fee=0.0):
+    date = datetime.fromtimestamp(ts, tz=timezone.utc)
+    return {
+        "asset": asset,
+        "date": date,
+        "time": ts,
+        "amount": amount,
+        "proceeds": proceeds,
+        "fee": fee,
+    }
+
+
+def test_queue_consumes_oldest_lots_first(mods):
+    fifo_lots, _ = mods
+    q = fifo_lots.LotQueue()
+    q.push(1.0, 100.0, 10.0)
+    q.push(2.0, 200.0, 20.0)
+    q.push(1.0, 300.0, 30.0)
+
+    assert q.consume(1.5) == (1.5, 100.0 + 0.5 * 200.0, 10.0, 2)
+    assert len(q) == 2 and q.totals() == (2.5, 1.5 * 200.0 + 300.0)
+    assert q.consume(5.0) == (2.5, 600.0, 20.0, 2)
+    assert len(q) == 0 and q.consume(1.0) == (0.0, 0.0, 0.0, 0)
+
+
+def test_queue_compaction_keeps_lots(mods, monkeypatch):
+    fifo_lots, _ = mods
+    monkeypatch.setattr(fifo_lots, "COMPACT_MIN", 4)
+    q = fifo_lots.LotQueue()
+    for i in range(10):
+        q.push(1.0, float(i), float(i))
+    q.consume(6.5)
+    assert q.head == 0 and len(q.amount) == 4  # consumed lots dropped
+    assert q.totals() == (3.5, 0.5 * 6 + 7 + 8 + 9)
+    assert q.consume(1.0) == (1.0, 0.5 * 6 + 0.5 * 7, 6.0, 2)
+
+
+def test_replay_realised_pnl_and_open_lots(mods):
+    fifo_lots, _ = mods
+    book = fifo_lots.replay(
+        [
+            _buy("BTC", 1.0, 99.0, 1000.0, fee=1.0),
+            _buy("BTC", 1.0, 200.0, 2000.0),
+            _buy("ETH", 4.0, 40.0, 2500.0),
+        ],
+        [_sell("BTC", 1.5, 450.0, 3000.0, fee=1.0), _sell("ETH", 1.0, 15.0, 3500.0)],
+    )
+    disposals = book.disposals()
+    assert list(disposals.columns) == fifo_lots.DISPOSAL_COLUMNS
+    btc = disposals.iloc[0]
+    assert btc["cost_basis"] == pytest.approx(100.0 + 100.0)  # lot 1 + half of lot 2
+    assert btc["realised_pnl"] == pytest.approx(450.0 - 1.0 - 200.0)
+    assert btc["lots"] == 2 and btc["unmatched"] == 0.0
+    assert btc["first_acquired"] == pd.Timestamp(1000.0, unit="s", tz="UTC")
+    assert book.realised() == pytest.approx({"BTC": 249.0, "ETH": 5.0})
+
+    lots = book.lots()
+    assert list(lots.columns) == fifo_lots.LOT_COLUMNS
+    assert lots[["asset", "amount", "unit_cost", "cost"]].values.tolist() == [
+        ["BTC", 0.5, 200.0, 100.0],
+        ["ETH", 3.0, 10.0, 30.0],
+    ]
+
+
+def test_replay_uses_time_order(mods, caplog):
+    fifo_lots, _ = mods
+    # the sell comes before the second buy: it can only use the first lot
+    book = fifo_lots.replay(
+        [_buy("DOT", 1.0, 10.0, 100.0), _buy("DOT", 5.0, 100.0, 300.0)],
+        [_sell("DOT", 2.0, 60.0, 200.0), _sell("DOT", 1.0, 30.0, 300.0)],
+    )
+    first, second = book.disposal_rows
+    assert first[5] == 10.0 and first[9] == pytest.approx(1.0)  # 1 DOT unmatched
+    assert "exceeds open lots" in caplog.text
+    assert second[5] == 20.0  # same-time buy is applied before the sell
+    assert book.lots()["amount"].tolist() == [4.0]
+    assert fifo_lots.replay([], []).lots().empty
+
+
+def test_run_fifo_method_fifo(mods):
+    fifo_lots, ps = mods
+    import synthetic_ledger
+
+    entries = synthetic_ledger.generate(4000, assets=6, end=1_700_000_000.0)
+    average = ps.run_fifo(entries)
+    lots = ps.run_fifo(entries, method="fifo")
+    assert "realised_pnl" not in average.columns
+
+    # the synthetic ledger never sells more than it holds: same open amounts
+    pd.testing.assert_series_equal(
+        lots["remaining_amount"], average["remaining_amount"], rtol=1e-9
+    )
+    book = fifo_lots.replay(ps.extract_buys(entries), ps.extract_sells(entries))
+    streamed = fifo_lots.replay_events(ps.extract_trades(entries))
+    assert streamed.disposal_rows == book.disposal_rows
+    open_cost = book.lots().groupby("asset")["cost"].sum()
+    assert lots.set_index("asset")["remaining_cost"].to_dict() == pytest.approx(
+        open_cost.to_dict()
+    )
+    assert lots["realised_pnl"].sum() == pytest.approx(
+        book.disposals()["realised_pnl"].sum()
+    )
+    assert (lots["avg_price"] != average["avg_price"]).any()
+
+    with pytest.raises(ValueError):
+        ps.run_fifo(entries, method="lifo")
+
+
+def test_main_writes_disposals_and_lots(mods, tmp_path, capsys):
+    fifo_lots, _ = mods
+    import storage
+    import synthetic_ledger
+
+    synthetic_ledger.to_db(synthetic_ledger.generate(1500, assets=4))
+    fifo_lots.main(["--out-dir", str(tmp_path)])
+    disposals = pd.read_csv(tmp_path / fifo_lots.DISPOSALS_FILE, sep=";")
+    lots = pd.read_csv(tmp_path / fifo_lots.LOTS_FILE, sep=";")
+    assert list(disposals.columns) == fifo_lots.DISPOSAL_COLUMNS and len(disposals)
+    assert list(lots.columns) == fifo_lots.LOT_COLUMNS and len(lots)
+    assert "BTC" in capsys.readouterr().out
+    assert storage.load_trades()
@@ -91,3 +91,24 @@ def test_load_keys_secret_padding_fixed(keys_mod):
     k, s = keys_mod.load_keys()
     assert k == "k"
     assert len(s) % 4 == 0
+
+
+def test_use_account_switches_key_set(keys_mod, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    keys_mod.save_keys("defaultkey", "defaultsecret123")
+    keys_mod.use_account("joint")
+    assert keys_mod.KEYFILE.endswith("kraken-joint.key")
+    keys_mod.save_keys("jointkey", "jointsecret12345")
+    assert keys_mod.load_keys() == ("jointkey", "jointsecret12345")
+    keys_mod.use_account(None)
+    assert keys_mod.load_keys() == ("defaultkey", "defaultsecret123")
+
+
+def test_named_account_env_var_fallback(keys_mod, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("KRAKEN_API_KEY", "wrongkey")
+    monkeypatch.setenv("KRAKEN_API_SECRET", "wrongsecret")
+    monkeypatch.setenv("KRAKEN_API_KEY_MY_SUB", "subkey")
+    monkeypatch.setenv("KRAKEN_API_SECRET_MY_SUB", "subsecret")
+    keys_mod.use_account("my-sub")
+    assert keys_mod.load_keys() == ("subkey", "subsecret")
@@ -1,7 +1,9 @@
 """Unit tests for ledger_asset_report.py — daily asset acquisition aggregation."""
 
+import sqlite3
 import sys
 import types
+from datetime import date, datetime, timedelta, timezone
 
 import pytest
 
@@ -10,6 +12,8 @@ import pytest
 def asset_mod(tmp_path, monkeypatch):
     storage_stub = types.ModuleType("storage")
     storage_stub.BALANCES_DIR = str(tmp_path)
+    storage_stub.LEDGER_DB_FILE = str(tmp_path / "ledger.db")
+    storage_stub.init_db = lambda: None
     monkeypatch.setitem(sys.modules, "storage", storage_stub)
     if "ledger_asset_report" in sys.modules:
         del sys.modules["ledger_asset_report"]
@@ -20,6 +24,19 @@ def asset_mod(tmp_path, monkeypatch):
         del sys.modules["ledger_asset_report"]
 
 
+def _daily_db(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE asset_daily (date_iso TEXT, asset TEXT, amount REAL)")
+    conn.executemany("INSERT INTO asset_daily VALUES (?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def _dates():
+    today = datetime.now(timezone.utc).date()
+    return today.isoformat(), (today - timedelta(days=30)).isoformat()
+
+
 def _entry(refid, asset, amount, time_=None):
     import time as _t
 
@@ -73,24 +90,48 @@ def test_save_asset_report_writes_csv(asset_mod):
     assert os.path.exists(asset_mod.LEDGER_ASSET_FILE)
 
 
-def test_update_asset_report_empty(asset_mod, monkeypatch):
-    monkeypatch.setattr(
-        asset_mod.storage, "load_entries_from_db", lambda: {}, raising=False
-    )
+def test_update_asset_report_empty(asset_mod):
     df = asset_mod.update_asset_report(days=7, write_csv=False)
     assert df.empty
 
 
 def test_update_asset_report_with_data(asset_mod):
-    import time as _t
     import os
 
-    now = _t.time()
-    entries = {
-        "b1": _entry("r1", "BTC", 0.01, time_=now),
-        "s1": _entry("r1", "ZEUR", -100.0, time_=now),
-    }
-    asset_mod.storage.load_entries_from_db = lambda: entries
+    today, old = _dates()
+    _daily_db(
+        asset_mod.storage.LEDGER_DB_FILE,
+        [(today, "XXBT", 0.01), (today, "SOL", 2.0), (old, "XXBT", 5.0)],
+    )
     df = asset_mod.update_asset_report(days=7, write_csv=True)
-    assert not df.empty
+    assert len(df) == 1
     assert os.path.exists(asset_mod.LEDGER_ASSET_FILE)
+
+
+def test_build_asset_report_from_db_pivots_daily_rows(asset_mod, tmp_path):
+    today, old = _dates()
+    db_path = str(tmp_path / "ledger.db")
+    _daily_db(db_path, [(today, "XXBT", 0.01), (today, "SOL", 2.0), (old, "XXBT", 5.0)])
+    df = asset_mod.build_asset_report(db_path, days=7)
+    assert list(df.columns) == ["Date", "SOL", "XXBT"]
+    assert df.iloc[0]["XXBT"] == pytest.approx(0.01)
+
+
+def test_asset_columns_keep_first_seen_order(asset_mod, tmp_path):
+    today, _ = _dates()
+    earlier = (date.fromisoformat(today) - timedelta(days=1)).isoformat()
+    db_path = str(tmp_path / "ledger.db")
+    _daily_db(
+        db_path,
+        [(today, "ADA", 1.0), (today, "SOL", 2.0), (earlier, "XXBT", 0.01)],
+    )
+    df = asset_mod.build_asset_report(db_path, days=7)
+    assert list(df.columns) == ["Date", "XXBT", "ADA", "SOL"]
+    assert df["ADA"].tolist() == [0.0, 1.0]
+
+
+def test_build_asset_report_from_db_without_table(asset_mod, tmp_path):
+    db_path = str(tmp_path / "old.db")
+    sqlite3.connect(db_path).close()
+    assert asset_mod.build_asset_report(db_path).empty
+    assert asset_mod.build_asset_report(str(tmp_path / "missing.db")).empty
@@ -0,0 +1,117 @@
+"""Unit tests for ledger_cache.py — memory-mapped columnar ledger cache."""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture()
+def cache_env(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for name in ("storage", "ledger_cache"):
+        sys.modules.pop(name, None)
+    import storage
+    import ledger_cache
+
+    yield storage, ledger_cache
+    for name in ("storage", "ledger_cache"):
+        sys.modules.pop(name, None)
+
+
+def _entry(asset, amount, refid, time_, fee=0.0, type_="trade"):
+    return {
+        "asset": asset,
+        "amount": amount,
+        "fee": fee,
+        "refid": refid,
+        "type": type_,
+        "time": time_,
+    }
+
+
+def test_missing_db_returns_none(cache_env):
+    _, lc = cache_env
+    assert lc.load_ledger_columns() is None
+
+
+def test_columns_sorted_encoded_and_memory_mapped(cache_env):
+    storage, lc = cache_env
+    storage.save_entries(
+        {
+            "t2": _entry("XXBT", 0.5, "r1", 1700000100.0, fee=0.1),
+            "t1": _entry("ZEUR", -100.0, "r1", 1700000000.0),
+            "t3": _entry("SOL", 2.0, "", 1700000200.0, type_="staking"),
+        }
+    )
+    cols = lc.load_ledger_columns()
+
+    assert isinstance(cols["time"], np.memmap)
+    assert list(cols["txid"]) == ["t1", "t2", "t3"]
+    assert cols["amount"].tolist() == [-100.0, 0.5, 2.0]
+    assert cols["fee"].tolist() == [0.0, 0.1, 0.0]
+    assets = cols["asset_values"][cols["asset"]]
+    assert assets.tolist() == ["ZEUR", "XXBT", "SOL"]
+    refids = cols["refid_values"][cols["refid"]]
+    assert refids.tolist() == ["r1", "r1", "t3"]  # empty refid -> txid
+    assert cols["type_values"][cols["type"][2]] == "staking"
+
+
+def test_cache_reused_until_fingerprint_changes(cache_env, monkeypatch):
+    storage, lc = cache_env
+    storage.save_entries({"t1": _entry("XXBT", 1.0, "r1", 1700000000.0)})
+    lc.load_ledger_columns()
+
+    calls = []
+    real_build = lc.build_cache
+    monkeypatch.setattr(lc, "build_cache", lambda *a: calls.append(1) or real_build(*a))
+    cols = lc.load_ledger_columns()
+    assert calls == [] and len(cols["time"]) == 1
+
+    storage.save_update_entries({"t2": _entry("SOL", 3.0, "r2", 1700000500.0)})
+    cols = lc.load_ledger_columns()
+    assert calls == [1] and len(cols["time"]) == 2
+
+
+@pytest.mark.parametrize("asset,type_", [("XXBT", "trade"), ("ZEUR", "deposit")])
+def test_cache_reloads_after_in_place_update(cache_env, asset, type_):
+    storage, lc = cache_env
+    storage.upsert_entries({"t1": _entry(asset, 1.0, "r1", 1700000000.0, type_=type_)})
+    assert lc.load_ledger_columns()["amount"].tolist() == [1.0]
+
+    updated = _entry(asset, 2.5, "r1", 1700000000.0, type_=type_)
+    assert storage.upsert_entries({"t1": updated}) == (0, 1)
+    assert lc.load_ledger_columns()["amount"].tolist() == [2.5]
+
+
+def test_rebuild_removes_previous_generation(cache_env):
+    storage, lc = cache_env
+    storage.save_entries({"t1": _entry("XXBT", 1.0, "r1", 1700000000.0)})
+    lc.build_cache()
+    lc.build_cache()
+    files = os.listdir(lc.CACHE_DIR)
+    assert not any(f.endswith(".1.npy") for f in files)
+    assert any(f.endswith(".2.npy") for f in files)
+
+
+def test_to_frame_decodes_categories(cache_env):
+    storage, lc = cache_env
+    storage.save_entries({"t1": _entry("XXBT", 1.0, "r1", 1700000000.0)})
+    df = lc.to_frame(lc.load_ledger_columns())
+    assert df.loc[0, "asset"] == "XXBT"
+    assert df.loc[0, "refid"] == "r1"
+    assert df.loc[0, "amount"] == 1.0
+
+
+def test_cache_includes_yearly_archives(cache_env):
+    storage, lc = cache_env
+    storage.save_entries(
+        {
+            "old": _entry("XXBT", 1.0, "r1", 1620000000.0),
+            "new": _entry("SOL", 2.0, "r2", 1700000000.0),
+        }
+    )
+    assert 2021 in storage.archive_closed_years(keep_years=0)
+    cols = lc.load_ledger_columns(rebuild=True)
+    assert list(cols["txid"]) == ["old", "new"]
@@ -1,7 +1,9 @@
 """Unit tests for ledger_eur_report.py — daily EUR spend breakdown per asset."""
 
+import sqlite3
 import sys
 import types
+from datetime import datetime, timedelta, timezone
 
 import pytest
 
@@ -10,6 +12,8 @@ import pytest
 def eur_mod(tmp_path, monkeypatch):
     storage_stub = types.ModuleType("storage")
     storage_stub.BALANCES_DIR = str(tmp_path)
+    storage_stub.LEDGER_DB_FILE = str(tmp_path / "ledger.db")
+    storage_stub.init_db = lambda: None
     monkeypatch.setitem(sys.modules, "storage", storage_stub)
     if "ledger_eur_report" in sys.modules:
         del sys.modules["ledger_eur_report"]
@@ -20,6 +24,21 @@ def eur_mod(tmp_path, monkeypatch):
         del sys.modules["ledger_eur_report"]
 
 
+def _daily_db(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE eur_daily (date_iso TEXT, asset TEXT, spent_eur REAL, fee REAL)"
+    )
+    conn.executemany("INSERT INTO eur_daily VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def _dates():
+    today = datetime.now(timezone.utc).date()
+    return today.isoformat(), (today - timedelta(days=30)).isoformat()
+
+
 def _spend(refid, asset, amount, fee=0.0, time_=None):
     import time as _t
 
@@ -101,22 +120,67 @@ def test_save_eur_report_writes_csv(eur_mod, tmp_path):
     assert __import__("os").path.exists(eur_mod.LEDGER_EUR_FILE)
 
 
-def test_update_eur_report_no_entries(eur_mod, monkeypatch):
-    storage_mock = eur_mod.storage
-    monkeypatch.setattr(storage_mock, "load_entries_from_db", lambda: {}, raising=False)
+def test_update_eur_report_no_entries(eur_mod):
     df = eur_mod.update_eur_report(days=7, write_csv=False)
     assert df.empty
 
 
-def test_update_eur_report_with_data(eur_mod, monkeypatch):
-    import time as _t
+def test_update_eur_report_with_data(eur_mod):
+    import os
 
-    now = _t.time()
-    entries = {
-        "s1": _spend("r1", "ZEUR", -100.0, time_=now),
-        "b1": _spend("r1", "BTC", 0.01, time_=now),
-    }
-    eur_mod.storage.load_entries_from_db = lambda: entries
+    today, old = _dates()
+    _daily_db(
+        eur_mod.storage.LEDGER_DB_FILE,
+        [
+            (today, "XXBT", 60.0, 0.2),
+            (today, "SOL", 40.0, 0.1),
+            (old, "XXBT", 5.0, 0.0),
+        ],
+    )
     df = eur_mod.update_eur_report(days=7, write_csv=True)
-    assert not df.empty
-    assert __import__("os").path.exists(eur_mod.LEDGER_EUR_FILE)
+    assert len(df) == 1
+    assert os.path.exists(eur_mod.LEDGER_EUR_FILE)
+
+
+def test_build_eur_report_from_db_pivots_daily_rows(eur_mod, tmp_path):
+    today, old = _dates()
+    db_path = str(tmp_path / "ledger.db")
+    _daily_db(
+        db_path,
+        [
+            (today, "XXBT", 60.0, 0.2),
+            (today, "SOL", 40.0, 0.1),
+            (old, "XXBT", 5.0, 0.0),
+        ],
+    )
+    df = eur_mod.build_eur_report(db_path, days=7)
+    assert list(df.columns) == ["Date", "Total Fee", "Total Spent EUR", "SOL", "XXBT"]
+    row = df.iloc[0]
+    assert row["Total Spent EUR"] == 100.0
+    assert row["Total Fee"] == pytest.approx(0.3)
+    assert row["XXBT"] == 60.0
+
+
+def test_build_eur_report_from_db_without_table(eur_mod, tmp_path):
+    db_path = str(tmp_path / "old.db")
+    sqlite3.connect(db_path).close()
+    assert eur_mod.build_eur_report(db_path).empty
+    assert eur_mod.build_eur_report(str(tmp_path / "missing.db")).empty
+
+
+def test_build_eur_report_from_db_absolute_range(eur_mod, tmp_path):
+    db_path = str(tmp_path / "ledger.db")
+    _daily_db(
+        db_path,
+        [
+            ("2023-12-31", "XXBT", 1.0, 0.0),
+            ("2024-01-01", "XXBT", 10.0, 0.1),
+            ("2024-03-31", "SOL", 20.0, 0.2),
+            ("2024-04-01", "XXBT", 99.0, 0.0),
+        ],
+    )
+    df = eur_mod.build_eur_report(db_path, start="2024-01-01", end="2024-03-31")
+    assert [d.date().isoformat() for d in df["Date"]] == ["2024-01-01", "2024-03-31"]
+    assert df["Total Spent EUR"].sum() == 30.0
+    open_end = eur_mod.build_eur_report(db_path, start="2024-03-31")
+    assert len(open_end) == 2
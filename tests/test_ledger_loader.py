@@ -65,6 +65,25 @@ def test_fetch_ledger_stops_on_known_txid(ll_mod, monkeypatch):
     assert "new1" in entries
 
 
+def test_fetch_ledger_known_txids_lookup_per_page(ll_mod, monkeypatch):
+    monkeypatch.setattr(ll_mod.time, "sleep", lambda *a, **k: None)
+    monkeypatch.setattr(ll_mod.random, "uniform", lambda a, b: 0.0)
+
+    api = _FakeAPI(
+        [{"ledger": {"known1": {"time": 1700000000.0}, "new1": {"time": 1700000001.0}}}]
+    )
+    lookups = []
+
+    def lookup(txids):
+        txids = set(txids)
+        lookups.append(txids)
+        return txids & {"known1"}
+
+    entries = ll_mod.fetch_ledger(api, page_size=50, known_txids_lookup=lookup)
+    assert list(entries) == ["new1"]
+    assert lookups == [{"known1", "new1"}]  # one batched lookup per page
+
+
 def test_fetch_ledger_empty_response_stops(ll_mod, monkeypatch):
     monkeypatch.setattr(ll_mod.time, "sleep", lambda *a, **k: None)
     monkeypatch.setattr(ll_mod.random, "uniform", lambda a, b: 0.0)
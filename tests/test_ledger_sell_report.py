@@ -1,7 +1,9 @@
 """Unit tests for ledger_sell_report.py — daily sell aggregation (crypto -> EUR)."""
 
+import sqlite3
 import sys
 import types
+from datetime import datetime, timedelta, timezone
 
 import pytest
 
@@ -10,6 +12,8 @@ import pytest
 def sell_mod(tmp_path, monkeypatch):
     storage_stub = types.ModuleType("storage")
     storage_stub.BALANCES_DIR = str(tmp_path)
+    storage_stub.LEDGER_DB_FILE = str(tmp_path / "ledger.db")
+    storage_stub.init_db = lambda: None
     monkeypatch.setitem(sys.modules, "storage", storage_stub)
     if "ledger_sell_report" in sys.modules:
         del sys.modules["ledger_sell_report"]
@@ -20,6 +24,21 @@ def sell_mod(tmp_path, monkeypatch):
         del sys.modules["ledger_sell_report"]
 
 
+def _daily_db(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE sell_daily (date_iso TEXT, asset TEXT, amount REAL, eur REAL, fee REAL)"
+    )
+    conn.executemany("INSERT INTO sell_daily VALUES (?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def _dates():
+    today = datetime.now(timezone.utc).date()
+    return today.isoformat(), (today - timedelta(days=30)).isoformat()
+
+
 def _entry(refid, asset, amount, fee=0.0, time_=None):
     import time as _t
 
@@ -79,24 +98,38 @@ def test_save_sell_report_writes_csv(sell_mod):
     assert os.path.exists(sell_mod.LEDGER_SELL_FILE)
 
 
-def test_update_sell_report_empty(sell_mod, monkeypatch):
-    monkeypatch.setattr(
-        sell_mod.storage, "load_entries_from_db", lambda: {}, raising=False
-    )
+def test_update_sell_report_empty(sell_mod):
     df = sell_mod.update_sell_report(days=7, write_csv=False)
     assert df.empty
 
 
 def test_update_sell_report_with_data(sell_mod):
-    import time as _t
     import os
 
-    now = _t.time()
-    entries = {
-        "s1": _entry("r1", "BTC", -0.01, fee=0.5, time_=now),
-        "e1": _entry("r1", "ZEUR", 200.0, time_=now),
-    }
-    sell_mod.storage.load_entries_from_db = lambda: entries
+    today, old = _dates()
+    _daily_db(
+        sell_mod.storage.LEDGER_DB_FILE,
+        [(today, "XXBT", 0.01, 200.0, 0.5), (old, "XXBT", 1.0, 9.0, 0.0)],
+    )
     df = sell_mod.update_sell_report(days=7, write_csv=True)
-    assert not df.empty
+    assert len(df) == 1
     assert os.path.exists(sell_mod.LEDGER_SELL_FILE)
+
+
+def test_build_sell_report_from_db_pivots_daily_rows(sell_mod, tmp_path):
+    today, old = _dates()
+    db_path = str(tmp_path / "ledger.db")
+    _daily_db(
+        db_path, [(today, "XXBT", 0.01, 200.0, 0.5), (old, "XXBT", 1.0, 9.0, 0.0)]
+    )
+    df = sell_mod.build_sell_report(db_path, days=7)
+    assert list(df.columns) == ["Date", "Total EUR", "Total Fee", "XXBT"]
+    assert df.iloc[0]["Total EUR"] == 200.0
+    assert df.iloc[0]["Total Fee"] == 0.5
+
+
+def test_build_sell_report_from_db_without_table(sell_mod, tmp_path):
+    db_path = str(tmp_path / "old.db")
+    sqlite3.connect(db_path).close()
+    assert sell_mod.build_sell_report(db_path).empty
+    assert sell_mod.build_sell_report(str(tmp_path / "missing.db")).empty
@@ -111,6 +111,36 @@ def test_extract_sells_requires_both_legs():
     assert ps.extract_sells(entries) == []
 
 
+def test_extract_trades_single_time_ordered_stream():
+    entries = {
+        "s1": _entry(
+            "BTC", -0.5, fee=0.2, refid="r3", date="2026-01-03T00:00:00+00:00"
+        ),
+        "s1a": _entry("ZEUR", 250.0, refid="r3", date="2026-01-03T00:00:00+00:00"),
+        "b2": _entry("ZEUR", -300.0, refid="r2", date="2026-01-03T00:00:00+00:00"),
+        "b2a": _entry("ETH", 1.0, refid="r2", date="2026-01-03T00:00:00+00:00"),
+        "b2b": _entry(
+            "SOL", 3.0, fee=0.4, refid="r2", date="2026-01-03T00:00:00+00:00"
+        ),
+        "b1": _entry("ZEUR", -100.0, refid="r1", date="2026-01-01T00:00:00+00:00"),
+        "b1a": _entry("BTC", 1.0, refid="r1", date="2026-01-01T00:00:00+00:00"),
+        "t1": _entry("BTC.F", 1.0, refid="r4", type_="transfer"),
+    }
+    events = ps.extract_trades(entries)
+    assert [(r["side"], r["asset"]) for r in events] == [
+        ("buy", "BTC"),
+        ("buy", "ETH"),
+        ("buy", "SOL"),
+        ("sell", "BTC"),  # same time as the r2 buys: after them
+    ]
+    eth, sol = events[1], events[2]
+    assert eth["paid"] == pytest.approx(75.0) and sol["paid"] == pytest.approx(225.0)
+    assert sol["fee"] == pytest.approx(0.3) and sol["price"] == pytest.approx(75.0)
+    assert events[3]["amount"] == 0.5 and events[3]["proceeds"] == 250.0
+    assert [r for r in events if r["side"] == "buy"] == ps.extract_buys(entries)
+    assert [r for r in events if r["side"] == "sell"] == ps.extract_sells(entries)
+
+
 # ---------------------------------------------------------------------------
 # run_fifo (integration of buy/sell state machine)
 # ---------------------------------------------------------------------------
@@ -135,6 +165,87 @@ def test_run_fifo_buy_then_partial_sell():
     assert row["avg_price"] == pytest.approx(200.0)
 
 
+def _trade(refid, asset, side, amount, quote, fee=0.0, date_iso="2026-01-01"):
+    return {
+        "refid": refid,
+        "asset": asset,
+        "side": side,
+        "type": "trade",
+        "time": 0,
+        "date_iso": date_iso,
+        "base_amount": amount,
+        "quote_amount": quote,
+        "fee": fee,
+    }
+
+
+def test_split_trades_skips_transfers_and_outflows():
+    trades = [
+        _trade("r1", "XXBT", "buy", 1.0, 100.0, fee=0.5),
+        _trade("r2", "XXBT", "sell", 0.5, 80.0),
+        _trade("r3", "SOL", "out", 2.0, 0.0),
+        dict(_trade("r4", "SOL", "in", 2.0, 0.0), type="transfer"),
+    ]
+    buys, sells = ps.split_trades(trades)
+    assert [(b["asset"], b["paid"], b["fee"], b["price"]) for b in buys] == [
+        ("BTC", 100.0, 0.5, 100.0)
+    ]
+    assert [(s["asset"], s["proceeds"]) for s in sells] == [("BTC", 80.0)]
+    assert ps.trade_events(trades) == buys + sells
+
+
+def test_run_fifo_from_trades_average_cost():
+    trades = [
+        _trade("r1", "XXBT", "buy", 1.0, 100.0, date_iso="2026-01-01"),
+        _trade("r2", "XXBT", "buy", 1.0, 300.0, date_iso="2026-01-02"),
+        _trade("r3", "XXBT", "sell", 0.5, 250.0, date_iso="2026-01-03"),
+    ]
+    df = ps.run_fifo_from_trades(trades)
+    row = df.iloc[0]
+    assert row["asset"] == "BTC"
+    assert row["remaining_amount"] == pytest.approx(1.5)
+    assert row["avg_price"] == pytest.approx(200.0)
+    assert ps.run_fifo_from_trades([]).empty
+
+
+def _leg(asset, amount, refid, ts, fee=0.0, type_="trade"):
+    return {
+        "refid": refid,
+        "time": ts,
+        "type": type_,
+        "asset": asset,
+        "amount": f"{amount:.10f}",
+        "fee": f"{fee:.10f}",
+    }
+
+
+def test_run_fifo_from_trades_matches_run_fifo(inc):
+    ps_, storage, ordered = inc
+    day = 86400.0
+    t0 = 1_767_225_600.0  # 2026-01-01
+    entries = dict(ordered)
+    entries.update(
+        {
+            "B1E": _leg("ZEUR", -100.0, "RB1", t0, fee=0.4),
+            "B1A": _leg("XXBT", 1.0, "RB1", t0),
+            "B2E": _leg("ZEUR", -300.0, "RB2", t0 + day),
+            "B2A": _leg("XXBT", 1.0, "RB2", t0 + day, fee=0.001),
+            "S1A": _leg("XXBT", -0.5, "RS1", t0 + 2 * day),
+            "S1E": _leg("ZEUR", 250.0, "RS1", t0 + 2 * day, fee=0.5),
+            "RW1": _leg("DOT.S", 0.25, "RW1", t0 + 3 * day, type_="staking"),
+            "TR1": _leg("DOT", -1.0, "RT1", t0 + 3 * day, type_="transfer"),
+            "TR2": _leg("DOT.S", 1.0, "RT1", t0 + 3 * day, type_="transfer"),
+        }
+    )
+    storage.upsert_entries(entries)
+
+    from_trades = ps_.run_fifo_from_trades(storage.load_trades())
+    from_entries = ps_.run_fifo(storage.load_entries_from_db())
+    assert {"BTC", "DOT"} <= set(from_trades["asset"])
+    pd.testing.assert_frame_equal(from_trades, from_entries)
+    assert from_trades.attrs["price_state"] == from_entries.attrs["price_state"]
+
+
 def test_run_fifo_sell_without_prior_buy_is_skipped(caplog):
     entries = {
         "s1": _entry("BTC", -1.0, refid="r1"),
@@ -212,7 +323,134 @@ def test_save_summary_persists_rows(tmp_path):
     assert rows == [("BTC", 1.0)]
 
 
+def test_init_summary_table_runs_ddl_once_per_db(tmp_path):
+    db_path = str(tmp_path / "ledger.db")
+    conn = sqlite3.connect(db_path)
+    ps.init_summary_table(conn)
+    conn.execute("DROP TABLE summary")  # DDL is not re-run for a known DB
+    ps.init_summary_table(conn)
+    tables = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name='summary'"
+    ).fetchall()
+    conn.close()
+    assert tables == []
+
+
 def test_update_summary_no_entries(monkeypatch):
-    monkeypatch.setattr(ps.storage, "load_entries_from_db", lambda: {})
+    monkeypatch.setattr(ps.storage, "load_trades", lambda: [], raising=False)
     df = ps.update_summary()
     assert df.empty
+
+
+# ---------------------------------------------------------------------------
+# incremental FIFO (real storage + synthetic ledger)
+# ---------------------------------------------------------------------------
+_INC_MODULES = ("storage", "report_cache", "portfolio_summary", "synthetic_ledger")
+
+
+@pytest.fixture()
+def inc(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    saved = {name: sys.modules.pop(name, None) for name in _INC_MODULES}
+    import portfolio_summary
+    import storage
+    import synthetic_ledger
+
+    storage.init_db()
+    entries = synthetic_ledger.generate(3000, assets=8, years=1)
+    ordered = sorted(entries.items(), key=lambda kv: (kv[1]["time"], kv[0]))
+    yield portfolio_summary, storage, ordered
+    for name, mod in saved.items():
+        sys.modules.pop(name, None)
+        if mod is not None:
+            sys.modules[name] = mod
+
+
+def _cut(ordered, n):
+    """Split the ordered ledger before the last `n` entries, on a refid boundary."""
+    cut = len(ordered) - n
+    while ordered[cut][1]["refid"] == ordered[cut - 1][1]["refid"]:
+        cut -= 1
+    return dict(ordered[:cut]), dict(ordered[cut:])
+
+
+def _assert_same(a, b):
+    pd.testing.assert_frame_equal(
+        a.drop(columns="update_date"), b.drop(columns="update_date"), rtol=1e-9
+    )
+    assert list(a["update_date"]) == list(b["update_date"])
+
+
+def test_incremental_applies_only_new_entries(inc, monkeypatch):
+    ps_mod, storage, ordered = inc
+    old, new = _cut(ordered, 25)
+    storage.upsert_entries(old)
+    ps_mod.run_fifo_incremental()  # first run: full replay, state saved
+
+    storage.upsert_entries(new)
+    loaded = []
+    real = ps_mod._load_trade_rows
+    monkeypatch.setattr(
+        ps_mod,
+        "_load_trade_rows",
+        lambda conn, refids=None: loaded.append(refids) or real(conn, refids),
+    )
+    df = ps_mod.run_fifo_incremental()
+    assert loaded == [list(dict.fromkeys(e["refid"] for e in new.values()))]
+    _assert_same(df, ps_mod.run_fifo_from_trades(storage.load_trades()))
+    assert ps_mod.verify_incremental() == []
+    assert ps_mod.main(["--verify"]) == 0
+
+    # a state that drifted from the ledger is reported
+    cache, db = ps_mod.report_cache, storage.LEDGER_DB_FILE
+    state = cache.load_state(db, ps_mod.FIFO_STATE_SLOT)
+    state["fifo"]["BTC"]["total_fee"] += 1.0
+    cache.store_state(db, ps_mod.FIFO_STATE_SLOT, state)
+    assert any(d.startswith("BTC total_fee") for d in ps_mod.verify_incremental())
+    assert ps_mod.main(["--verify"]) == 1
+
+
+def test_incremental_falls_back_for_entries_before_watermark(inc, caplog):
+    ps_mod, storage, ordered = inc
+    old, new = _cut(ordered, 25)
+    storage.upsert_entries(old)
+    ps_mod.run_fifo_incremental()
+
+    # a late-arriving trade older than the watermark, plus the new entries
+    early = {
+        txid + "X": {**e, "refid": e["refid"] + "X"} for txid, e in ordered[100:102]
+    }
+    storage.upsert_entries({**new, **early})
+    with caplog.at_level("INFO"):
+        df = ps_mod.run_fifo_incremental()
+    assert "entries inserted before the watermark" in caplog.text
+    _assert_same(df, ps_mod.run_fifo_from_trades(storage.load_trades()))
+
+
+def test_incremental_falls_back_for_new_leg_of_applied_refid(inc, caplog):
+    ps_mod, storage, ordered = inc
+    txid, last = ordered[-1]
+    storage.upsert_entries(dict(ordered))
+    ps_mod.run_fifo_incremental()
+
+    # same refid and time as an applied entry, sorting after the watermark
+    storage.upsert_entries({txid + "Z": {**last, "amount": "0.5", "fee": "0"}})
+    with caplog.at_level("INFO"):
+        df = ps_mod.run_fifo_incremental()
+    assert "already applied refid" in caplog.text
+    _assert_same(df, ps_mod.run_fifo_from_trades(storage.load_trades()))
+
+
+def test_update_summary_incremental_flag(inc, monkeypatch):
+    ps_mod, storage, ordered = inc
+    storage.upsert_entries(dict(ordered))
+    calls = []
+    real = ps_mod.run_fifo_incremental
+    monkeypatch.setattr(
+        ps_mod, "run_fifo_incremental", lambda: calls.append(1) or real()
+    )
+    full = ps_mod.update_summary()
+    assert calls == []
+    monkeypatch.setattr(ps_mod, "INCREMENTAL", True)
+    _assert_same(ps_mod.update_summary(), full)
+    assert calls == [1]
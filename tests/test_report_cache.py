@@ -0,0 +1,131 @@
+"""Unit tests for report_cache.py — fingerprint-keyed cache of DB-built reports."""
+
+import os
+import sqlite3
+import sys
+import time
+
+import pandas as pd
+import pytest
+
+_MODULES = (
+    "storage",
+    "report_cache",
+    "report_engine",
+    "report_io",
+    "ledger_eur_report",
+)
+
+
+@pytest.fixture()
+def mods(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for name in _MODULES:
+        sys.modules.pop(name, None)
+    import ledger_eur_report
+    import report_cache
+    import storage
+
+    storage.init_db()
+    yield storage, report_cache, ledger_eur_report
+    for name in _MODULES:
+        sys.modules.pop(name, None)
+
+
+def _buy(refid, days_ago=0, eur=100.0):
+    ts = time.time() - days_ago * 86400
+    leg = {"refid": refid, "time": ts, "type": "trade", "fee": 0.0}
+    return {
+        f"{refid}-E": {**leg, "asset": "ZEUR", "amount": -eur},
+        f"{refid}-C": {**leg, "asset": "XXBT", "amount": 0.01},
+    }
+
+
+def _counter():
+    calls = []
+
+    def build():
+        calls.append(1)
+        return pd.DataFrame({"n": [len(calls)]})
+
+    return calls, build
+
+
+def test_cached_builds_once_per_fingerprint(mods):
+    storage, report_cache, _ = mods
+    storage.upsert_entries(_buy("R1"))
+    calls, build = _counter()
+    db = storage.LEDGER_DB_FILE
+    first = report_cache.cached(db, "r", {"days": 7}, build)
+    second = report_cache.cached(db, "r", {"days": 7}, build)
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(first, second)
+    assert os.path.isdir(os.path.join("balances_history", ".cache"))
+
+    storage.upsert_entries(_buy("R2"))
+    report_cache.cached(db, "r", {"days": 7}, build)
+    assert len(calls) == 2
+
+
+def test_cached_keys_on_params_and_day(mods, monkeypatch):
+    storage, report_cache, _ = mods
+    storage.upsert_entries(_buy("R1"))
+    calls, build = _counter()
+    db = storage.LEDGER_DB_FILE
+    report_cache.cached(db, "r", {"days": 7}, build)
+    report_cache.cached(db, "r", {"days": 30}, build)
+    report_cache.cached(db, "r", {"days": 7}, build)
+    assert len(calls) == 2  # one slot per parameter set
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 86400)
+    report_cache.cached(db, "r", {"days": 7}, build)
+    assert len(calls) == 3
+
+
+def test_fingerprint_sees_updated_entries(mods):
+    storage, report_cache, _ = mods
+    entries = _buy("R1")
+    storage.upsert_entries(entries)
+    fp = report_cache.fingerprint(storage.LEDGER_DB_FILE)
+    entries["R1-E"]["amount"] = -150.0
+    storage.upsert_entries(entries)  # same rows, new payload
+    assert report_cache.fingerprint(storage.LEDGER_DB_FILE) != fp
+
+
+def test_db_without_ledger_is_not_cached(mods, tmp_path):
+    _, report_cache, _ = mods
+    db = str(tmp_path / "other.db")
+    sqlite3.connect(db).close()
+    calls, build = _counter()
+    report_cache.cached(db, "r", {}, build)
+    report_cache.cached(db, "r", {}, build)
+    assert len(calls) == 2
+
+
+def test_refresh_hit_skips_db_and_csv_work(mods, monkeypatch):
+    storage, _, eur = mods
+    storage.upsert_entries(_buy("R1"))
+    assert eur.refresh_eur_report(days=7) == 1
+
+    def fail(*a, **k):
+        raise AssertionError("cache miss")
+
+    monkeypatch.setattr(storage, "daily_changes", fail)
+    assert eur.refresh_eur_report(days=7) == 1
+    # an edited CSV is not trusted
+    with open(eur.LEDGER_EUR_FILE, "a", encoding="utf-8") as f:
+        f.write("\n")
+    with pytest.raises(AssertionError, match="cache miss"):
+        eur.refresh_eur_report(days=7)
+
+
+def test_build_from_db_uses_cache(mods, monkeypatch):
+    storage, _, eur = mods
+    storage.upsert_entries(_buy("R1"))
+    first = eur.build_eur_report(storage.LEDGER_DB_FILE, days=7)
+    monkeypatch.setattr(
+        eur, "_build_from_db", lambda *a, **k: pytest.fail("not cached")
+    )
+    pd.testing.assert_frame_equal(
+        eur.build_eur_report(storage.LEDGER_DB_FILE, days=7), first
+    )
@@ -0,0 +1,162 @@
+"""Unit tests for report_engine.py — single-pass multi-report engine."""
+
+import sys
+import time
+
+import pandas as pd
+import pytest
+
+MODULES = (
+    "storage",
+    "report_engine",
+    "ledger_eur_report",
+    "ledger_asset_report",
+    "ledger_sell_report",
+)
+
+
+@pytest.fixture()
+def env(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for name in MODULES:
+        sys.modules.pop(name, None)
+    import ledger_asset_report
+    import ledger_eur_report
+    import ledger_sell_report
+    import report_engine
+    import storage
+
+    yield storage, report_engine, [
+        ledger_eur_report.EurReport,
+        ledger_asset_report.AssetReport,
+        ledger_sell_report.SellReport,
+    ]
+    for name in MODULES:
+        sys.modules.pop(name, None)
+
+
+def _ledger():
+    now = time.time()
+    return {
+        "b1": {
+            "refid": "r1",
+            "asset": "ZEUR",
+            "amount": "-100",
+            "fee": "0.4",
+            "time": now - 100,
+            "type": "trade",
+        },
+        "b2": {
+            "refid": "r1",
+            "asset": "XXBT",
+            "amount": "0.002",
+            "fee": "0",
+            "time": now - 100,
+            "type": "trade",
+        },
+        "s1": {
+            "refid": "r2",
+            "asset": "SOL",
+            "amount": "-3",
+            "fee": "0.01",
+            "time": now - 50,
+            "type": "trade",
+        },
+        "s2": {
+            "refid": "r2",
+            "asset": "ZEUR",
+            "amount": "60",
+            "fee": "0.1",
+            "time": now - 50,
+            "type": "trade",
+        },
+        "k1": {
+            "refid": "",
+            "asset": "DOT",
+            "amount": "1.5",
+            "fee": "0",
+            "time": now - 10,
+            "type": "staking",
+        },
+        "old": {
+            "refid": "r0",
+            "asset": "XXBT",
+            "amount": "9",
+            "fee": "0",
+            "time": now - 30 * 86400,
+            "type": "trade",
+        },
+        "bad": {"refid": "r9", "asset": "XXBT", "amount": "n/a", "time": now},
+    }
+
+
+def test_one_pass_matches_single_report_builders(env):
+    _, engine, reports = env
+    ledger = _ledger()
+    both = engine.build_reports(ledger, reports, days=7)
+    for report in reports:
+        alone = engine.build_reports(ledger, [report], days=7)[report.name]
+        pd.testing.assert_frame_equal(both[report.name], alone)
+
+    assert both["eur"].loc[0, "XXBT"] == 100.0
+    assert both["sell"].loc[0, "Total EUR"] == 60.0
+    assert set(both["asset"].columns) == {"Date", "XXBT", "DOT"}
+
+
+def test_single_use_iterator_feeds_every_report(env):
+    _, engine, reports = env
+    out = engine.build_reports(iter(_ledger().items()), reports, days=7)
+    assert not any(df.empty for df in out.values())
+
+
+def test_group_legs_parses_once_and_skips_malformed(env):
+    _, engine, _ = env
+    groups = engine.group_legs(_ledger(), cutoff=time.time() - 86400)
+    assert list(groups) == ["r1", "r2", "k1"]  # r0 too old, r9 malformed
+    (leg,) = groups["k1"]
+    assert leg.amount == 1.5 and leg.type == "staking" and leg.txid == "k1"
+
+
+def test_streaming_db_source_matches_dict(env):
+    storage, engine, reports = env
+    ledger = _ledger()
+    del ledger["bad"]
+    storage.save_entries(ledger)
+    from_dict = engine.build_reports(storage.load_entries_from_db(), reports)
+    streamed = engine.build_reports(storage.iter_entries(since=0), reports)
+    for name, df in from_dict.items():
+        pd.testing.assert_frame_equal(streamed[name], df)
+
+
+def test_time_and_date_bounds(env):
+    _, engine, _ = env
+    lo, hi = engine.time_bounds(start="2024-01-01", end="2024-03-31")
+    assert (lo, hi) == (1704067200.0, 1711929600.0)  # 2024-01-01, 2024-04-01 UTC
+    assert engine.date_bounds(start="2024-01-01") == ("2024-01-01", None)
+    assert engine.date_bounds(end="2024-03-31") == ("", "2024-03-31")
+    yesterday = time.strftime("%Y-%m-%d", time.gmtime(time.time() - 86400))
+    assert engine.date_bounds(days=1) == (yesterday, None)
+
+
+def test_absolute_range_in_memory_matches_db(env):
+    storage, engine, reports = env
+    day = 86400.0
+    t0 = 1704067200.0  # 2024-01-01 00:00 UTC
+    ledger = {}
+    for i, ts in enumerate([t0 - 1, t0, t0 + 45 * day, t0 + 91 * day]):
+        ledger[f"e{i}"] = {
+            "refid": f"r{i}",
+            "asset": "ZEUR",
+            "amount": "-10",
+            "fee": "0.1",
+            "time": ts,
+            "type": "trade",
+        }
+        ledger[f"c{i}"] = {**ledger[f"e{i}"], "asset": "XXBT", "amount": "0.01"}
+    storage.save_entries(ledger)
+    q1 = {"start": "2024-01-01", "end": "2024-03-31"}
+    mem = engine.build_reports(ledger, reports, **q1)
+    db = engine.build_reports(storage.LEDGER_DB_FILE, reports, **q1)
+    assert len(mem["eur"]) == 2
+    for name, df in mem.items():
+        pd.testing.assert_frame_equal(df, db[name], check_dtype=False)
@@ -0,0 +1,190 @@
+"""Unit tests for report_io.py — atomic and incremental (watermarked) report CSVs."""
+
+import os
+import sys
+import time
+
+import pandas as pd
+import pytest
+
+_MODULES = (
+    "storage",
+    "report_io",
+    "ledger_eur_report",
+    "ledger_asset_report",
+    "ledger_sell_report",
+)
+
+
+@pytest.fixture()
+def mods(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for name in _MODULES:
+        sys.modules.pop(name, None)
+    import ledger_asset_report
+    import ledger_eur_report
+    import report_io
+    import storage
+
+    storage.init_db()
+    yield storage, report_io, ledger_eur_report, ledger_asset_report
+    for name in _MODULES:
+        sys.modules.pop(name, None)
+
+
+def _buy(refid, asset, eur, qty, days_ago):
+    ts = time.time() - days_ago * 86400
+    return {
+        f"{refid}-E": {
+            "refid": refid,
+            "time": ts,
+            "type": "trade",
+            "asset": "ZEUR",
+            "amount": -eur,
+            "fee": eur / 100,
+        },
+        f"{refid}-C": {
+            "refid": refid,
+            "time": ts,
+            "type": "trade",
+            "asset": asset,
+            "amount": qty,
+            "fee": 0.0,
+        },
+    }
+
+
+def _seed(storage):
+    entries = {}
+    for i, asset in enumerate(["XXBT", "XETH", "XXBT", "XETH"]):
+        entries.update(_buy(f"R{i}", asset, 100.0 + i, 0.01 * (i + 1), 3 - i))
+    storage.upsert_entries(entries)
+
+
+def _read(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        return f.read()
+
+
+def _full_text(report_io, report, days):
+    return report_io._csv_text(report.from_db(report_io.storage.LEDGER_DB_FILE, days))
+
+
+def _count_from_db(monkeypatch, report):
+    calls = []
+    orig = report.from_db.__func__
+
+    def counting(cls, db_path, days, dates=None):
+        calls.append(None if dates is None else set(dates))
+        return orig(cls, db_path, days, dates)
+
+    monkeypatch.setattr(report, "from_db", classmethod(counting))
+    return calls
+
+
+def test_refresh_writes_full_csv_and_watermark(mods):
+    storage, report_io, eur, _ = mods
+    _seed(storage)
+    rows = eur.refresh_eur_report(days=7)
+    assert rows == 4
+    assert _read(eur.LEDGER_EUR_FILE) == _full_text(report_io, eur.EurReport, 7)
+    assert os.path.exists(report_io.watermark_path(eur.LEDGER_EUR_FILE))
+
+
+def test_refresh_without_changes_builds_nothing(mods, monkeypatch):
+    storage, _, eur, _ = mods
+    _seed(storage)
+    eur.refresh_eur_report(days=7)
+    calls = _count_from_db(monkeypatch, eur.EurReport)
+    assert eur.refresh_eur_report(days=7) == 4
+    assert calls == []
+
+
+def test_refresh_rebuilds_only_changed_dates(mods, monkeypatch):
+    storage, report_io, eur, _ = mods
+    _seed(storage)
+    eur.refresh_eur_report(days=7)
+    storage.upsert_entries(_buy("R9", "XXBT", 50.0, 0.005, 0))
+    calls = _count_from_db(monkeypatch, eur.EurReport)
+    assert eur.refresh_eur_report(days=7) == 4
+    today = time.strftime("%Y-%m-%d", time.gmtime())
+    assert calls == [{today}]
+    assert _read(eur.LEDGER_EUR_FILE) == _full_text(report_io, eur.EurReport, 7)
+
+
+def test_refresh_new_asset_falls_back_to_full_rebuild(mods, monkeypatch):
+    storage, report_io, _, asset = mods
+    _seed(storage)
+    asset.refresh_asset_report(days=7)
+    storage.upsert_entries(_buy("R9", "SOL", 50.0, 2.0, 1))
+    calls = _count_from_db(monkeypatch, asset.AssetReport)
+    asset.refresh_asset_report(days=7)
+    assert None in calls  # full rebuild
+    text = _read(asset.LEDGER_ASSET_FILE)
+    assert text.splitlines()[0].split(";") == ["Date", "XXBT", "XETH", "SOL"]
+    assert text == _full_text(report_io, asset.AssetReport, 7)
+
+
+def test_refresh_drops_dates_leaving_the_window(mods, monkeypatch):
+    storage, report_io, eur, _ = mods
+    _seed(storage)
+    eur.refresh_eur_report(days=4)
+    first_date = _read(eur.LEDGER_EUR_FILE).splitlines()[1].split(";")[0]
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 2 * 86400)
+    calls = _count_from_db(monkeypatch, eur.EurReport)
+    assert eur.refresh_eur_report(days=4) == 3
+    assert calls == []  # nothing changed: rows are only dropped
+    assert first_date not in _read(eur.LEDGER_EUR_FILE)
+    assert _read(eur.LEDGER_EUR_FILE) == _full_text(report_io, eur.EurReport, 4)
+
+
+def test_save_report_clears_watermark(mods):
+    storage, report_io, eur, _ = mods
+    _seed(storage)
+    eur.refresh_eur_report(days=7)
+    df = eur.build_eur_report(storage.LEDGER_DB_FILE, days=7)
+    eur.save_eur_report(df)
+    assert not os.path.exists(report_io.watermark_path(eur.LEDGER_EUR_FILE))
+
+
+def test_write_csv_streams_chunks(mods, tmp_path):
+    _, report_io, _, _ = mods
+    df = pd.DataFrame(
+        {
+            "Date": pd.date_range("2024-01-30", periods=5, freq="D"),
+            "Total": [0.1, 2.5, 1e-05, 3.0, 4.25],
+            "XXBT": [1, 0, 2, 0, 3],
+        }
+    )
+    path = str(tmp_path / "out" / "r.csv")
+    rows = report_io.write_csv(
+        path, report_io.iter_chunks(df, rows=2), "%d.%m.%Y", sep=";", index=False
+    )
+    assert rows == 5
+    assert _read(path) == report_io._csv_text(df)
+    assert _read(path).splitlines()[1] == "30.01.2024;0.1;1"
+
+    report_io.write_csv_rows(
+        path,
+        list(df.columns),
+        df.itertuples(index=False),
+    )
+    assert _read(path) == report_io._csv_text(df)
+    report_io.write_csv(path, report_io.iter_chunks(df.iloc[:0]), sep=";", index=False)
+    assert _read(path).strip() == "Date;Total;XXBT"
+
+
+def test_failed_write_keeps_previous_file(mods, tmp_path):
+    _, report_io, _, _ = mods
+    path = str(tmp_path / "r.csv")
+    report_io.write_csv_rows(path, ["a"], [[1]])
+
+    def rows():
+        yield [2]
+        raise RuntimeError("source failed")
+
+    with pytest.raises(RuntimeError):
+        report_io.write_csv_rows(path, ["a"], rows())
+    assert _read(path).split() == ["a", "1"]
+    assert not [f for f in os.listdir(tmp_path) if f.startswith(".tmp_")]
@@ -0,0 +1,104 @@
+"""Unit tests for report_long.py — (Date, asset, metric, value) report layout."""
+
+import sys
+import time
+
+import pandas as pd
+import pytest
+
+_MODULES = (
+    "storage",
+    "report_cache",
+    "report_engine",
+    "report_io",
+    "report_long",
+    "report_rollup",
+    "ledger_eur_report",
+    "ledger_asset_report",
+    "ledger_sell_report",
+)
+
+
+@pytest.fixture()
+def mods(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for name in _MODULES:
+        sys.modules.pop(name, None)
+    import ledger_asset_report
+    import ledger_eur_report
+    import ledger_sell_report
+    import report_long
+    import storage
+
+    storage.init_db()
+    entries = {}
+    for i, asset in enumerate(["XXBT", "XETH", "SOL", "DOT", "XXBT", "ADA"]):
+        leg = {"refid": f"R{i}", "time": time.time() - i * 86400, "type": "trade"}
+        sell = i % 3 == 0
+        entries[f"T{i}E"] = {
+            **leg,
+            "asset": "ZEUR",
+            "amount": 40.0 if sell else -25.0 - i,
+            "fee": 0.0 if sell else 0.1,
+        }
+        entries[f"T{i}C"] = {
+            **leg,
+            "asset": asset,
+            "amount": -0.2 if sell else 0.5,
+            "fee": 0.001 if sell else 0.0,
+        }
+    storage.upsert_entries(entries)
+    reports = {
+        "eur": (ledger_eur_report.EurReport, ledger_eur_report.build_eur_report),
+        "asset": (
+            ledger_asset_report.AssetReport,
+            ledger_asset_report.build_asset_report,
+        ),
+        "sell": (ledger_sell_report.SellReport, ledger_sell_report.build_sell_report),
+    }
+    yield storage, report_long, reports
+    for name in _MODULES:
+        sys.modules.pop(name, None)
+
+
+@pytest.mark.parametrize("name", ["eur", "asset", "sell"])
+def test_wide_view_of_long_rows_equals_wide_report(mods, name):
+    storage, report_long, reports = mods
+    report, build = reports[name]
+    wide = build(storage.LEDGER_DB_FILE, days=30)
+    long = build(storage.LEDGER_DB_FILE, days=30, layout="long")
+
+    assert list(long.columns) == report_long.LONG_COLUMNS
+    assert (long["value"] != 0).all()
+    assert set(long["metric"]) <= set(report.metrics)
+    assert long["Date"].is_monotonic_increasing
+    # one column per asset in the wide report, one row per non-zero value here
+    assert set(long["asset"]) == set(wide.columns) - {"Date", *report.totals}
+    pd.testing.assert_frame_equal(report_long.to_wide(long, report), wide)
+
+
+def test_long_rollup(mods):
+    storage, report_long, reports = mods
+    report, build = reports["eur"]
+    long = build(storage.LEDGER_DB_FILE, days=30, granularity="year", layout="long")
+    assert long["Date"].nunique() <= 2  # the window may span New Year
+    pd.testing.assert_frame_equal(
+        report_long.to_wide(long, report),
+        build(storage.LEDGER_DB_FILE, days=30, granularity="year"),
+    )
+
+
+def test_long_layout_arguments(mods):
+    storage, report_long, reports = mods
+    _, build = reports["sell"]
+    with pytest.raises(ValueError):
+        build({}, layout="long")
+    with pytest.raises(ValueError):
+        build(storage.LEDGER_DB_FILE, layout="tall")
+    assert report_long.long_path("b/ledger_sell_report.csv") == (
+        "b/ledger_sell_report_long.csv"
+    )
+    empty = build(
+        storage.LEDGER_DB_FILE, start="2001-01-01", end="2001-01-31", layout="long"
+    )
+    assert empty.empty and list(empty.columns) == report_long.LONG_COLUMNS
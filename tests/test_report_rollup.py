@@ -0,0 +1,149 @@
+"""Unit tests for report_rollup.py — week/month/year rollups of the daily reports."""
+
+import sys
+import time
+from datetime import date, datetime, timezone
+
+import pandas as pd
+import pytest
+
+_MODULES = (
+    "storage",
+    "report_cache",
+    "report_engine",
+    "report_rollup",
+    "report_io",
+    "ledger_eur_report",
+    "ledger_sell_report",
+)
+
+
+@pytest.fixture()
+def mods(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for name in _MODULES:
+        sys.modules.pop(name, None)
+    import ledger_eur_report
+    import report_rollup
+    import storage
+
+    storage.init_db()
+    yield storage, report_rollup, ledger_eur_report
+    for name in _MODULES:
+        sys.modules.pop(name, None)
+
+
+def _ts(day):
+    return datetime.fromisoformat(day).replace(hour=12, tzinfo=timezone.utc).timestamp()
+
+
+def _buy(refid, day, eur=10.0, asset="XXBT"):
+    leg = {"refid": refid, "time": _ts(day), "type": "trade", "fee": 0.0}
+    return {
+        f"{refid}-E": {**leg, "asset": "ZEUR", "amount": -eur, "fee": 0.5},
+        f"{refid}-C": {**leg, "asset": asset, "amount": 0.01},
+    }
+
+
+def _seed(storage):
+    entries = {}
+    for i, (day, asset) in enumerate(
+        [
+            ("2024-01-03", "XXBT"),
+            ("2024-01-31", "XETH"),
+            ("2024-02-01", "XXBT"),
+            ("2024-02-29", "XXBT"),
+            ("2024-03-15", "XETH"),
+        ]
+    ):
+        entries.update(_buy(f"R{i}", day, asset=asset))
+    storage.upsert_entries(entries)
+
+
+def _record_daily_rows(monkeypatch, report):
+    calls = []
+    orig = report.daily_rows.__func__
+
+    def recording(cls, db_path, first, last=None):
+        calls.append((first, last))
+        return orig(cls, db_path, first, last)
+
+    monkeypatch.setattr(report, "daily_rows", classmethod(recording))
+    return calls
+
+
+def test_periods():
+    import report_rollup
+
+    d = date(2024, 2, 29)  # a Thursday
+    assert report_rollup.period_start(d, "week") == date(2024, 2, 26)
+    assert report_rollup.period_start(d, "month") == date(2024, 2, 1)
+    assert report_rollup.period_start(d, "year") == date(2024, 1, 1)
+    assert report_rollup.next_period(date(2024, 12, 1), "month") == date(2025, 1, 1)
+    assert report_rollup.next_period(date(2024, 1, 31), "day") == date(2024, 2, 1)
+    assert (
+        report_rollup.rollup_path("b/ledger_eur_report.csv", "week")
+        == "b/ledger_eur_report_week.csv"
+    )
+
+
+def test_monthly_rollup_sums_daily_rows(mods):
+    storage, rollup, eur = mods
+    _seed(storage)
+    df = eur.build_eur_report(
+        storage.LEDGER_DB_FILE,
+        start="2024-01-01",
+        end="2024-03-31",
+        granularity="month",
+    )
+    assert list(df["Date"]) == list(
+        pd.to_datetime(["2024-01-01", "2024-02-01", "2024-03-01"])
+    )
+    assert list(df["Total Spent EUR"]) == [20.0, 20.0, 10.0]
+    assert list(df["Total Fee"]) == [1.0, 1.0, 0.5]
+    assert list(df["XETH"]) == [10.0, 0.0, 10.0]
+
+    daily = eur.build_eur_report(
+        storage.LEDGER_DB_FILE, start="2024-01-01", end="2024-03-31"
+    )
+    by_month = daily.groupby(daily["Date"].dt.to_period("M")).sum(numeric_only=True)
+    assert list(by_month["Total Spent EUR"]) == list(df["Total Spent EUR"])
+
+    year = rollup.build_rollup(
+        eur.EurReport, storage.LEDGER_DB_FILE, "year", start="2024-06-01"
+    )
+    assert len(year) == 1 and year.loc[0, "Total Spent EUR"] == 50.0  # whole 2024
+
+
+def test_closed_periods_are_cached(mods, monkeypatch):
+    storage, rollup, eur = mods
+    _seed(storage)
+    args = (eur.EurReport, storage.LEDGER_DB_FILE, "month")
+    first = rollup.build_rollup(*args, start="2024-01-01", end="2024-03-31")
+    calls = _record_daily_rows(monkeypatch, eur.EurReport)
+    again = rollup.build_rollup(*args, start="2024-01-01", end="2024-03-31")
+    assert calls == []
+    pd.testing.assert_frame_equal(again, first)
+
+    storage.upsert_entries(_buy("R9", "2024-02-10", eur=5.0))
+    changed = rollup.build_rollup(*args, start="2024-01-01", end="2024-03-31")
+    assert calls == [("2024-02-01", "2024-02-29")]  # only the changed month
+    assert list(changed["Total Spent EUR"]) == [20.0, 25.0, 10.0]
+
+
+def test_open_period_is_always_rebuilt(mods, monkeypatch):
+    storage, rollup, eur = mods
+    today = time.strftime("%Y-%m-%d", time.gmtime())
+    storage.upsert_entries(_buy("R1", today))
+    args = (eur.EurReport, storage.LEDGER_DB_FILE, "week")
+    rollup.build_rollup(*args, days=1)
+    calls = _record_daily_rows(monkeypatch, eur.EurReport)
+    df = rollup.build_rollup(*args, days=1)
+    assert len(calls) == 1
+    assert df.loc[0, "Total Spent EUR"] == 10.0
+
+
+def test_rollups_need_a_db_source(mods):
+    _, _, eur = mods
+    with pytest.raises(ValueError):
+        eur.build_eur_report({}, granularity="month")
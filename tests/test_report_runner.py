@@ -0,0 +1,88 @@
+"""Unit tests for report_runner.py — report jobs in a process pool."""
+
+import os
+import sys
+import time
+
+import pandas as pd
+import pytest
+
+_MODULES = (
+    "storage",
+    "report_cache",
+    "report_engine",
+    "report_io",
+    "report_rollup",
+    "report_runner",
+    "report_vectorized",
+    "ledger_cache",
+    "ledger_eur_report",
+    "ledger_asset_report",
+    "ledger_sell_report",
+    "portfolio_summary",
+)
+
+
+@pytest.fixture()
+def mods(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for name in _MODULES:
+        sys.modules.pop(name, None)
+    import report_runner
+    import storage
+
+    storage.init_db()
+    entries = {}
+    for i, asset in enumerate(["XXBT", "XETH", "SOL", "XXBT"]):
+        leg = {"refid": f"R{i}", "time": time.time() - i * 86400, "fee": 0.0}
+        entries[f"T{i}E"] = {**leg, "type": "trade", "asset": "ZEUR", "amount": -50.0}
+        entries[f"T{i}C"] = {**leg, "type": "trade", "asset": asset, "amount": 0.5}
+    storage.upsert_entries(entries)
+    yield storage, report_runner
+    for name in _MODULES:
+        sys.modules.pop(name, None)
+
+
+def test_run_reports_in_pool_matches_in_process(mods):
+    storage, runner = mods
+    parallel = runner.run_reports(7, storage.LEDGER_DB_FILE, workers=3)
+    assert parallel == {"eur": 4, "asset": 4, "sell": 0}
+    for name in ("eur", "asset"):
+        assert os.path.exists(
+            os.path.join(storage.BALANCES_DIR, f"ledger_{name}_report.csv")
+        )
+    assert runner.run_reports(7, storage.LEDGER_DB_FILE, workers=1) == parallel
+
+
+def test_default_runs_in_process(mods, monkeypatch):
+    storage, runner = mods
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("no process pool without --workers N > 1")
+
+    monkeypatch.setattr(runner, "ProcessPoolExecutor", no_pool)
+    assert runner.run_reports(7, storage.LEDGER_DB_FILE)["eur"] == 4
+    assert len(runner.build_vectorized_reports(storage.LEDGER_DB_FILE, 7)["eur"]) == 4
+
+
+def test_failed_job_is_reported(mods, monkeypatch):
+    storage, runner = mods
+
+    def boom(days=7, db_path=None):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(runner.ledger_sell_report, "refresh_sell_report", boom)
+    rows = runner.run_reports(7, storage.LEDGER_DB_FILE, workers=1)
+    assert rows["sell"] == -1 and rows["eur"] == 4
+    with pytest.raises(ValueError):
+        runner.run_reports(7, storage.LEDGER_DB_FILE, jobs=["nope"])
+
+
+def test_vectorized_workers_share_the_cache(mods):
+    storage, runner = mods
+    parallel = runner.build_vectorized_reports(storage.LEDGER_DB_FILE, 7, workers=3)
+    serial = runner.build_vectorized_reports(storage.LEDGER_DB_FILE, 7, workers=1)
+    assert set(parallel) == {"eur", "asset", "sell"}
+    for name, df in serial.items():
+        pd.testing.assert_frame_equal(parallel[name], df)
+    assert len(parallel["eur"]) == 4
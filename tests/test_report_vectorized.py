@@ -0,0 +1,161 @@
+"""Differential tests: report_vectorized.py vs the loop-based report builders."""
+
+import random
+import sys
+import time
+
+import pandas as pd
+import pytest
+
+MODULES = (
+    "storage",
+    "report_engine",
+    "report_vectorized",
+    "ledger_cache",
+    "ledger_eur_report",
+    "ledger_asset_report",
+    "ledger_sell_report",
+)
+
+
+@pytest.fixture()
+def env(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for name in MODULES:
+        sys.modules.pop(name, None)
+    import ledger_asset_report
+    import ledger_eur_report
+    import ledger_sell_report
+    import report_engine
+    import report_vectorized
+
+    reports = [
+        ledger_eur_report.EurReport,
+        ledger_asset_report.AssetReport,
+        ledger_sell_report.SellReport,
+    ]
+    yield report_engine, report_vectorized, reports
+    for name in MODULES:
+        sys.modules.pop(name, None)
+
+
+def _random_ledger(n_refids=600, seed=7):
+    """Buys (incl. multi-asset), sells, staking and odd rows over ~20 days."""
+    rng = random.Random(seed)
+    now = time.time()
+    assets = ["XXBT", "XETH", "SOL", "DOT.S", "ADA"]
+    entries = {}
+    for r in range(n_refids):
+        ts = now - rng.uniform(0, 20 * 86400)
+        refid = f"R{r:05d}"
+        kind = rng.choice(["buy", "buy2", "sell", "staking", "deposit", "spend"])
+        legs = []
+        if kind in ("buy", "buy2", "spend"):
+            legs.append(("ZEUR", -rng.uniform(1, 500), rng.uniform(0, 2)))
+            legs.append((rng.choice(assets), rng.uniform(0.001, 3), 0.0))
+            if kind == "buy2":
+                legs.append((rng.choice(assets), rng.uniform(0.001, 3), 0.0))
+        elif kind == "sell":
+            legs.append(
+                (rng.choice(assets), -rng.uniform(0.001, 3), rng.uniform(0, 0.01))
+            )
+            legs.append(("ZEUR", rng.uniform(1, 500), rng.uniform(0, 1)))
+        else:
+            legs.append((rng.choice(assets), rng.uniform(0.001, 3), 0.0))
+        typ = "trade" if kind in ("buy", "buy2", "sell") else kind
+        for i, (asset, amount, fee) in enumerate(legs):
+            entries[f"{refid}-L{i}"] = {
+                "refid": "" if kind == "deposit" else refid,
+                "time": ts + i * rng.choice([0, 1]),
+                "type": typ.upper() if rng.random() < 0.1 else typ,
+                "asset": asset,
+                "amount": f"{amount:.10f}",
+                "fee": f"{fee:.10f}",
+            }
+    entries["bad"] = {"refid": "RX", "asset": "SOL", "amount": "x", "time": now}
+    return entries
+
+
+@pytest.mark.parametrize("days", [1, 7, 30])
+def test_vectorized_reports_match_loop_builders(env, days):
+    engine, vec, reports = env
+    ledger = _random_ledger()
+    expected = engine.build_reports(ledger, reports, days=days)
+    actual = vec.build_reports(ledger, days=days)
+    for name, df in expected.items():
+        assert not df.empty
+        pd.testing.assert_frame_equal(actual[name], df, check_exact=True)
+
+
+def test_canonical_date_wins_over_time(env):
+    engine, vec, reports = env
+    now = time.time()
+    ledger = {
+        "a": {
+            "refid": "r",
+            "asset": "ZEUR",
+            "amount": "-10",
+            "time": now,
+            "date": "2020-01-02",
+            "type": "trade",
+        },
+        "b": {
+            "refid": "r",
+            "asset": "SOL",
+            "amount": "1",
+            "time": now,
+            "date": "2020-01-02",
+            "type": "trade",
+        },
+    }
+    expected = engine.build_reports(ledger, reports)
+    actual = vec.build_reports(ledger)
+    for name, df in expected.items():
+        pd.testing.assert_frame_equal(actual[name], df, check_exact=True)
+    assert actual["eur"].loc[0, "Date"] == pd.Timestamp("2020-01-02")
+
+
+def test_empty_window_gives_empty_frames(env):
+    _, vec, _ = env
+    out = vec.build_reports({"a": {"asset": "SOL", "amount": "1", "time": 1.0}})
+    assert all(df.empty for df in out.values())
+
+
+def test_frame_from_ledger_cache_matches(env):
+    engine, vec, reports = env
+    import ledger_cache
+    import storage
+
+    ledger = _random_ledger(n_refids=200)
+    del ledger["bad"]
+    storage.save_entries(ledger)
+    frame = vec.frame_from_columns(ledger_cache.load_ledger_columns())
+    expected = engine.build_reports(storage.load_entries_from_db(), reports, days=30)
+    actual = vec.build_reports(frame, days=30)
+    for name, df in expected.items():
+        pd.testing.assert_frame_equal(
+            actual[name], df, check_exact=False, check_like=name == "asset"
+        )
+
+
+def test_absolute_range_matches_loop_builders(env):
+    engine, vec, reports = env
+    import ledger_cache
+    import storage
+
+    ledger = _random_ledger(n_refids=300)
+    del ledger["bad"]
+    start = time.strftime("%Y-%m-%d", time.gmtime(time.time() - 12 * 86400))
+    end = time.strftime("%Y-%m-%d", time.gmtime(time.time() - 4 * 86400))
+    expected = engine.build_reports(ledger, reports, start=start, end=end)
+    actual = vec.build_reports(ledger, start=start, end=end)
+    storage.save_entries(ledger)
+    frame = vec.frame_from_columns(ledger_cache.load_ledger_columns())
+    assert frame.attrs["time_sorted"]
+    bisected = vec.build_reports(frame, start=start, end=end)
+    for name, df in expected.items():
+        assert not df.empty
+        pd.testing.assert_frame_equal(actual[name], df, check_exact=True)
+        pd.testing.assert_frame_equal(
+            bisected[name], df, check_exact=False, check_like=name == "asset"
+        )
@@ -35,19 +35,30 @@ def start_mod(tmp_path, monkeypatch):
 
     eur_stub = types.ModuleType("ledger_eur_report")
     eur_stub.build_eur_report = lambda entries, days=7: pd.DataFrame()
+    eur_stub.refresh_eur_report = lambda days=7, db_path=None: 0
     eur_stub.save_eur_report = lambda df: None
     monkeypatch.setitem(sys.modules, "ledger_eur_report", eur_stub)
 
     asset_stub = types.ModuleType("ledger_asset_report")
     asset_stub.build_asset_report = lambda entries, days=7: pd.DataFrame()
+    asset_stub.refresh_asset_report = lambda days=7, db_path=None: 0
     asset_stub.save_asset_report = lambda df: None
     monkeypatch.setitem(sys.modules, "ledger_asset_report", asset_stub)
 
     sell_stub = types.ModuleType("ledger_sell_report")
     sell_stub.build_sell_report = lambda entries, days=7: pd.DataFrame()
+    sell_stub.refresh_sell_report = lambda days=7, db_path=None: 0
     sell_stub.save_sell_report = lambda df: None
     monkeypatch.setitem(sys.modules, "ledger_sell_report", sell_stub)
 
+    runner_stub = types.ModuleType("report_runner")
+    runner_stub.run_reports = lambda days=7, db_path=None, jobs=(), workers=None: {
+        "eur": 0,
+        "asset": 0,
+        "sell": 0,
+    }
+    monkeypatch.setitem(sys.modules, "report_runner", runner_stub)
+
     balances_stub = types.ModuleType("balances")
     balances_stub.main = lambda argv=None: 0
     monkeypatch.setitem(sys.modules, "balances", balances_stub)
@@ -160,28 +171,12 @@ def test_main_generates_reports_when_data_present(start_mod, monkeypatch):
     entries = {"t1": {"asset": "BTC", "amount": 1.0, "time": 1700000000.0}}
     monkeypatch.setattr(start.storage, "load_entries_from_db", lambda: entries)
 
-    saved = {}
-    non_empty_df = pd.DataFrame([{"Date": "2026-01-01", "BTC": 1.0}])
-    monkeypatch.setattr(
-        start.ledger_eur_report, "build_eur_report", lambda e, days=7: non_empty_df
-    )
-    monkeypatch.setattr(
-        start.ledger_eur_report, "save_eur_report", lambda df: saved.update(eur=True)
-    )
-    monkeypatch.setattr(
-        start.ledger_asset_report, "build_asset_report", lambda e, days=7: non_empty_df
-    )
-    monkeypatch.setattr(
-        start.ledger_asset_report,
-        "save_asset_report",
-        lambda df: saved.update(asset=True),
-    )
-    monkeypatch.setattr(
-        start.ledger_sell_report, "build_sell_report", lambda e, days=7: non_empty_df
-    )
-    monkeypatch.setattr(
-        start.ledger_sell_report, "save_sell_report", lambda df: saved.update(sell=True)
-    )
+    calls = []
+
+    def run_reports(days=7, db_path=None, jobs=(), workers=None):
+        calls.append((days, db_path, workers))
+        return {"eur": 3, "asset": 2, "sell": 1}
 
-    start.main([])
-    assert saved.get("eur") and saved.get("asset") and saved.get("sell")
+    monkeypatch.setattr(start.report_runner, "run_reports", run_reports)
+    start.main(["--workers", "3"])
+    assert calls == [(7, start.storage.DB_FILE, 3)]
@@ -5,6 +5,7 @@ import os
 import sqlite3
 import sys
 
+import pandas as pd
 import pytest
 
 
@@ -58,11 +59,74 @@ def test_save_entries_empty_skips(storage_mod):
     assert not os.path.exists(storage_mod.RAW_LEDGER_FILE)
 
 
-def test_save_entries_creates_backup_on_second_write(storage_mod):
+def test_save_entries_second_write_appends_to_journal(storage_mod):
     storage_mod.save_entries({"t1": _entry()})
     storage_mod.save_entries({"t2": _entry(refid="r2")})
     backups = [f for f in os.listdir(storage_mod.BALANCES_DIR) if ".bak." in f]
-    assert len(backups) >= 1
+    assert backups == []  # no full rewrite/backup on every save any more
+    with open(storage_mod.LEDGER_JOURNAL_FILE) as f:
+        assert "t2" in f.read()
+    assert set(storage_mod.load_entries()) == {"t1", "t2"}
+
+
+def test_compact_journal_backs_up_snapshot_and_truncates(storage_mod):
+    storage_mod.save_entries({"t1": _entry()})
+    storage_mod.save_update_entries({"t2": _entry(refid="r2")})
+    assert storage_mod.compact_journal() == 2
+    assert os.path.getsize(storage_mod.LEDGER_JOURNAL_FILE) == 0
+    with open(storage_mod.RAW_LEDGER_FILE) as f:
+        assert set(json.load(f)) == {"t1", "t2"}
+    backups = [f for f in os.listdir(storage_mod.BALANCES_DIR) if ".bak." in f]
+    assert len(backups) == 1
+
+
+def test_compact_journal_keeps_unreadable_snapshot(storage_mod):
+    storage_mod._ensure_dir()
+    with open(storage_mod.RAW_LEDGER_FILE, "w") as f:
+        f.write('{"t0": {')  # corrupt snapshot
+    storage_mod.append_journal({"t1": _entry()})
+    assert storage_mod.compact_journal() == 0
+    with open(storage_mod.RAW_LEDGER_FILE) as f:
+        assert f.read() == '{"t0": {'
+    assert os.path.getsize(storage_mod.LEDGER_JOURNAL_FILE) > 0
+
+
+def test_backup_retention_is_bounded(storage_mod):
+    storage_mod._ensure_dir()
+    for i in range(8):
+        name = f"{storage_mod.RAW_LEDGER_FILE}.bak.2026010{i}T000000Z"
+        open(name, "w").close()
+    with open(storage_mod.RAW_LEDGER_FILE, "w") as f:
+        f.write("{}")
+    storage_mod._backup_file(storage_mod.RAW_LEDGER_FILE, keep=3)
+    backups = [f for f in os.listdir(storage_mod.BALANCES_DIR) if ".bak." in f]
+    assert len(backups) == 3
+    assert "raw-ledger.json.bak.20260100T000000Z" not in backups
+
+
+def test_load_entries_skips_torn_journal_line(storage_mod):
+    storage_mod.append_journal({"t1": _entry()})
+    with open(storage_mod.LEDGER_JOURNAL_FILE, "a") as f:
+        f.write('{"ts": "x", "entries": {"t2"')  # crash mid-write
+    assert set(storage_mod.load_entries()) == {"t1"}
+
+
+def test_append_after_torn_journal_line_keeps_later_records(storage_mod):
+    storage_mod.append_journal({"t1": _entry()})
+    with open(storage_mod.LEDGER_JOURNAL_FILE, "a") as f:
+        f.write('{"ts": "x", "entries": {"t2"')  # crash mid-write
+    storage_mod.append_journal({"t3": _entry(refid="r3")})
+    assert set(storage_mod.load_entries()) == {"t1", "t3"}
+    with open(storage_mod.LEDGER_JOURNAL_FILE, "rb") as f:
+        assert f.read().count(b"\n") == 3
+
+
+def test_rebuild_db_from_journal(storage_mod):
+    storage_mod.save_entries({"t1": _entry()})
+    storage_mod.save_update_entries({"t2": _entry(refid="r2")})
+    os.remove(storage_mod.LEDGER_DB_FILE)
+    assert storage_mod.rebuild_db_from_journal() == 2
+    assert set(storage_mod.load_entries_from_db()) == {"t1", "t2"}
 
 
 def test_save_update_entries_counts_new(storage_mod):
@@ -75,6 +139,29 @@ def test_save_update_entries_counts_new(storage_mod):
     assert n2 == 1  # t1 already existed, only t2 is new
 
 
+def test_upsert_entries_reports_new_and_updated(storage_mod):
+    assert storage_mod.upsert_entries({"t1": _entry(), "t2": _entry(refid="r2")}) == (
+        2,
+        0,
+    )
+    # t1 unchanged, t2 changed, t3 new
+    new, updated = storage_mod.upsert_entries(
+        {"t1": _entry(), "t2": _entry(refid="r2", amount=5.0), "t3": _entry()}
+    )
+    assert (new, updated) == (1, 1)
+    assert storage_mod.load_entries_from_db()["t2"]["amount"] == 5.0
+
+
+def test_existing_txids_queries_in_batches(storage_mod):
+    storage_mod.upsert_entries({f"t{i}": _entry() for i in range(5)})
+    found = storage_mod.existing_txids(["t0", "t3", "t4", "nope", "t0"], batch_size=2)
+    assert found == {"t0", "t3", "t4"}
+
+
+def test_existing_txids_without_db_is_empty(storage_mod):
+    assert storage_mod.existing_txids(["t1"]) == set()
+
+
 def test_save_update_entries_empty_returns_zero(storage_mod):
     assert storage_mod.save_update_entries({}) == 0
 
@@ -127,3 +214,391 @@ def test_init_db_adds_missing_date_iso_column(storage_mod):
     cols = [r[1] for r in cur.fetchall()]
     conn.close()
     assert "date_iso" in cols
+
+
+def test_migrate_sets_user_version_and_indexes(storage_mod):
+    storage_mod.init_db()
+    conn = sqlite3.connect(storage_mod.LEDGER_DB_FILE)
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    indexes = {
+        r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")
+    }
+    conn.close()
+    assert version == storage_mod.SCHEMA_VERSION
+    assert {"idx_ledger_time", "idx_ledger_refid", "idx_ledger_date_iso"} <= indexes
+
+
+def test_init_db_migrates_once_per_process(storage_mod, monkeypatch):
+    storage_mod.init_db()
+    calls = []
+    monkeypatch.setattr(storage_mod, "migrate", lambda path=None: calls.append(path))
+    storage_mod.init_db()
+    storage_mod.save_entries({"t1": _entry()})
+    storage_mod.load_entries_from_db()
+    assert calls == []
+
+
+def test_migrate_backfills_date_iso_in_batches(storage_mod, monkeypatch):
+    storage_mod._ensure_dir()
+    conn = sqlite3.connect(storage_mod.LEDGER_DB_FILE)
+    conn.execute(
+        "CREATE TABLE ledger (txid TEXT PRIMARY KEY, refid TEXT, time REAL, type TEXT, asset TEXT, amount REAL, fee REAL, data TEXT)"
+    )
+    conn.executemany(
+        "INSERT INTO ledger (txid, time, data) VALUES (?, ?, '{}')",
+        [(f"t{i}", 1700000000.0 + i * 86400) for i in range(5)] + [("t_zero", 0.0)],
+    )
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(storage_mod, "MIGRATION_BATCH_SIZE", 2)
+
+    assert storage_mod.migrate() == storage_mod.SCHEMA_VERSION
+
+    conn = sqlite3.connect(storage_mod.LEDGER_DB_FILE)
+    rows = dict(conn.execute("SELECT txid, date_iso FROM ledger"))
+    conn.close()
+    assert rows["t0"] == "2023-11-14"
+    assert rows["t4"] == "2023-11-18"
+    assert rows["t_zero"] is None
+
+
+def test_trades_pair_legs_and_allocate_fees(storage_mod):
+    storage_mod.save_entries(
+        {
+            "t1": _entry("ZEUR", -100.0, fee=0.4, refid="r1"),
+            "t2": _entry("XXBT", 0.002, fee=0.0, refid="r1"),
+            "t3": _entry("XXBT", -0.001, fee=0.0, refid="r2", time_=1700000100.0),
+            "t4": _entry("ZEUR", 60.0, fee=0.2, refid="r2", time_=1700000100.0),
+            "t5": _entry("DOT", 1.5, refid="", type_="staking"),
+        }
+    )
+    trades = {(t["refid"], t["side"]): t for t in storage_mod.load_trades()}
+
+    buy = trades[("r1", "buy")]
+    assert buy["asset"] == "XXBT"
+    assert buy["base_amount"] == pytest.approx(0.002)
+    assert buy["quote_amount"] == pytest.approx(100.0)
+    assert buy["fee"] == pytest.approx(0.4)
+    assert buy["quote_fee"] == pytest.approx(0.4)
+    assert buy["date_iso"] == "2023-11-14"
+    sell = trades[("r2", "sell")]
+    assert sell["quote_amount"] == pytest.approx(60.0)
+    assert sell["base_fee"] == pytest.approx(0.0)
+    assert trades[("t5", "in")]["type"] == "staking"  # no refid -> keyed by txid
+
+
+def test_trades_refreshed_when_legs_arrive_separately(storage_mod):
+    storage_mod.save_entries({"t1": _entry("XXBT", 0.5, refid="r1")})
+    assert [t["side"] for t in storage_mod.load_trades()] == ["in"]
+
+    storage_mod.save_update_entries({"t2": _entry("ZEUR", -50.0, refid="r1")})
+    trades = storage_mod.load_trades()
+    assert [(t["side"], t["quote_amount"]) for t in trades] == [("buy", 50.0)]
+
+
+def test_load_trades_time_range(storage_mod):
+    storage_mod.save_entries(
+        {f"t{i}": _entry(refid=f"r{i}", time_=1700000000.0 + i) for i in range(4)}
+    )
+    trades = storage_mod.load_trades(start=1700000001.0, end=1700000003.0)
+    assert [t["refid"] for t in trades] == ["r1", "r2"]
+
+
+def test_migrate_backfills_trades_for_existing_ledger(storage_mod):
+    storage_mod.save_entries(
+        {
+            "t1": _entry("ZEUR", -10.0, refid="r1"),
+            "t2": _entry("SOL", 1.0, refid="r1"),
+        }
+    )
+    conn = sqlite3.connect(storage_mod.LEDGER_DB_FILE)
+    conn.execute("DROP TABLE trades")
+    conn.execute("PRAGMA user_version = 4")
+    conn.commit()
+    conn.close()
+
+    assert storage_mod.migrate() == storage_mod.SCHEMA_VERSION
+    trades = storage_mod.load_trades()
+    assert [(t["asset"], t["side"]) for t in trades] == [("SOL", "buy")]
+
+
+def test_daily_tables_refreshed_for_touched_dates(storage_mod):
+    day1, day2 = 1700000000.0, 1700000000.0 + 86400
+    storage_mod.save_entries(
+        {
+            "t1": _entry("ZEUR", -100.0, fee=0.4, refid="r1", time_=day1),
+            "t2": _entry("XXBT", 0.002, refid="r1", time_=day1),
+            "t3": _entry("XXBT", -0.001, fee=0.1, refid="r2", time_=day2),
+            "t4": _entry("ZEUR", 60.0, refid="r2", time_=day2),
+        }
+    )
+    storage_mod.save_update_entries(
+        {
+            "t5": _entry("ZEUR", -50.0, refid="r3", time_=day1),
+            "t6": _entry("SOL", 5.0, refid="r3", time_=day1),
+        }
+    )
+    conn = sqlite3.connect(storage_mod.LEDGER_DB_FILE)
+    eur = conn.execute("SELECT * FROM eur_daily ORDER BY asset").fetchall()
+    assets = conn.execute("SELECT * FROM asset_daily ORDER BY asset").fetchall()
+    sells = conn.execute("SELECT * FROM sell_daily").fetchall()
+    conn.close()
+
+    assert eur == [
+        ("2023-11-14", "SOL", 50.0, 0.0),
+        ("2023-11-14", "XXBT", 100.0, 0.4),
+    ]
+    assert assets == [("2023-11-14", "SOL", 5.0), ("2023-11-14", "XXBT", 0.002)]
+    assert sells == [("2023-11-15", "XXBT", 0.001, 60.0, 0.1)]
+
+
+def test_reports_from_db_match_in_memory_build(storage_mod):
+    import time
+
+    now = time.time()
+    entries = {
+        "t1": _entry("ZEUR", -100.0, fee=0.4, refid="r1", time_=now),
+        "t2": _entry("XXBT", 0.5, refid="r1", time_=now),
+        "t3": _entry("SOL", 1.5, refid="r1", time_=now),
+        "t4": _entry("XXBT", -0.1, fee=0.1, refid="r2", time_=now),
+        "t5": _entry("ZEUR", 30.0, refid="r2", time_=now),
+    }
+    storage_mod.save_entries(entries)
+    for name in ("ledger_eur_report", "ledger_asset_report", "ledger_sell_report"):
+        sys.modules.pop(name, None)
+    import ledger_asset_report
+    import ledger_eur_report
+    import ledger_sell_report
+
+    try:
+        for build in (
+            ledger_eur_report.build_eur_report,
+            ledger_asset_report.build_asset_report,
+            ledger_sell_report.build_sell_report,
+        ):
+            from_db = build(storage_mod.LEDGER_DB_FILE, days=1)
+            in_memory = build(storage_mod.load_entries_from_db(), days=1)
+            in_memory = in_memory[from_db.columns]  # asset column order may differ
+            pd.testing.assert_frame_equal(from_db, in_memory, check_dtype=False)
+    finally:
+        for name in ("ledger_eur_report", "ledger_asset_report", "ledger_sell_report"):
+            sys.modules.pop(name, None)
+
+
+def test_data_column_is_compressed_and_decoded(storage_mod, monkeypatch):
+    monkeypatch.setattr(storage_mod, "DATA_ENCODING", "zlib")
+    entry = {**_entry(), "aclass": "currency", "balance": "1.0000000000"}
+    storage_mod.save_entries({"t1": entry})
+    conn = sqlite3.connect(storage_mod.LEDGER_DB_FILE)
+    (data,) = conn.execute("SELECT data FROM ledger").fetchone()
+    conn.close()
+    assert isinstance(data, bytes)
+    assert len(data) < len(json.dumps(entry))
+    assert storage_mod.decode_data(data) == entry
+    assert storage_mod.load_entries_from_db()["t1"]["balance"] == "1.0000000000"
+
+
+def test_json_data_encoding_is_the_default(storage_mod):
+    assert storage_mod.DATA_ENCODING == "json"
+    storage_mod.save_entries({"t1": _entry()})
+    conn = sqlite3.connect(storage_mod.LEDGER_DB_FILE)
+    (data,) = conn.execute("SELECT data FROM ledger").fetchone()
+    conn.close()
+    assert json.loads(data)["asset"] == "BTC"
+    assert storage_mod.decode_data(data) == storage_mod.decode_data(
+        storage_mod._compress_text(data)
+    )
+
+
+def test_migrate_leaves_text_rows_and_compress_data_is_opt_in(storage_mod, monkeypatch):
+    storage_mod.save_entries({f"t{i}": _entry(refid=f"r{i}") for i in range(5)})
+    conn = sqlite3.connect(storage_mod.LEDGER_DB_FILE)
+    conn.execute("PRAGMA user_version = 8")
+    conn.commit()
+    conn.close()
+
+    def data_types():
+        conn = sqlite3.connect(storage_mod.LEDGER_DB_FILE)
+        try:
+            return {r[0] for r in conn.execute("SELECT typeof(data) FROM ledger")}
+        finally:
+            conn.close()
+
+    assert storage_mod.migrate() == storage_mod.SCHEMA_VERSION
+    assert data_types() == {"text"}  # upgrading leaves the ledger as is
+
+    monkeypatch.setattr(storage_mod, "DATA_ENCODING", "zlib")
+    monkeypatch.setattr(storage_mod, "MIGRATION_BATCH_SIZE", 2)
+    assert storage_mod.compress_data() == 5
+    assert data_types() == {"blob"}
+    assert storage_mod.compress_data() == 0
+    storage_mod.save_update_entries({"t9": _entry(refid="r9")})
+    assert data_types() == {"blob"}
+    assert len(storage_mod.load_entries_from_db()) == 6
+
+
+def test_migrate_normalises_spaced_json_rows(storage_mod, monkeypatch):
+    entries = {f"t{i}": _entry(refid=f"r{i}") for i in range(5)}
+    storage_mod.save_entries(entries)
+    conn = sqlite3.connect(storage_mod.LEDGER_DB_FILE)
+    conn.executemany(  # rows as written before the codec module
+        "UPDATE ledger SET data = ? WHERE txid = ?",
+        [(json.dumps(e, ensure_ascii=False), t) for t, e in entries.items()],
+    )
+    conn.execute("PRAGMA user_version = 10")
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(storage_mod, "MIGRATION_BATCH_SIZE", 2)
+    assert storage_mod.migrate() == storage_mod.SCHEMA_VERSION
+    assert storage_mod.upsert_entries(entries) == (0, 0)
+    conn = sqlite3.connect(storage_mod.LEDGER_DB_FILE)
+    data = [r[0] for r in conn.execute("SELECT data FROM ledger")]
+    conn.close()
+    assert all(": " not in d for d in data)
+
+
+def test_migrate_compresses_when_opted_in(storage_mod, monkeypatch):
+    entries = {f"t{i}": _entry(refid=f"r{i}") for i in range(3)}
+    storage_mod.save_entries(entries)
+    conn = sqlite3.connect(storage_mod.LEDGER_DB_FILE)
+    conn.execute("PRAGMA user_version = 8")
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(storage_mod, "DATA_ENCODING", "zlib")
+    assert storage_mod.migrate() == storage_mod.SCHEMA_VERSION
+    conn = sqlite3.connect(storage_mod.LEDGER_DB_FILE)
+    types = {r[0] for r in conn.execute("SELECT typeof(data) FROM ledger")}
+    conn.close()
+    assert types == {"blob"}
+    assert storage_mod.upsert_entries(entries) == (0, 0)
+
+
+def test_data_encoding_from_env(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("KRAKEN_DATA_ENCODING", "zlib")
+    sys.modules.pop("storage", None)
+    import storage
+
+    assert storage.DATA_ENCODING == "zlib"
+    monkeypatch.setenv("KRAKEN_DATA_ENCODING", "lzma")
+    sys.modules.pop("storage", None)
+    with pytest.raises(ValueError):
+        import storage  # noqa: F401,F811
+    sys.modules.pop("storage", None)
+
+
+def test_unknown_data_format_falls_back_to_raw(storage_mod):
+    storage_mod.save_entries({"t1": _entry()})
+    conn = sqlite3.connect(storage_mod.LEDGER_DB_FILE)
+    conn.execute("UPDATE ledger SET data = x'ff00'")
+    conn.commit()
+    conn.close()
+    assert storage_mod.load_entries_from_db()["t1"]["raw"] == b"\xff\x00"
+
+
+def test_v1_compressed_rows_still_decode(storage_mod, monkeypatch):
+    monkeypatch.setattr(storage_mod, "DATA_ENCODING", "zlib")
+    import zlib
+
+    entry = {**_entry(), "aclass": "currency"}
+    c = zlib.compressobj(
+        6,
+        zlib.DEFLATED,
+        storage_mod.DATA_ZLIB_WBITS,
+        4,
+        zdict=storage_mod._DATA_ZDICT_V1,
+    )
+    v1 = b"\x01" + c.compress(json.dumps(entry).encode("utf-8")) + c.flush()
+    assert storage_mod.decode_data(v1) == entry
+    assert storage_mod.encode_data(entry)[:1] == storage_mod.DATA_FORMAT_ZLIB
+
+
+def test_snapshot_and_journal_are_compact(storage_mod):
+    storage_mod.save_entries({"t1": _entry()})
+    storage_mod.append_journal({"t2": _entry(refid="r2")})
+    with open(storage_mod.RAW_LEDGER_FILE, "rb") as f:
+        assert b": " not in f.read()
+    with open(storage_mod.LEDGER_JOURNAL_FILE, "rb") as f:
+        assert b": " not in f.read()
+    assert set(storage_mod.load_entries()) == {"t1", "t2"}
+
+
+def _archive_fixture(storage_mod):
+    """Ledger with one buy in 2021, 2022 and 2023; 2021 and 2022 archived."""
+    from datetime import datetime, timezone
+
+    storage_mod.save_entries(
+        {
+            "a1": _entry("ZEUR", -10.0, refid="r21", time_=1620000000.0),
+            "a2": _entry("XXBT", 0.1, refid="r21", time_=1620000000.0),
+            "b1": _entry("ZEUR", -20.0, refid="r22", time_=1650000000.0),
+            "b2": _entry("XXBT", 0.2, refid="r22", time_=1650000000.0),
+            "c1": _entry("ZEUR", -30.0, refid="r23", time_=1700000000.0),
+            "c2": _entry("XXBT", 0.3, refid="r23", time_=1700000000.0),
+        }
+    )
+    keep = datetime.now(timezone.utc).year - 2023
+    return storage_mod.archive_closed_years(keep_years=keep)
+
+
+def test_archive_moves_closed_years_out_of_hot_db(storage_mod):
+    assert _archive_fixture(storage_mod) == {2021: 2, 2022: 2}
+    assert [y for y, _ in storage_mod.list_archives()] == [2021, 2022]
+
+    conn = sqlite3.connect(storage_mod.LEDGER_DB_FILE)
+    hot = {r[0] for r in conn.execute("SELECT txid FROM ledger")}
+    hot_trades = [r[0] for r in conn.execute("SELECT refid FROM trades")]
+    conn.close()
+    assert hot == {"c1", "c2"} and hot_trades == ["r23"]
+
+    # readers see the full history through the UNION views
+    assert set(storage_mod.load_entries_from_db()) == {
+        "a1",
+        "a2",
+        "b1",
+        "b2",
+        "c1",
+        "c2",
+    }
+    assert [t["refid"] for t in storage_mod.load_trades()] == ["r21", "r22", "r23"]
+    assert storage_mod.existing_txids(["a1", "b2", "zz"]) == {"a1", "b2"}
+
+
+def test_archives_attached_read_only(storage_mod):
+    _archive_fixture(storage_mod)
+    conn = storage_mod.connect()
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM a2021.ledger")
+        assert conn.execute("SELECT COUNT(*) FROM main.ledger").fetchone()[0] == 2
+        assert conn.execute("SELECT COUNT(*) FROM ledger").fetchone()[0] == 6
+    finally:
+        conn.close()
+
+
+def test_upsert_skips_archived_txids(storage_mod):
+    _archive_fixture(storage_mod)
+    new, _ = storage_mod.upsert_entries(
+        {
+            "a1": _entry("ZEUR", -10.0, refid="r21", time_=1620000000.0),
+            "d1": _entry("SOL", 1.0, refid="r24", time_=1700000500.0),
+        }
+    )
+    assert new == 1
+    conn = sqlite3.connect(storage_mod.LEDGER_DB_FILE)
+    hot = {r[0] for r in conn.execute("SELECT txid FROM ledger")}
+    conn.close()
+    assert hot == {"c1", "c2", "d1"}
+
+
+def test_daily_changes_reports_refreshed_dates_after_seq(storage_mod):
+    storage_mod.init_db()
+    storage_mod.upsert_entries({"t1": _entry(time_=1700000000.0)})
+    seq, dates = storage_mod.daily_changes(0)
+    assert seq == 1 and dates == {"2023-11-14"}
+    storage_mod.upsert_entries({"t2": _entry(refid="r2", time_=1700100000.0)})
+    seq2, dates2 = storage_mod.daily_changes(seq)
+    assert seq2 == 2 and dates2 == {"2023-11-16"}
+    assert storage_mod.daily_changes(seq2) == (2, set())
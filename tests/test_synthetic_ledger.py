@@ -0,0 +1,151 @@
+"""Unit tests for synthetic_ledger.py — synthetic Kraken ledgers for scale tests."""
+
+import sys
+import time
+from collections import defaultdict
+
+import pytest
+
+_MODULES = ("storage", "synthetic_ledger", "ledger_loader", "portfolio_summary")
+END = 1_700_000_000.0
+
+
+@pytest.fixture()
+def sl(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for name in _MODULES:
+        sys.modules.pop(name, None)
+    import synthetic_ledger
+
+    yield synthetic_ledger
+    for name in _MODULES:
+        sys.modules.pop(name, None)
+
+
+def test_same_seed_same_ledger(sl):
+    a = sl.generate(2000, assets=12, years=2, seed=7, end=END)
+    assert a == sl.generate(2000, assets=12, years=2, seed=7, end=END)
+    assert a != sl.generate(2000, assets=12, years=2, seed=8, end=END)
+    assert abs(len(a) - 2000) < 100
+    times = [e["time"] for e in a.values()]
+    assert times == sorted(times)
+    assert END - 2 * 365 * 86400 <= times[0] and times[-1] <= END
+
+
+def test_entry_shape_and_kinds(sl):
+    entries = sl.generate(5000, assets=30, years=1, end=END)
+    by_ref = defaultdict(list)
+    for txid, e in entries.items():
+        assert txid.startswith("L") and len(txid) == 19
+        assert set(e) == {
+            "refid",
+            "time",
+            "type",
+            "subtype",
+            "aclass",
+            "asset",
+            "amount",
+            "fee",
+            "balance",
+        }
+        float(e["amount"]), float(e["fee"])
+        assert float(e["balance"]) >= 0
+        by_ref[e["refid"]].append(e)
+    assert {e["type"] for e in entries.values()} == {
+        "trade",
+        "staking",
+        "transfer",
+        "deposit",
+        "withdrawal",
+    }
+    for legs in by_ref.values():
+        kind = legs[0]["type"]
+        if kind == "trade":
+            # one ZEUR leg and one asset leg, opposite signs
+            assert sorted(leg["asset"] == "ZEUR" for leg in legs) == [False, True]
+            assert float(legs[0]["amount"]) * float(legs[1]["amount"]) < 0
+        elif kind == "transfer":
+            assert len(legs) == 2
+            assert sum(float(leg["amount"]) for leg in legs) == pytest.approx(
+                0, abs=1e-8
+            )
+            assert {leg["subtype"] for leg in legs} in (
+                {"spottostaking", "stakingfromspot"},
+                {"stakingtospot", "spotfromstaking"},
+            )
+        else:
+            assert len(legs) == 1
+    staking = {e["asset"] for e in entries.values() if e["type"] == "staking"}
+    assert all(a.endswith(sl.STAKING_SUFFIXES) for a in staking)
+    assert any(a.endswith("28.S") for a in staking)
+
+
+def test_long_tail_and_uniform_assets(sl):
+    def trades(skew):
+        count = defaultdict(int)
+        for e in sl.generate(6000, assets=20, skew=skew, end=END).values():
+            if e["type"] == "trade" and e["asset"] != "ZEUR":
+                count[e["asset"]] += 1
+        return count
+
+    tail = trades(1.0)
+    assert tail["XXBT"] > 5 * tail["MINA"]
+    flat = trades(0.0)
+    assert flat["XXBT"] < 2 * flat["MINA"]
+    names = sl.asset_names(700)
+    assert names[20:22] == ["QAAU", "QAAV"] and len(set(names)) == 700
+    assert sl.staking_wallet("XXBT", ".S") == "XBT.S"
+    assert sl.staking_wallet("DOT", "28.S") == "DOT28.S"
+
+
+def test_trades_per_day(sl):
+    entries = sl.generate(years=0.5, trades_per_day=10, end=END)
+    refids = {e["refid"] for e in entries.values() if e["type"] == "trade"}
+    assert len(refids) == pytest.approx(10 * 182.5, rel=0.1)
+
+
+def test_fifo_normalizes_wallets(sl):
+    import portfolio_summary
+
+    entries = sl.generate(3000, assets=25, end=END)
+    summary = portfolio_summary.run_fifo(entries)
+    expected = {portfolio_summary.normalize_asset(a) for a in sl.asset_names(25)}
+    assert set(summary["asset"]) <= expected
+    assert {"BTC", "ETH", "QAAU"} <= set(summary["asset"])
+
+
+def test_to_db_and_raw_json(sl):
+    import codec
+    import storage
+
+    entries = sl.generate(500, assets=4, end=time.time())
+    assert sl.to_db(entries)[0] == len(entries)
+    stored = storage.load_entries_from_db()
+    assert {k: {**e, "date": stored[k]["date"]} for k, e in entries.items()} == stored
+    path = sl.to_raw_json(entries)
+    assert path == storage.RAW_LEDGER_FILE
+    with open(path, "rb") as f:
+        assert codec.loads(f.read()) == entries
+
+
+def test_api_stand_in_serves_fetch_ledger(sl, monkeypatch):
+    import ledger_loader
+
+    monkeypatch.setattr(ledger_loader.time, "sleep", lambda s: None)
+    now = time.time()
+    entries = sl.generate(700, assets=6, years=0.1, end=now)
+    api = sl.SyntheticKrakenAPI(entries)
+    fetched = ledger_loader.fetch_ledger(api, days=37, delay_min=0, delay_max=0)
+    assert fetched == entries
+    assert [c for c, _ in api.calls].count("Ledgers") == len(entries) // 50 + 1
+
+    since = int(now - 5 * 86400)
+    recent = ledger_loader.fetch_ledger(api, since_ts=since, delay_min=0, delay_max=0)
+    assert recent == {k: e for k, e in entries.items() if e["time"] > since}
+
+    balance = api.get_balance()
+    assert float(balance["ZEUR"]) > 0
+    pairs = api.get_asset_pairs()
+    assert pairs["XXBTZEUR"]["base"] == "XXBT" and pairs["XXBTZEUR"]["quote"] == "ZEUR"
+    ticker = api.get_ticker("XXBTZEUR,NOPEZEUR")
+    assert list(ticker) == ["XXBTZEUR"] and float(ticker["XXBTZEUR"]["c"][0]) > 0
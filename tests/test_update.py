@@ -93,6 +93,40 @@ def test_main_no_summary_flag_skips_summary(tmp_path, monkeypatch):
     assert rc == 0 and "ran" not in called
 
 
+def test_main_incremental_fifo_flag(tmp_path, monkeypatch):
+    db = tmp_path / "ledger.db"
+    _make_ledger_db(db, ["2026-01-01T00:00:00+00:00", "2026-07-14T00:00:00+00:00"])
+    monkeypatch.setattr(update.storage, "LEDGER_DB_FILE", str(db))
+    monkeypatch.setattr(update, "validate_for_update", lambda path: None)
+    monkeypatch.setattr(update.portfolio_summary, "INCREMENTAL", False)
+    seen = []
+    monkeypatch.setattr(
+        update,
+        "_run_portfolio_summary",
+        lambda: seen.append(update.portfolio_summary.INCREMENTAL),
+    )
+    argv = ["--fromdate", "2026-01-01", "--todate", "2026-07-14", "--no-backup"]
+    assert update.main(argv) == 0
+    assert update.main(argv + ["--incremental-fifo"]) == 0
+    assert seen == [False, True]
+
+
+def test_main_runs_scheduled_backup_unless_disabled(tmp_path, monkeypatch):
+    db = tmp_path / "ledger.db"
+    _make_ledger_db(db, ["2026-01-01T00:00:00+00:00", "2026-07-14T00:00:00+00:00"])
+    monkeypatch.setattr(update.storage, "LEDGER_DB_FILE", str(db))
+    monkeypatch.setattr(update, "validate_for_update", lambda path: None)
+    monkeypatch.setattr(update, "_run_portfolio_summary", lambda: None)
+    calls = []
+    monkeypatch.setattr(
+        update.db_backup, "run_scheduled_backup", lambda path: calls.append(path)
+    )
+    argv = ["--fromdate", "2026-01-01", "--todate", "2026-07-14"]
+    assert update.main(argv) == 0
+    assert update.main(argv + ["--no-backup"]) == 0
+    assert calls == [str(db)]
+
+
 def test_main_fetches_filters_and_persists(tmp_path, monkeypatch):
     db = tmp_path / "ledger.db"
     _make_ledger_db(db, ["2026-06-01T00:00:00+00:00", "2026-06-10T00:00:00+00:00"])
@@ -112,6 +146,36 @@ def test_main_fetches_filters_and_persists(tmp_path, monkeypatch):
     assert rc == 0
 
 
+def test_main_filters_known_txids_without_full_db_load(tmp_path, monkeypatch):
+    db = tmp_path / "ledger.db"
+    _make_ledger_db(db, ["2026-06-01T00:00:00+00:00", "2026-06-10T00:00:00+00:00"])
+    monkeypatch.setattr(update.storage, "LEDGER_DB_FILE", str(db))
+    monkeypatch.setattr(update, "validate_for_update", lambda path: None)
+    monkeypatch.setattr(update, "load_keys", lambda: ("k", "s"))
+    monkeypatch.setattr(update, "_run_portfolio_summary", lambda: None)
+    monkeypatch.setattr(update, "_run_db_backup", lambda: None)
+
+    def no_full_load():
+        raise AssertionError("update.main must not load the whole ledger")
+
+    monkeypatch.setattr(update.storage, "load_entries_from_db", no_full_load)
+    ts = datetime(2026, 6, 15, tzinfo=timezone.utc).timestamp()
+    fetched = {"old": {"time": ts}, "new": {"time": ts}}
+    monkeypatch.setattr(update.ledger_loader, "fetch_ledger", lambda *a, **k: fetched)
+    monkeypatch.setattr(
+        update.storage, "existing_txids", lambda txids: set(txids) & {"old"}
+    )
+    saved = {}
+    monkeypatch.setattr(
+        update.storage,
+        "save_update_entries",
+        lambda entries: saved.update(entries) or len(entries),
+    )
+    rc = update.main(["--fromdate", "2026-06-11", "--todate", "2026-06-20"])
+    assert rc == 0
+    assert list(saved) == ["new"]
+
+
 def test_main_dry_run_never_fetches(tmp_path, monkeypatch):
     db = tmp_path / "ledger.db"
     _make_ledger_db(db, ["2026-06-01T00:00:00+00:00", "2026-06-10T00:00:00+00:00"])
@@ -243,3 +307,94 @@ def test_main_api_key_error_returns_1(monkeypatch):
     monkeypatch.setattr(update, "validate_for_update", raise_apikey)
     rc = update.main(["--fromdate", "5d", "--dry-run"])
     assert rc == 1
+
+
+def test_main_rebuild_db_skips_validation(monkeypatch):
+    def raise_missing(db_path):
+        raise validators.DatabaseMissingError("missing")
+
+    monkeypatch.setattr(update, "validate_for_update", raise_missing)
+    monkeypatch.setattr(update.storage, "rebuild_db_from_journal", lambda: 3)
+    assert update.main(["--rebuild-db"]) == 0
+    monkeypatch.setattr(update.storage, "rebuild_db_from_journal", lambda: 0)
+    assert update.main(["--rebuild-db"]) == 1
+
+
+def test_main_compress_data_requires_zlib_encoding(tmp_path, monkeypatch):
+    db = tmp_path / "ledger.db"
+    monkeypatch.setattr(update.storage, "LEDGER_DB_FILE", str(db))
+    calls = []
+    monkeypatch.setattr(update.storage, "init_db", lambda: None)
+    monkeypatch.setattr(update.storage, "compress_data", lambda: calls.append(1))
+    monkeypatch.setattr(update.storage, "DATA_ENCODING", "json")
+    assert update.main(["--compress-data"]) == 2
+    monkeypatch.setattr(update.storage, "DATA_ENCODING", "zlib")
+    assert update.main(["--compress-data"]) == 1  # no ledger.db yet
+    db.touch()
+    assert update.main(["--compress-data"]) == 0
+    assert calls == [1]
+
+
+def test_account_argv_strips_account_selection():
+    argv = ["--all-accounts", "--workers", "3", "--fromdate", "30d", "--account=x"]
+    assert update._account_argv(argv) == ["--fromdate", "30d"]
+
+
+class _InlineExecutor:
+    """Stands in for ProcessPoolExecutor: runs submitted calls immediately."""
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, fn, *args):
+        from concurrent.futures import Future
+
+        fut = Future()
+        fut.set_result(fn(*args))
+        return fut
+
+
+def test_all_accounts_runs_each_account_and_consolidates(monkeypatch):
+    monkeypatch.setattr(update.accounts, "list_accounts", lambda: ["a", "b"])
+    monkeypatch.setattr(update, "ProcessPoolExecutor", _InlineExecutor)
+    calls = []
+    monkeypatch.setattr(
+        update,
+        "_update_account",
+        lambda name, argv: calls.append((name, argv)) or (name, 0, 0.1),
+    )
+    consolidated = []
+    monkeypatch.setattr(
+        update.accounts,
+        "consolidate_summaries",
+        lambda names, write_csv=True: consolidated.append(names),
+    )
+
+    rc = update.main(["--all-accounts", "--fromdate", "30d", "--no-backup"])
+
+    assert rc == 0
+    assert calls == [
+        ("a", ["--fromdate", "30d", "--no-backup"]),
+        ("b", ["--fromdate", "30d", "--no-backup"]),
+    ]
+    assert consolidated == [["a", "b"]]
+
+
+def test_all_accounts_reports_failure(monkeypatch):
+    monkeypatch.setattr(update.accounts, "list_accounts", lambda: ["a", "b"])
+    monkeypatch.setattr(update, "ProcessPoolExecutor", _InlineExecutor)
+    monkeypatch.setattr(
+        update, "_update_account", lambda name, argv: (name, int(name == "b"), 0.0)
+    )
+    assert update.main(["--all-accounts", "--no-summary"]) == 1
+
+
+def test_unknown_account_returns_2(monkeypatch, tmp_path):
+    monkeypatch.setattr(update.accounts, "ACCOUNTS_DIR", str(tmp_path))
+    assert update.main(["--account", "missing"]) == 2
@@ -4,8 +4,11 @@
 from __future__ import annotations
 import argparse
 import logging
+import multiprocessing
 import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, date, timedelta, timezone
 from typing import Any
 
@@ -18,10 +21,13 @@ import portfolio_summary_report
 import portfolio_summary
 import balances
 import balance_reconciliation
+import db_backup
+import accounts
 from api import KrakenAPI
 from keys import load_keys, KeysError
 from config import DEFAULT_DAYS, DEFAULT_PAGE_SIZE, DEFAULT_DELAY_MIN, DEFAULT_DELAY_MAX
 from validators import (
+    db_row_count,
     validate_for_update,
     DatabaseMissingError,
     SchemaInvalidError,
@@ -73,6 +79,106 @@ def _run_portfolio_summary():
         logger.exception("Reconciliation step failed (non-fatal): %s", e)
 
 
+def _run_db_backup():
+    """
+    Time-gated online backup of ledger.db (at most one per
+    db_backup.MIN_INTERVAL_HOURS) + retention + periodic integrity check.
+    Like the summary step, a failure here never fails the update run.
+    """
+    try:
+        db_backup.run_scheduled_backup(storage.LEDGER_DB_FILE)
+    except Exception as e:
+        logger.exception("DB backup step failed (non-fatal): %s", e)
+
+
+def _run_archive():
+    """Move closed years into the yearly archive DBs (non-fatal)."""
+    try:
+        moved = storage.archive_closed_years()
+        if moved:
+            logger.info("Archived closed years: %s", moved)
+    except Exception as e:
+        logger.exception("Archive step failed (non-fatal): %s", e)
+
+
+def _run_compress_data() -> int:
+    """Compress the existing ledger.data rows once (needs KRAKEN_DATA_ENCODING=zlib)."""
+    if storage.DATA_ENCODING != "zlib":
+        # otherwise new rows keep arriving as TEXT next to the compressed ones
+        logger.error("--compress-data requires KRAKEN_DATA_ENCODING=zlib")
+        return 2
+    if not os.path.exists(storage.LEDGER_DB_FILE):
+        logger.error("Ledger DB not found: %s", storage.LEDGER_DB_FILE)
+        return 1
+    storage.init_db()
+    storage.compress_data()
+    return 0
+
+
+def _account_argv(argv: list[str]) -> list[str]:
+    """argv of the parent run minus the options that select accounts."""
+    out: list[str] = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+            continue
+        if arg in ("--account", "--workers"):
+            skip = True
+            continue
+        if arg == "--all-accounts" or arg.startswith(("--account=", "--workers=")):
+            continue
+        out.append(arg)
+    return out
+
+
+def _update_account(name: str, argv: list[str]) -> tuple[str, int, float]:
+    """Process-pool worker: run main() for one account. Returns (name, rc, secs)."""
+    started = time.monotonic()
+    try:
+        rc = main([*argv, "--account", name])
+    except Exception as e:
+        logger.exception("Update of account %s crashed: %s", name, e)
+        rc = 1
+    return name, rc, time.monotonic() - started
+
+
+def _run_all_accounts(argv: list[str], workers: int | None, summary: bool) -> int:
+    """
+    Update every account in its own process (each one chdirs into its
+    account directory), then write the consolidated cross-account summary.
+    Wall time is roughly that of the slowest account.
+    """
+    names = accounts.list_accounts()
+    if not names:
+        logger.error("No accounts found in %s", accounts.ACCOUNTS_DIR)
+        return 1
+
+    child_argv = _account_argv(argv)
+    max_workers = min(workers or len(names), len(names))
+    logger.info("Updating %d accounts with %d workers", len(names), max_workers)
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(_update_account, n, child_argv) for n in names]
+        for fut in futures:
+            results.append(fut.result())
+
+    failed = [name for name, rc, _ in results if rc != 0]
+    for name, rc, secs in results:
+        logger.info(" - account %s: rc=%d in %.1fs", name, rc, secs)
+
+    if summary:
+        try:
+            accounts.consolidate_summaries(names, write_csv=True)
+        except Exception as e:
+            logger.exception("Consolidated summary failed (non-fatal): %s", e)
+
+    if failed:
+        logger.error("Accounts failed: %s", ", ".join(failed))
+        return 1
+    return 0
+
+
 def parse_relative_or_date(s: str) -> date:
     s = s.strip()
     if not s:
@@ -91,11 +197,11 @@ def parse_relative_or_date(s: str) -> date:
 
 
 def get_db_date_range(db_path: str) -> tuple[date | None, date | None]:
-    """Return (min_date, max_date) present in DB (based on date_iso column)."""
+    """Return (min_date, max_date) present in DB + yearly archives (date_iso)."""
     if not os.path.exists(db_path):
         return None, None
     try:
-        conn = __import__("sqlite3").connect(db_path)
+        conn = storage.connect(db_path)
         cur = conn.cursor()
         cur.execute(
             "SELECT name FROM sqlite_master WHERE type='table' AND name='ledger'"
@@ -153,8 +259,69 @@ def main(argv=None):
         action="store_true",
         help="Skip portfolio FIFO summary/forecast recompute after updating the ledger",
     )
+    parser.add_argument(
+        "--incremental-fifo",
+        action="store_true",
+        help="Apply only new ledger entries to the saved FIFO state instead of replaying the full history",
+    )
+    parser.add_argument(
+        "--no-backup",
+        action="store_true",
+        help="Skip the scheduled online backup of ledger.db",
+    )
+    parser.add_argument(
+        "--archive",
+        action="store_true",
+        help="Move closed years into read-only archives balances_history/ledger_<year>.db",
+    )
+    parser.add_argument(
+        "--rebuild-db",
+        action="store_true",
+        help="Re-insert raw-ledger.json + the ledger journal into ledger.db and exit",
+    )
+    parser.add_argument(
+        "--compress-data",
+        action="store_true",
+        help="Compress the stored ledger.data rows and exit (needs KRAKEN_DATA_ENCODING=zlib)",
+    )
+
+    parser.add_argument(
+        "--account",
+        default=None,
+        help="Run for this named account (accounts/<name>/, kraken-<name>.key)",
+    )
+    parser.add_argument(
+        "--all-accounts",
+        action="store_true",
+        help="Update every account in parallel, then write a consolidated summary",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Max parallel account processes for --all-accounts (default: one per account)",
+    )
 
+    argv = list(sys.argv[1:] if argv is None else argv)
     args = parser.parse_args(argv)
+    if args.incremental_fifo:
+        portfolio_summary.INCREMENTAL = True
+
+    if args.all_accounts:
+        return _run_all_accounts(
+            argv, args.workers, summary=not (args.dry_run or args.no_summary)
+        )
+    if args.account:
+        try:
+            accounts.activate(args.account)
+        except accounts.AccountError as e:
+            logger.error("%s", e)
+            return 2
+    if args.rebuild_db:
+        # works without a valid ledger.db or API keys: the journal is the source
+        return 0 if storage.rebuild_db_from_journal() else 1
+    if args.compress_data:
+        return _run_compress_data()
 
     # Parse input dates
     try:
@@ -218,6 +385,10 @@ def main(argv=None):
 
     if not missing_ranges:
         logger.info("Database already covers requested range -> nothing to do.")
+        if not args.dry_run and args.archive:
+            _run_archive()
+        if not args.dry_run and not args.no_backup:
+            _run_db_backup()
         if not args.no_summary:
             _run_portfolio_summary()
         return 0
@@ -236,10 +407,10 @@ def main(argv=None):
     delay_min = args.delay_min if args.delay_min is not None else DEFAULT_DELAY_MIN
     delay_max = args.delay_max if args.delay_max is not None else DEFAULT_DELAY_MAX
 
-    # Load currently known entries from DB (used to filter duplicates)
-    existing_entries: dict[str, Any] = storage.load_entries_from_db() or {}
-    known_txids: set[str] = set(existing_entries.keys())
-    logger.info("Existing entries loaded from DB: %d", len(existing_entries))
+    # Duplicates are filtered with batched txid lookups against the DB
+    # (storage.existing_txids), so only txids inserted during this run are
+    # kept in memory — cost scales with what is fetched, not the DB size.
+    known_txids: set[str] = set()
 
     total_fetched = 0
 
@@ -276,6 +447,7 @@ def main(argv=None):
             delay_max=delay_max,
             since_ts=since_ts,
             stop_on_txids=known_txids,
+            known_txids_lookup=storage.existing_txids,
         )
 
         if not fetched:
@@ -315,10 +487,11 @@ def main(argv=None):
 
         # Persist update chunk (save only truly new entries)
         try:
+            stored = storage.existing_txids(filtered.keys())
             new_only = {
                 txid: entry
                 for txid, entry in filtered.items()
-                if txid not in known_txids
+                if txid not in known_txids and txid not in stored
             }
 
             if not new_only:
@@ -344,13 +517,17 @@ def main(argv=None):
             logger.exception("Failed to persist fetched entries: %s", e)
             return 1
 
-    final_count = len(storage.load_entries_from_db() or {})
+    final_count = db_row_count(storage.LEDGER_DB_FILE)
     logger.info(
         "Ledger DB updated successfully — total rows: %d (fetched %d new)",
         final_count,
         total_fetched,
     )
 
+    if not args.dry_run and args.archive:
+        _run_archive()
+    if not args.dry_run and not args.no_backup:
+        _run_db_backup()
     if not args.dry_run and not args.no_summary:
         _run_portfolio_summary()
 
@@ -358,4 +535,5 @@ def main(argv=None):
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # process pool in the frozen update.exe
     raise SystemExit(main())